@@ -0,0 +1,202 @@
+"""
+Service Dependencies - Lazily constructed per-process service singletons
+Each service, and the SDK behind it, is imported and built the first time a
+request needs it, so importing the app stays cheap and cold starts are fast
+"""
+
+import hmac
+import importlib
+import os
+from typing import TYPE_CHECKING, Callable, Optional
+
+from fastapi import Header, HTTPException
+
+if TYPE_CHECKING:
+    from app.services.batch_service import BatchService
+    from app.services.chain_indexer import ChainIndexer
+    from app.services.chain_submitter import ChainSubmitter
+    from app.services.ipfs_service import IPFSService
+    from app.services.job_queue import JobQueue
+    from app.services.openai_service import OpenAIService
+    from app.services.pipeline import TreasureMapPipeline
+    from app.services.puzzle_pool import PuzzlePool
+
+
+# Modules whose import dominates cold start; see preload()
+HEAVY_MODULES = (
+    "app.services.openai_service",
+    "app.services.ipfs_service",
+    "app.services.chain_indexer",
+    "app.services.chain_submitter",
+    "app.services.job_queue",
+    "app.services.batch_service",
+    "app.services.puzzle_pool",
+)
+
+_services: dict[str, object] = {}
+
+
+def _service(name: str, build: Callable[[], object]):
+    if name not in _services:
+        _services[name] = build()
+    return _services[name]
+
+
+def built(name: str) -> Optional[object]:
+    """The named service if this process has constructed it, else None"""
+    return _services.get(name)
+
+
+def preload():
+    """
+    Import every service module without constructing anything
+
+    The pre-forking server calls this so workers inherit warm imports.
+    """
+    for module in HEAVY_MODULES:
+        importlib.import_module(module)
+
+
+# Dependencies are coroutines so FastAPI runs them on the event loop: no two
+# requests race to build a service, and services may start background tasks
+
+
+async def get_openai_service() -> "OpenAIService":
+    def build():
+        from app.services.openai_service import OpenAIService
+        return OpenAIService()
+    return _service("openai", build)
+
+
+async def get_ipfs_service() -> "IPFSService":
+    def build():
+        from app.services.ipfs_service import IPFSService
+        return IPFSService()
+    return _service("ipfs", build)
+
+
+async def get_pipeline() -> "TreasureMapPipeline":
+    from app.services.pipeline import TreasureMapPipeline
+    openai_service, ipfs_service = await get_openai_service(), await get_ipfs_service()
+    return _service("pipeline", lambda: TreasureMapPipeline(openai_service, ipfs_service))
+
+
+async def get_puzzle_pool() -> "PuzzlePool":
+    from app.services.puzzle_pool import PuzzlePool
+    openai_service = await get_openai_service()
+    return _service("puzzle_pool", lambda: PuzzlePool.from_env(openai_service))
+
+
+async def get_batch_service() -> "BatchService":
+    from app.services.batch_service import BatchService
+    openai_service, pipeline = await get_openai_service(), await get_pipeline()
+    return _service("batch", lambda: BatchService.from_env(openai_service, pipeline))
+
+
+async def get_job_queue() -> "JobQueue":
+    from app.services.job_queue import JobQueue
+    openai_service, ipfs_service = await get_openai_service(), await get_ipfs_service()
+
+    def build():
+        queue = JobQueue.from_env(openai_service, ipfs_service)
+        queue.start()
+        return queue
+    return _service("job_queue", build)
+
+
+async def get_chain_indexer() -> Optional["ChainIndexer"]:
+    """The indexer, or None unless a node or fixture is configured"""
+    def build():
+        from app.services.chain_indexer import ChainIndexer
+        return ChainIndexer.from_env()
+    return _service("chain_indexer", build)
+
+
+async def require_chain_indexer() -> "ChainIndexer":
+    indexer = await get_chain_indexer()
+    if indexer is None:
+        raise HTTPException(status_code=503, detail="Chain indexer is not configured")
+    return indexer
+
+
+async def get_chain_submitter() -> Optional["ChainSubmitter"]:
+    """The relayer, or None unless a node, contract and relayer account are configured"""
+    def build():
+        from app.services.chain_submitter import ChainSubmitter
+        return ChainSubmitter.from_env()
+    return _service("chain_submitter", build)
+
+
+async def require_relayer_caller(x_relayer_key: Optional[str] = Header(None)):
+    """
+    Authenticate callers of the relayer endpoints, which spend the relayer's ETH
+
+    Keys come from CHAIN_RELAYER_API_KEYS (comma-separated); without any,
+    the endpoints stay closed.
+    """
+    keys = [key.strip().encode() for key in os.getenv("CHAIN_RELAYER_API_KEYS", "").split(",") if key.strip()]
+    if not keys:
+        raise HTTPException(status_code=503, detail="Chain relayer API keys are not configured")
+    presented = (x_relayer_key or "").encode()
+    if not any(hmac.compare_digest(presented, key) for key in keys):
+        raise HTTPException(status_code=401, detail="Missing or invalid X-Relayer-Key")
+
+
+async def require_chain_submitter() -> "ChainSubmitter":
+    submitter = await get_chain_submitter()
+    if submitter is None:
+        raise HTTPException(status_code=503, detail="Chain relayer is not configured")
+    return submitter
+
+
+async def start_services():
+    """
+    Build the services that do background work from process start
+
+    Everything else is built on first use.
+    """
+    if os.getenv("PUZZLE_POOL_ENABLED", "").lower() in ("1", "true", "yes"):
+        pool = await get_puzzle_pool()
+        # A shared pool is refilled by the first worker only, so N workers
+        # keep one pool's worth of puzzles and spend one refill budget
+        if pool.shared is None or os.getenv("SERVER_WORKER_INDEX", "0") == "0":
+            pool.start()
+    # A persistent job store may hold jobs interrupted by a restart
+    if os.getenv("JOB_STORE", "memory") != "memory":
+        await get_job_queue()
+    if os.getenv("CHAIN_LOG_FIXTURE") or os.getenv("CHAIN_RPC_URL"):
+        indexer = await get_chain_indexer()
+        # Under app.server every worker reads the shared index; only the first writes it
+        if indexer is not None and os.getenv("SERVER_WORKER_INDEX", "0") == "0":
+            indexer.start()
+    # Every worker queues relayed transactions; only the first sends them, so one process owns the nonce
+    relayer = os.getenv("CHAIN_RELAYER_KEY") or os.getenv("CHAIN_RELAYER_ADDRESS")
+    if relayer and os.getenv("SERVER_WORKER_INDEX", "0") == "0":
+        submitter = await get_chain_submitter()
+        if submitter is not None:
+            submitter.start()
+
+
+async def stop_services(drain_timeout: float = 0):
+    """
+    Stop whatever this process built and forget it
+
+    Args:
+        drain_timeout: Seconds running jobs get to finish
+    """
+    indexer = built("chain_indexer")
+    if indexer is not None:
+        await indexer.stop()
+    submitter = built("chain_submitter")
+    if submitter is not None:
+        await submitter.stop()
+    pool = built("puzzle_pool")
+    if pool is not None:
+        await pool.stop()
+    queue = built("job_queue")
+    if queue is not None:
+        await queue.stop(drain_timeout=drain_timeout)
+    ipfs_service = built("ipfs")
+    if ipfs_service is not None:
+        await ipfs_service.close()
+    _services.clear()
@@ -3,34 +3,153 @@ CryptoHunter Backend - FastAPI Application
 AI-powered treasure map generation service
 """
 
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import Optional
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field
+from typing import Literal, Optional
+import json
 import os
+import time
+
+from app.dependencies import (
+    built,
+    get_batch_service,
+    get_ipfs_service,
+    get_job_queue,
+    get_openai_service,
+    get_pipeline,
+    get_puzzle_pool,
+    require_chain_indexer,
+    require_chain_submitter,
+    require_relayer_caller,
+    start_services,
+    stop_services,
+)
+from app.schemas import PuzzleContent
+from app.services.admission import AdmissionController, AdmissionMiddleware
+from app.services.answer_checker import UnknownMap
+from app.services.ipfs_gateway import (
+    GatewayFetchError,
+    RangeNotSatisfiable,
+    parse_byte_range,
+    sniff_content_type,
+)
+from app.services.manifest import ManifestError
+from app.utils.cid import InvalidCID
+from app.services.batch_service import BatchJobNotFound, BatchJobRunning
+from app.services.job_queue import JobNotFound
+from app.services.puzzle_cache import PuzzleCacheMiss
+from app.utils.metrics import REGISTRY, finish_trace, server_timing, start_trace
+from app.services.pipeline import PipelineError
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Start background services on startup (the rest are built on first use);
+    on shutdown let running jobs finish (up to SHUTDOWN_DRAIN_TIMEOUT
+    seconds) and close upstream connections
+    """
+    await start_services()
+    try:
+        yield
+    finally:
+        await stop_services(drain_timeout=float(os.getenv("SHUTDOWN_DRAIN_TIMEOUT", "30")))
 
-from app.services.openai_service import OpenAIService
-from app.services.ipfs_service import IPFSService
 
 # Initialize FastAPI app
 app = FastAPI(
     title="CryptoHunter API",
     description="AI-powered treasure map generation service for Web3 Treasure Hunt",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+# Admission control sits inside CORS so 429/503 responses keep CORS headers
+admission = AdmissionController.from_env()  # None when ADMISSION_ENABLED is off
+if admission is not None:
+    app.add_middleware(AdmissionMiddleware, controller=admission)
+
 # CORS middleware configuration
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # In production, replace with specific origins
+    allow_origins=os.getenv("CORS_ORIGINS", "*").split(","),  # In production, list specific origins
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
 )
 
-# Initialize services
-openai_service = OpenAIService()
-ipfs_service = IPFSService()
+# Metrics
+HTTP_REQUESTS = REGISTRY.counter(
+    "http_requests_total",
+    "HTTP requests by route and status",
+    labels=("method", "path", "status")
+)
+HTTP_LATENCY = REGISTRY.histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route (time to response headers)",
+    labels=("method", "path")
+)
+BREAKER_STATES = {"closed": 0, "half_open": 1, "open": 2}
+REGISTRY.gauge_callback(
+    "upstream_circuit_state",
+    "Circuit breaker state per upstream (0 closed, 1 half-open, 2 open)",
+    ("upstream",),
+    lambda: {
+        name: BREAKER_STATES[stats["breaker"]]
+        for service in (built("openai"), built("ipfs")) if service is not None
+        for name, stats in service.upstream_stats().items()
+    }
+)
+REGISTRY.gauge_callback(
+    "ipfs_requests_in_flight",
+    "IPFS provider requests currently in flight",
+    (),
+    lambda: {(): built("ipfs").pool_stats()["in_flight"]} if built("ipfs") is not None else {}
+)
+REGISTRY.gauge_callback(
+    "puzzle_pool_depth",
+    "Pre-generated puzzles available per bucket",
+    ("bucket",),
+    lambda: built("puzzle_pool").stats()["depth"] if built("puzzle_pool") is not None else {}
+)
+if admission is not None:
+    REGISTRY.gauge_callback(
+        "admission_queue_depth",
+        "Requests waiting for a concurrency slot per endpoint class",
+        ("endpoint_class",),
+        lambda: {name: stats["waiting"] for name, stats in admission.stats()["classes"].items()}
+    )
+TRACE_ALL_REQUESTS = os.getenv("TRACE_REQUESTS", "").lower() in ("1", "true", "yes")
+
+
+@app.middleware("http")
+async def instrument_requests(request: Request, call_next):
+    """
+    Record request counts and latency; add a Server-Timing header with
+    per-stage spans when tracing is enabled (TRACE_REQUESTS or X-Trace: 1)
+    """
+    token = None
+    if TRACE_ALL_REQUESTS or request.headers.get("x-trace") == "1":
+        token = start_trace()
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        elapsed = time.perf_counter() - started
+        route = request.scope.get("route")
+        path = route.path if route is not None else "unmatched"
+        HTTP_REQUESTS.inc(method=request.method, path=path, status=status)
+        HTTP_LATENCY.observe(elapsed, method=request.method, path=path)
+        spans = finish_trace(token) if token is not None else None
+    if spans is not None:
+        spans.append({"name": "total", "duration": elapsed})
+        response.headers["Server-Timing"] = server_timing(spans)
+    return response
 
 
 # Request/Response Models
@@ -39,15 +158,14 @@ class GeneratePuzzleRequest(BaseModel):
     keywords: list[str]
     difficulty: Optional[str] = "medium"  # easy, medium, hard
     language: Optional[str] = "zh"  # zh, en
+    cache: Optional[Literal["bypass", "prefer", "only"]] = "prefer"
+    fast: Optional[bool] = False  # serve a pre-generated puzzle if available
 
 
-class GeneratePuzzleResponse(BaseModel):
+class GeneratePuzzleResponse(PuzzleContent):
     """Response model for puzzle generation"""
-    story: str
-    question: str
-    answer: str
-    hints: list[str]
     image_url: Optional[str] = None
+    prompt_version: Optional[str] = None
 
 
 class GenerateImageRequest(BaseModel):
@@ -56,6 +174,45 @@ class GenerateImageRequest(BaseModel):
     style: Optional[str] = "treasure map"
 
 
+class TreasureMapJobRequest(GeneratePuzzleRequest):
+    """Request model for queued treasure map creation"""
+    priority: Optional[Literal["high", "normal", "low"]] = "normal"
+
+
+# Each item is at least one LLM call (plus an image in map mode)
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "100"))
+
+
+class BatchRequest(BaseModel):
+    """Request model for batch puzzle / treasure map generation"""
+    items: list[GeneratePuzzleRequest] = Field(min_length=1, max_length=BATCH_MAX_ITEMS)
+    mode: Optional[Literal["puzzle", "map"]] = "puzzle"
+    concurrency: Optional[int] = Field(None, ge=1)
+
+
+class CheckAnswerRequest(BaseModel):
+    """Request model for off-chain answer pre-checks"""
+    answer_hash: str
+    answer: str
+    consult_ai: Optional[bool] = False  # let GPT settle ambiguous guesses
+
+
+class RegisterAnswerRequest(BaseModel):
+    """Request model for registering a map's answer for pre-checks"""
+    answer: str
+    aliases: list[str] = []
+    question: Optional[str] = ""
+
+
+class RelayCreateMapRequest(BaseModel):
+    """Request model for a relayed createMap (wei amounts as integers)"""
+    metadata_uri: str
+    answer: str  # hashed server-side; only the hash goes on chain
+    prize_pool: int
+    entry_fee: int = 0
+    name: str = ""
+
+
 class UploadToIPFSRequest(BaseModel):
     """Request model for IPFS upload"""
     content: dict
@@ -71,36 +228,177 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    """Detailed health check"""
+    """
+    Detailed health check
+    
+    Stats are null for services this process has not needed yet; the check
+    itself never builds one.
+    """
+    openai_service, ipfs_service = built("openai"), built("ipfs")
+    puzzle_pool, job_queue, chain_indexer = built("puzzle_pool"), built("job_queue"), built("chain_indexer")
+    chain_submitter = built("chain_submitter")
     return {
         "status": "healthy",
         "openai_configured": bool(os.getenv("OPENAI_API_KEY")),
+        "ipfs_pool": ipfs_service.pool_stats() if ipfs_service is not None else None,
+        "ipfs_cache": ipfs_service.cache_stats() if ipfs_service is not None else None,
+        "ipfs_reader": ipfs_service.reader_stats() if ipfs_service is not None else None,
+        "puzzle_cache": openai_service.puzzle_cache_stats() if openai_service is not None else None,
+        "image_cache": openai_service.image_cache_stats() if openai_service is not None else None,
+        "puzzle_pool": puzzle_pool.stats() if puzzle_pool is not None else None,
+        "job_queue": job_queue.stats() if job_queue is not None else None,
+        "answer_checker": openai_service.answer_checker.stats() if openai_service is not None else None,
+        "chain_indexer": chain_indexer.stats() if chain_indexer is not None else None,
+        "chain_submitter": chain_submitter.stats() if chain_submitter is not None else None,
+        "admission": admission.stats() if admission is not None else None,
         "version": "1.0.0"
     }
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus metrics"""
+    return PlainTextResponse(
+        REGISTRY.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+@app.get("/api/upstreams")
+async def upstream_status(
+    openai_service=Depends(get_openai_service),
+    ipfs_service=Depends(get_ipfs_service)
+):
+    """Breaker state and latency per upstream provider, plus model route usage"""
+    return {
+        "openai": openai_service.upstream_stats(),
+        "openai_routes": openai_service.route_stats(),
+        "ipfs": ipfs_service.upstream_stats()
+    }
+
+
 @app.post("/api/generate-puzzle", response_model=GeneratePuzzleResponse)
-async def generate_puzzle(request: GeneratePuzzleRequest):
+async def generate_puzzle(
+    request: GeneratePuzzleRequest,
+    openai_service=Depends(get_openai_service),
+    puzzle_pool=Depends(get_puzzle_pool)
+):
     """
     Generate a treasure hunt puzzle using AI
     
     - **keywords**: List of keywords to inspire the puzzle
     - **difficulty**: Puzzle difficulty (easy, medium, hard)
     - **language**: Output language (zh for Chinese, en for English)
+    - **cache**: `prefer` (default), `bypass` to force a fresh puzzle, or
+      `only` to answer from cache (404 on miss)
+    - **fast**: Serve a pre-generated puzzle from the pool when one is
+      available; falls back to normal generation when the pool is empty
     """
+    if request.fast:
+        pooled = await puzzle_pool.pop(request.difficulty, request.language, request.keywords)
+        if pooled is not None:
+            openai_service.answer_checker.register_puzzle(pooled)
+            return pooled
+    
     try:
         result = await openai_service.generate_puzzle(
             keywords=request.keywords,
             difficulty=request.difficulty,
-            language=request.language
+            language=request.language,
+            cache=request.cache
         )
         return result
+    except PuzzleCacheMiss as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/api/generate-puzzle/stream")
+async def stream_puzzle(
+    request: GeneratePuzzleRequest,
+    openai_service=Depends(get_openai_service),
+    puzzle_pool=Depends(get_puzzle_pool)
+):
+    """
+    Generate a puzzle as a server-sent-events stream
+    
+    Emits `partial` events while a text field is being written, a `field`
+    event as each of story/question/answer/hints completes, and a final
+    `puzzle` event. Malformed model output is abandoned early and retried on
+    a stronger model, announced by a `retry` event (discard earlier fields).
+    Failures after the stream has started arrive as an `error` event.
+    """
+    if request.fast:
+        pooled = await puzzle_pool.pop(request.difficulty, request.language, request.keywords)
+        if pooled is not None:
+            openai_service.answer_checker.register_puzzle(pooled)
+            events = [{"event": "field", "data": {"field": name, "value": value}} for name, value in pooled.items()]
+            events.append({"event": "puzzle", "data": pooled})
+            return StreamingResponse(
+                (_format_event(event, "sse") for event in events),
+                media_type="text/event-stream"
+            )
+    
+    events = openai_service.stream_puzzle(
+        keywords=request.keywords,
+        difficulty=request.difficulty,
+        language=request.language,
+        cache=request.cache
+    )
+    # Pull the first event here so cache misses and early failures keep their status codes
+    try:
+        first = await events.__anext__()
+    except PuzzleCacheMiss as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    async def event_stream():
+        try:
+            yield _format_event(first, "sse")
+            async for event in events:
+                yield _format_event(event, "sse")
+        except Exception as e:
+            yield _format_event({"event": "error", "data": {"detail": str(e)}}, "sse")
+        finally:
+            await events.aclose()
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
+@app.post("/api/check-answer")
+async def check_answer(request: CheckAnswerRequest, openai_service=Depends(get_openai_service)):
+    """
+    Pre-check an answer before committing it on-chain
+    
+    Returns `match`, `ambiguous` or `mismatch`. Matches include the exact
+    `commit_answer` whose hash the contract expects. Set **consult_ai** to
+    have GPT settle ambiguous guesses.
+    """
+    try:
+        return await openai_service.precheck_answer(
+            request.answer_hash,
+            request.answer,
+            consult_ai=request.consult_ai
+        )
+    except UnknownMap:
+        raise HTTPException(status_code=404, detail="No answer registered for this map")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/api/answers")
+async def register_answer(request: RegisterAnswerRequest, openai_service=Depends(get_openai_service)):
+    """Register a map's answer and aliases (e.g. after a restart) for pre-checks"""
+    profile = openai_service.answer_checker.register(
+        request.answer, request.aliases, request.question or ""
+    )
+    return {"answer_hash": profile.answer_hash, "aliases": profile.aliases}
+
+
 @app.post("/api/generate-image")
-async def generate_image(request: GenerateImageRequest):
+async def generate_image(request: GenerateImageRequest, openai_service=Depends(get_openai_service)):
     """
     Generate a treasure map image using DALL-E
     
@@ -118,7 +416,7 @@ async def generate_image(request: GenerateImageRequest):
 
 
 @app.post("/api/upload-ipfs")
-async def upload_to_ipfs(request: UploadToIPFSRequest):
+async def upload_to_ipfs(request: UploadToIPFSRequest, ipfs_service=Depends(get_ipfs_service)):
     """
     Upload content to IPFS
     
@@ -135,47 +433,323 @@ async def upload_to_ipfs(request: UploadToIPFSRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/api/ipfs/{target:path}")
+async def read_ipfs(target: str, request: Request, ipfs_service=Depends(get_ipfs_service)):
+    """
+    Serve IPFS content (`CID` or `CID/path`) through the verified read cache
+    
+    Content is immutable, so responses carry a strong ETag (the IPFS path)
+    and long-lived caching headers. Supports `If-None-Match` and single
+    byte `Range` requests; bodies are streamed.
+    """
+    try:
+        blob = await ipfs_service.fetch(target)
+    except InvalidCID as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except GatewayFetchError as e:
+        raise HTTPException(status_code=502, detail=str(e))
+    
+    etag = f'"{target.removeprefix("ipfs://").strip("/")}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "public, max-age=31536000, immutable",
+        "Accept-Ranges": "bytes",
+        "X-Content-Verified": "true" if blob.verified else "false"
+    }
+    if request.headers.get("if-none-match") in (etag, "*"):
+        return Response(status_code=304, headers=headers)
+    
+    media_type = sniff_content_type(blob.head())
+    try:
+        byte_range = parse_byte_range(request.headers.get("range"), blob.size)
+    except RangeNotSatisfiable:
+        return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{blob.size}"})
+    
+    if byte_range is None:
+        headers["Content-Length"] = str(blob.size)
+        return StreamingResponse(blob.iter_range(), media_type=media_type, headers=headers)
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{blob.size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(
+        blob.iter_range(start, end), status_code=206, media_type=media_type, headers=headers
+    )
+
+
+@app.get("/api/manifest/{target:path}")
+async def read_manifest(target: str, ipfs_service=Depends(get_ipfs_service)):
+    """
+    Decode a pinned treasure map manifest (`CID` or `CID/path`)
+    
+    Compressed stories are inflated and gateway URLs filled in; legacy
+    manifests are returned in the same shape.
+    """
+    try:
+        return await ipfs_service.fetch_manifest(target)
+    except InvalidCID as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except GatewayFetchError as e:
+        raise HTTPException(status_code=502, detail=str(e))
+    except ManifestError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+def _format_event(event: dict, stream: str) -> str:
+    """Serialize a pipeline event as an NDJSON line or an SSE frame"""
+    payload = json.dumps(event, ensure_ascii=False)
+    if stream == "sse":
+        return f"event: {event['event']}\ndata: {payload}\n\n"
+    return payload + "\n"
+
+
 @app.post("/api/create-treasure-map")
-async def create_treasure_map(request: GeneratePuzzleRequest):
+async def create_treasure_map(
+    request: GeneratePuzzleRequest,
+    stream: Optional[Literal["ndjson", "sse"]] = Query(None),
+    pipeline=Depends(get_pipeline)
+):
     """
     Complete workflow: Generate puzzle, create image, and upload to IPFS
     
-    Returns all necessary data to create an on-chain treasure map
+    Returns all necessary data to create an on-chain treasure map.
+    Metadata pinning overlaps with image generation; failed optional stages
+    are reported in `errors` instead of failing the whole request.
+    
+    - **stream**: Optional `ndjson` or `sse` to receive each stage as it
+      finishes (the puzzle is sent as soon as it is generated)
     """
+    if stream:
+        async def event_stream():
+            try:
+                async for event in pipeline.stream(
+                    keywords=request.keywords,
+                    difficulty=request.difficulty,
+                    language=request.language,
+                    cache=request.cache
+                ):
+                    yield _format_event(event, stream)
+            except PipelineError as e:
+                yield _format_event(
+                    {"event": "error", "data": {"detail": str(e), "errors": e.errors}},
+                    stream
+                )
+            except Exception as e:
+                yield _format_event({"event": "error", "data": {"detail": str(e)}}, stream)
+
+        media_type = "text/event-stream" if stream == "sse" else "application/x-ndjson"
+        return StreamingResponse(event_stream(), media_type=media_type)
+
     try:
-        # Step 1: Generate puzzle
-        puzzle = await openai_service.generate_puzzle(
+        return await pipeline.run(
             keywords=request.keywords,
             difficulty=request.difficulty,
-            language=request.language
-        )
-        
-        # Step 2: Generate image
-        image_url = await openai_service.generate_image(
-            description=puzzle["story"][:500],  # Use first 500 chars of story
-            style="treasure map"
+            language=request.language,
+            cache=request.cache
         )
-        puzzle["image_url"] = image_url
-        
-        # Step 3: Upload to IPFS
-        metadata = {
-            "story": puzzle["story"],
-            "question": puzzle["question"],
-            "hints": puzzle["hints"],
-            "image_url": image_url,
-            "difficulty": request.difficulty
-        }
-        ipfs_uri = await ipfs_service.upload_json(metadata)
-        
-        return {
-            "puzzle": puzzle,
-            "ipfs_uri": ipfs_uri,
-            "answer_hash_input": puzzle["answer"]  # Frontend will hash this
-        }
+    except PuzzleCacheMiss as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except PipelineError as e:
+        raise HTTPException(status_code=500, detail={"message": str(e), "errors": e.errors})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _stream_batch(batch_service, job_id: str) -> StreamingResponse:
+    """Stream a batch job's results as NDJSON"""
+    # Claimed before the response starts, so a conflict is still a 409
+    try:
+        lock = batch_service.claim(job_id)
+    except BatchJobNotFound:
+        raise HTTPException(status_code=404, detail="Batch job not found")
+    except BatchJobRunning:
+        raise HTTPException(status_code=409, detail="Batch job is already running")
+
+    async def event_stream():
+        try:
+            async for event in batch_service.run(job_id, lock):
+                yield _format_event(event, "ndjson")
+        except Exception as e:
+            yield _format_event({"event": "error", "data": {"detail": str(e)}}, "ndjson")
+
+    return StreamingResponse(event_stream(), media_type="application/x-ndjson")
+
+
+@app.post("/api/batch")
+async def create_batch(request: BatchRequest, batch_service=Depends(get_batch_service)):
+    """
+    Generate many puzzles or treasure maps in one call
+    
+    Results stream back as NDJSON in completion order. The first line carries
+    the `job_id`; if the stream is interrupted, resume with
+    `POST /api/batch/{job_id}/resume`.
+    
+    - **items**: Puzzle requests (same fields as /api/generate-puzzle), at most BATCH_MAX_ITEMS
+    - **mode**: `puzzle` for puzzles only, `map` for the full treasure map workflow
+    - **concurrency**: Parallel items (capped by BATCH_MAX_CONCURRENCY)
+    """
+    job_id = batch_service.create_job(
+        items=[item.model_dump() for item in request.items],
+        mode=request.mode,
+        concurrency=request.concurrency
+    )
+    return _stream_batch(batch_service, job_id)
+
+
+@app.post("/api/batch/{job_id}/resume")
+async def resume_batch(job_id: str, batch_service=Depends(get_batch_service)):
+    """Resume a batch job, replaying finished items and running the rest"""
+    return _stream_batch(batch_service, job_id)
+
+
+@app.get("/api/batch/{job_id}")
+async def get_batch(job_id: str, batch_service=Depends(get_batch_service)):
+    """Get progress counters for a batch job"""
+    try:
+        return batch_service.status(job_id)
+    except BatchJobNotFound:
+        raise HTTPException(status_code=404, detail="Batch job not found")
+
+
+@app.post("/api/jobs/create-treasure-map", status_code=202)
+async def submit_treasure_map_job(request: TreasureMapJobRequest, job_queue=Depends(get_job_queue)):
+    """
+    Queue the complete treasure map workflow and return immediately
+    
+    Poll `GET /api/jobs/{job_id}` for progress and the final result.
+    
+    - **priority**: Queue lane (high, normal, low)
+    """
+    job = job_queue.submit(
+        request=request.model_dump(exclude={"priority", "fast"}),
+        priority=request.priority
+    )
+    return {"job_id": job["id"], "status": job["status"]}
+
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(
+    job_id: str,
+    wait: float = Query(0, ge=0, le=60),
+    job_queue=Depends(get_job_queue)
+):
+    """
+    Get a queued job's status, current stage and result
+    
+    - **wait**: Seconds to long-poll for the job to finish (max 60)
+    """
+    try:
+        if wait:
+            return await job_queue.wait(job_id, wait)
+        return job_queue.get(job_id)
+    except JobNotFound:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+
+@app.get("/api/maps")
+async def list_maps(
+    status: Optional[Literal["open", "solved"]] = None,
+    creator: Optional[str] = None,
+    min_prize: Optional[int] = Query(None, ge=0),
+    sort: Literal["created", "prize_pool", "entry_fee"] = "created",
+    order: Literal["asc", "desc"] = "desc",
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    indexer=Depends(require_chain_indexer)
+):
+    """
+    List treasure maps from the local chain index
+    
+    - **status**: `open` or `solved`
+    - **creator**: Creator address
+    - **min_prize**: Minimum prize pool in wei
+    - **sort**: `created`, `prize_pool` or `entry_fee`
+    
+    Wei amounts are returned as decimal strings.
+    """
+    maps = indexer.store.list_maps(
+        status=status,
+        creator=creator,
+        min_prize=min_prize,
+        sort=sort,
+        descending=order == "desc",
+        limit=limit,
+        offset=offset
+    )
+    return {"maps": maps, "indexed_block": indexer.stats()["indexed_block"]}
+
+
+@app.get("/api/maps/{map_id}")
+async def get_indexed_map(
+    map_id: int,
+    events: int = Query(20, ge=0, le=500),
+    indexer=Depends(require_chain_indexer)
+):
+    """Indexed map state plus its most recent events"""
+    result = indexer.store.get_map(map_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Map not indexed")
+    result["events"] = indexer.store.events(map_id, limit=events) if events else []
+    return result
+
+
+@app.get("/api/maps/{map_id}/unlocked/{player}")
+async def get_unlock_status(map_id: int, player: str, indexer=Depends(require_chain_indexer)):
+    """Whether a player has unlocked a map (mirrors the hasUnlocked mapping)"""
+    return {"map_id": map_id, "player": player, "unlocked": indexer.store.has_unlocked(map_id, player)}
+
+
+@app.get("/api/players/{player}/unlocks")
+async def get_player_unlocks(player: str, indexer=Depends(require_chain_indexer)):
+    """Map IDs a player has unlocked"""
+    return {"player": player, "map_ids": indexer.store.player_unlocks(player)}
+
+
+@app.post("/api/chain/create-map", status_code=202, dependencies=[Depends(require_relayer_caller)])
+async def relay_create_map(request: RelayCreateMapRequest, submitter=Depends(require_chain_submitter)):
+    """
+    Queue a createMap sent from the relayer account
+    
+    Takes the `ipfs_uri` and `answer_hash_input` of a created treasure map;
+    the answer hash is computed here. The relayer is the on-chain creator
+    and pays the prize pool, so callers need an `X-Relayer-Key` and amounts
+    are capped by CHAIN_MAX_PRIZE_POOL / CHAIN_MAX_ENTRY_FEE.
+    Poll `GET /api/chain/submissions/{id}` for the receipt and map ID.
+    """
+    try:
+        submission = submitter.create_map(
+            request.metadata_uri,
+            request.answer,
+            request.prize_pool,
+            entry_fee=request.entry_fee,
+            name=request.name
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"id": submission["id"], "status": submission["status"], "answer_hash": submission["params"]["answer_hash"]}
+
+
+@app.get("/api/chain/submissions/{submission_id}", dependencies=[Depends(require_relayer_caller)])
+async def get_submission(
+    submission_id: str,
+    wait: float = Query(0, ge=0, le=60),
+    submitter=Depends(require_chain_submitter)
+):
+    """
+    A relayed transaction's status, nonce, hashes sent and result
+    
+    - **wait**: Seconds to long-poll for it to be confirmed or fail (max 60)
+    """
+    # Imported here so the relayer stack only loads when a relayer is configured
+    from app.services.chain_submitter import SubmissionNotFound
+
+    try:
+        if wait:
+            return await submitter.wait(submission_id, wait)
+        return submitter.get(submission_id)
+    except SubmissionNotFound:
+        raise HTTPException(status_code=404, detail="Submission not found")
+
+
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    from app.server import main
+    main()
@@ -0,0 +1,114 @@
+"""
+Shared schemas - Pydantic models used by both the API and the services
+The puzzle model doubles as the structured-output schema sent to OpenAI and
+as the local validator for (partial) model replies
+"""
+
+from functools import lru_cache
+from typing import Annotated, Any, Literal, Optional
+
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter, ValidationError, model_validator
+
+
+class PuzzleContent(BaseModel):
+    """Puzzle fields produced by the model"""
+    story: str = Field(min_length=1)
+    question: str = Field(min_length=1)
+    answer: str = Field(min_length=1, max_length=64)
+    hints: list[str] = Field(min_length=1, max_length=5)
+    aliases: list[str] = Field(default_factory=list, max_length=10)
+
+
+PUZZLE_FIELDS = ("story", "question", "answer", "hints")
+
+MANIFEST_VERSION = 1
+
+
+class MapManifest(BaseModel):
+    """
+    Pinned treasure map manifest (wire format, see app/services/manifest.py)
+
+    Keys are serialized sorted and minified, unset optional fields are
+    omitted and gateway URLs are not stored, since readers derive them from
+    the ipfs:// URIs. Long stories may be stored deflated in ``story_z``.
+    """
+    model_config = ConfigDict(extra="forbid")
+
+    v: Literal[1] = MANIFEST_VERSION
+    story: Optional[str] = None
+    story_z: Optional[str] = None  # Raw deflate, base85
+    question: str = Field(min_length=1)
+    hints: list[str] = Field(min_length=1, max_length=5)
+    difficulty: str
+    image: Optional[str] = None
+    variants: dict[str, str] = Field(default_factory=dict)
+    metadata: Optional[str] = None
+
+    @model_validator(mode="after")
+    def _one_story(self) -> "MapManifest":
+        if (self.story is None) == (self.story_z is None):
+            raise ValueError("exactly one of story and story_z must be set")
+        return self
+
+
+# Keywords OpenAI strict mode does not accept; the local validator enforces them
+_UNSUPPORTED_KEYWORDS = ("title", "default", "minLength", "maxLength", "minItems", "maxItems")
+
+
+@lru_cache(maxsize=None)
+def _field_adapter(name: str) -> TypeAdapter:
+    field = PuzzleContent.model_fields[name]
+    return TypeAdapter(Annotated[(field.annotation, *field.metadata)])
+
+
+def field_error(name: str, value: Any) -> Optional[str]:
+    """
+    Validate a single puzzle field
+
+    Returns:
+        None if the value is valid (or the field is unknown), else a short
+        description of the problem
+    """
+    if name not in PuzzleContent.model_fields:
+        return None
+    try:
+        _field_adapter(name).validate_python(value, strict=True)
+    except ValidationError as e:
+        return "; ".join(error["msg"] for error in e.errors())
+    return None
+
+
+def _strip(schema: Any) -> Any:
+    if isinstance(schema, dict):
+        return {key: _strip(value) for key, value in schema.items() if key not in _UNSUPPORTED_KEYWORDS}
+    if isinstance(schema, list):
+        return [_strip(item) for item in schema]
+    return schema
+
+
+def puzzle_json_schema(fields: Optional[list[str]] = None) -> dict:
+    """
+    Strict JSON schema for the puzzle (or a subset of its fields)
+
+    Args:
+        fields: Only include these fields (used for repair requests)
+
+    Returns:
+        A ``response_format`` value for OpenAI structured outputs
+    """
+    properties = _strip(PuzzleContent.model_json_schema()["properties"])
+    if fields is not None:
+        properties = {name: properties[name] for name in fields}
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": "puzzle",
+            "strict": True,
+            "schema": {
+                "type": "object",
+                "properties": properties,
+                "required": list(properties),
+                "additionalProperties": False
+            }
+        }
+    }
@@ -0,0 +1,196 @@
+"""
+Production Server - Pre-forking launcher for the FastAPI app
+The parent imports the app once so workers fork with warm imports, binds the
+listening socket, and supervises one uvicorn server per worker process.
+Usage: python -m app.server [--host 0.0.0.0] [--port 8000] [--workers N]
+"""
+
+import argparse
+import logging
+import os
+import signal
+import socket
+import time
+from typing import Optional
+
+import uvicorn
+
+
+logger = logging.getLogger("app.server")
+
+# A worker that dies sooner than this after starting is restarted with a delay
+MIN_WORKER_UPTIME = 1.0
+
+
+def default_workers() -> int:
+    """WEB_CONCURRENCY, or the number of CPU cores this process may run on"""
+    configured = os.getenv("WEB_CONCURRENCY")
+    if configured:
+        return max(1, int(configured))
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # Not available on macOS
+        return os.cpu_count() or 1
+
+
+def use_shared_state(state_dir: str):
+    """
+    Point rate limits, the puzzle cache, the puzzle pool and the job store
+    at SQLite files under ``state_dir`` so every worker sees the same state
+
+    Explicitly configured variables are left alone.
+    """
+    defaults = {
+        "ADMISSION_STORE": "sqlite",
+        "ADMISSION_STORE_PATH": os.path.join(state_dir, "admission.sqlite3"),
+        "PUZZLE_CACHE_SHARED_PATH": os.path.join(state_dir, "puzzles.sqlite3"),
+        "PUZZLE_POOL_SHARED_PATH": os.path.join(state_dir, "puzzle-pool.sqlite3"),
+        "JOB_STORE": "sqlite",
+        "JOB_STORE_PATH": os.path.join(state_dir, "jobs.sqlite3"),
+        # Running jobs of live workers are updated at every stage
+        "JOB_RECOVER_AFTER": "300",
+    }
+    for name, value in defaults.items():
+        os.environ.setdefault(name, value)
+
+
+def bind_socket(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+class Supervisor:
+    """
+    Forks ``workers`` uvicorn servers sharing one socket and keeps them running
+
+    On SIGTERM or SIGINT the signal is passed on as SIGTERM; each worker stops
+    accepting connections, finishes in-flight requests and queued-job work
+    within its graceful timeouts, and is killed if it overruns ``stop_timeout``.
+
+    Args:
+        app: ASGI application (imported before forking)
+        sock: Bound listening socket
+        workers: Number of worker processes
+        config: Keyword arguments for uvicorn.Config
+        stop_timeout: Seconds to wait for workers after a stop signal
+    """
+
+    def __init__(self, app, sock: socket.socket, workers: int, config: dict, stop_timeout: float):
+        self.app = app
+        self.sock = sock
+        self.workers = workers
+        self.config = config
+        self.stop_timeout = stop_timeout
+        self._children: dict[int, tuple[int, float]] = {}  # pid -> (index, started)
+        self._deadline: Optional[float] = None
+
+    def _spawn(self, index: int):
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                code = self._serve(index)
+            finally:
+                os._exit(code)
+        self._children[pid] = (index, time.monotonic())
+
+    def _serve(self, index: int) -> int:
+        # Own process group: a terminal Ctrl-C reaches only the supervisor,
+        # which sends a single SIGTERM (a second signal would force-exit uvicorn)
+        os.setpgid(0, 0)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        os.environ["SERVER_WORKER_INDEX"] = str(index)
+        pool_path = os.getenv("PUZZLE_POOL_PATH", ".cache/puzzle-pool.json")
+        if pool_path and not os.getenv("PUZZLE_POOL_SHARED_PATH"):
+            # Without the shared pool each worker keeps its own; they would overwrite one file
+            root, extension = os.path.splitext(pool_path)
+            os.environ["PUZZLE_POOL_PATH"] = f"{root}.{index}{extension}"
+        server = uvicorn.Server(uvicorn.Config(self.app, **self.config))
+        server.run(sockets=[self.sock])
+        return 0 if server.started else 1
+
+    def _stop(self, signum, frame):
+        if self._deadline is not None:
+            return
+        logger.info("Received %s, stopping %d workers", signal.Signals(signum).name, len(self._children))
+        self._deadline = time.monotonic() + self.stop_timeout
+        for pid in self._children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+        for index in range(self.workers):
+            self._spawn(index)
+        logger.info("Started %d workers: %s", self.workers, ", ".join(map(str, self._children)))
+
+        while self._children:
+            if self._deadline is not None and time.monotonic() > self._deadline:
+                for pid in self._children:
+                    logger.warning("Worker %d did not stop in time, killing it", pid)
+                    os.kill(pid, signal.SIGKILL)
+                self._deadline = float("inf")
+            pid, status = os.waitpid(-1, os.WNOHANG)
+            if pid == 0:
+                time.sleep(0.1)
+                continue
+            index, started = self._children.pop(pid)
+            if self._deadline is not None:
+                continue
+            logger.warning("Worker %d exited with status %d, restarting", pid, os.waitstatus_to_exitcode(status))
+            if time.monotonic() - started < MIN_WORKER_UPTIME:
+                time.sleep(MIN_WORKER_UPTIME)
+            self._spawn(index)
+        self.sock.close()
+
+
+def main(argv: Optional[list[str]] = None):
+    parser = argparse.ArgumentParser(description="Run the CryptoHunter API")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=None, help="default: WEB_CONCURRENCY or CPU cores")
+    parser.add_argument("--state-dir", default=os.getenv("SERVER_STATE_DIR", ".cache"),
+                        help="directory for state shared between workers")
+    parser.add_argument("--log-level", default=os.getenv("LOG_LEVEL", "info"))
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=args.log_level.upper(), format="%(levelname)s:     %(message)s")
+    workers = args.workers or default_workers()
+    if workers > 1:
+        use_shared_state(args.state_dir)
+
+    # Preload: import the app and the service modules (openai, aiohttp, ...)
+    # the app itself only loads on first use, and compile the prompt packs
+    # once; forked workers inherit all of it
+    from app.dependencies import preload
+    from app.main import app
+    from app.services.prompts import PromptLibrary
+    preload()
+    PromptLibrary.from_env()
+
+    graceful = float(os.getenv("SHUTDOWN_GRACE_PERIOD", "30"))
+    config = {
+        "log_level": args.log_level,
+        "timeout_graceful_shutdown": graceful,
+        "proxy_headers": True,
+    }
+    if workers == 1:
+        uvicorn.Server(uvicorn.Config(app, host=args.host, port=args.port, **config)).run()
+        return
+
+    drain = float(os.getenv("SHUTDOWN_DRAIN_TIMEOUT", "30"))
+    sock = bind_socket(args.host, args.port)
+    Supervisor(app, sock, workers, config, stop_timeout=graceful + drain + 5).run()
+
+
+if __name__ == "__main__":
+    main()
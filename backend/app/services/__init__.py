@@ -1,8 +1,26 @@
 """
 Services package for CryptoHunter Backend
+Exports are resolved on first access, so importing one service module does
+not pull in the SDKs of all the others
 """
 
-from app.services.openai_service import OpenAIService
-from app.services.ipfs_service import IPFSService
+import importlib
 
-__all__ = ["OpenAIService", "IPFSService"]
+_EXPORTS = {
+    "OpenAIService": "app.services.openai_service",
+    "IPFSService": "app.services.ipfs_service",
+    "TreasureMapPipeline": "app.services.pipeline",
+    "PipelineError": "app.services.pipeline",
+    "PuzzleCache": "app.services.puzzle_cache",
+    "PuzzleCacheMiss": "app.services.puzzle_cache",
+    "AnswerChecker": "app.services.answer_checker",
+    "UnknownMap": "app.services.answer_checker",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(_EXPORTS[name]), name)
@@ -0,0 +1,287 @@
+"""
+Admission Control - Per-client rate limits and per-endpoint-class load shedding
+Expensive endpoints (LLM, image, IPFS, relayed transactions) are limited per client IP and wallet
+address, capped in concurrency, and shed with Retry-After when their queues
+are full
+"""
+
+import asyncio
+import json
+import math
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from app.utils.helpers import validate_ethereum_address
+from app.utils.metrics import REGISTRY
+from app.utils.rate_limit import BucketStore, MemoryBucketStore, SQLiteBucketStore
+
+
+ADMISSION_DECISIONS = REGISTRY.counter(
+    "admission_decisions_total",
+    "Admission decisions by endpoint class (admitted, rate_limited, shed, timeout)",
+    labels=("endpoint_class", "decision")
+)
+
+# (method, path prefix, endpoint class); first match wins, unmatched
+# requests (health, metrics, map reads) bypass admission control
+ENDPOINT_CLASSES = (
+    ("POST", "/api/generate-image", "image"),
+    ("POST", "/api/create-treasure-map", "image"),
+    ("POST", "/api/jobs/create-treasure-map", "image"),
+    ("POST", "/api/generate-puzzle", "llm"),
+    ("POST", "/api/batch", "llm"),
+    ("POST", "/api/check-answer", "llm"),
+    ("POST", "/api/upload-ipfs", "ipfs"),
+    ("GET", "/api/ipfs/", "ipfs"),
+    ("POST", "/api/chain/", "chain"),
+)
+
+DEFAULT_LIMITS = {
+    "llm": {"per_minute": 30, "burst": 10, "concurrency": 32, "max_queue": 64},
+    "image": {"per_minute": 6, "burst": 3, "concurrency": 8, "max_queue": 16},
+    "ipfs": {"per_minute": 120, "burst": 30, "concurrency": 64, "max_queue": 128},
+    "chain": {"per_minute": 6, "burst": 3, "concurrency": 8, "max_queue": 16},
+}
+
+WALLET_HEADER = "x-wallet-address"
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is refused; carries the HTTP status and Retry-After"""
+
+    def __init__(self, status: int, detail: str, retry_after: float):
+        super().__init__(detail)
+        self.status = status
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class EndpointClass:
+    """
+    Limits and live counters for one endpoint class
+
+    Args:
+        name: Class name (llm, image, ipfs, chain)
+        per_minute: Requests per minute per client key (0 disables)
+        burst: Bucket capacity per client key
+        concurrency: Requests served at once in this process
+        max_queue: Requests allowed to wait for a slot before shedding
+    """
+
+    def __init__(self, name: str, per_minute: float, burst: float, concurrency: int, max_queue: int):
+        self.name = name
+        self.per_minute = per_minute
+        self.burst = burst
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.in_flight = 0
+        self.waiting = 0
+        self.avg_seconds = 1.0  # EWMA of time holding a slot, for Retry-After
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    def retry_after(self) -> float:
+        """Rough time for the current queue to drain"""
+        return (self.waiting + 1) * self.avg_seconds / max(1, self.concurrency)
+
+    @asynccontextmanager
+    async def slot(self, queue_timeout: float):
+        """
+        Hold one concurrency slot for the enclosed request
+
+        Raises:
+            AdmissionRejected: 503 if the queue is full or the wait times out
+        """
+        if not self._semaphore.locked():
+            await self._semaphore.acquire()  # Free slot: returns without suspending
+        elif self.waiting >= self.max_queue:
+            ADMISSION_DECISIONS.inc(endpoint_class=self.name, decision="shed")
+            raise AdmissionRejected(503, f"Too many {self.name} requests in progress", self.retry_after())
+        else:
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), queue_timeout)
+            except asyncio.TimeoutError:
+                ADMISSION_DECISIONS.inc(endpoint_class=self.name, decision="timeout")
+                raise AdmissionRejected(503, f"Timed out waiting for a {self.name} slot", self.retry_after())
+            finally:
+                self.waiting -= 1
+        ADMISSION_DECISIONS.inc(endpoint_class=self.name, decision="admitted")
+        self.in_flight += 1
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+            self.avg_seconds += 0.2 * (time.monotonic() - started - self.avg_seconds)
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "concurrency": self.concurrency,
+            "max_queue": self.max_queue,
+            "per_minute": self.per_minute,
+            "avg_seconds": round(self.avg_seconds, 3)
+        }
+
+
+class AdmissionController:
+    """
+    Decides whether a request may run now, wait, or be refused
+
+    Args:
+        classes: Endpoint class name -> EndpointClass
+        store: Token buckets for per-IP / per-wallet rate limits; use a
+            SQLiteBucketStore to share them between worker processes
+        queue_timeout: Longest a request may wait for a concurrency slot
+        trust_forwarded: Take the client IP from X-Forwarded-For (only
+            behind a trusted proxy)
+    """
+
+    def __init__(
+        self,
+        classes: dict[str, EndpointClass],
+        store: Optional[BucketStore] = None,
+        queue_timeout: float = 30.0,
+        trust_forwarded: bool = False
+    ):
+        self.classes = classes
+        self.store = store if store is not None else MemoryBucketStore()
+        self.queue_timeout = queue_timeout
+        self.trust_forwarded = trust_forwarded
+
+    @classmethod
+    def from_env(cls) -> Optional["AdmissionController"]:
+        """
+        Build from ADMISSION_* variables; None unless ADMISSION_ENABLED is set
+
+        Per class: ADMISSION_<CLASS>_PER_MINUTE, _BURST, _CONCURRENCY and
+        _QUEUE. ADMISSION_STORE=sqlite (with ADMISSION_STORE_PATH) shares
+        rate limits across workers; concurrency caps are per process.
+
+        ADMISSION_TRUST_FORWARDED must be set as well (to true behind a
+        proxy, false when clients connect directly). Behind a proxy without
+        it, every client shares the proxy's IP bucket.
+
+        Raises:
+            ValueError: If admission is enabled without ADMISSION_TRUST_FORWARDED
+        """
+        if os.getenv("ADMISSION_ENABLED", "false").lower() not in ("1", "true", "yes"):
+            return None
+        trust_forwarded = os.getenv("ADMISSION_TRUST_FORWARDED")
+        if trust_forwarded is None:
+            raise ValueError(
+                "ADMISSION_ENABLED requires ADMISSION_TRUST_FORWARDED "
+                "(true behind a reverse proxy, false otherwise)"
+            )
+        classes = {}
+        for name, defaults in DEFAULT_LIMITS.items():
+            prefix = f"ADMISSION_{name.upper()}_"
+            classes[name] = EndpointClass(
+                name,
+                per_minute=float(os.getenv(prefix + "PER_MINUTE", defaults["per_minute"])),
+                burst=float(os.getenv(prefix + "BURST", defaults["burst"])),
+                concurrency=int(os.getenv(prefix + "CONCURRENCY", defaults["concurrency"])),
+                max_queue=int(os.getenv(prefix + "QUEUE", defaults["max_queue"]))
+            )
+        store = None
+        if os.getenv("ADMISSION_STORE", "memory") == "sqlite":
+            store = SQLiteBucketStore(os.getenv("ADMISSION_STORE_PATH", ".cache/admission.sqlite3"))
+        return cls(
+            classes,
+            store=store,
+            queue_timeout=float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "30")),
+            trust_forwarded=trust_forwarded.lower() in ("1", "true", "yes")
+        )
+
+    def classify(self, method: str, path: str) -> Optional[EndpointClass]:
+        """Endpoint class for a request, or None if it is not limited"""
+        for rule_method, prefix, name in ENDPOINT_CLASSES:
+            if method == rule_method and path.startswith(prefix) and name in self.classes:
+                return self.classes[name]
+        return None
+
+    def client_ip(self, scope: dict, headers: dict[str, str]) -> str:
+        forwarded = headers.get("x-forwarded-for")
+        if self.trust_forwarded and forwarded:
+            return forwarded.split(",")[0].strip()
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+    async def check_rate(self, endpoint: EndpointClass, ip: str, wallet: Optional[str]):
+        """
+        Take a token from the client's IP bucket and, if given, wallet bucket;
+        nothing is taken unless both have one
+
+        Raises:
+            AdmissionRejected: 400 for a malformed wallet address, 429 when
+                either bucket is empty
+        """
+        if endpoint.per_minute <= 0:
+            return
+        keys = [f"{endpoint.name}:ip:{ip}"]
+        if wallet is not None:
+            if not validate_ethereum_address(wallet):
+                raise AdmissionRejected(400, "Invalid X-Wallet-Address header", 0)
+            keys.append(f"{endpoint.name}:wallet:{wallet.lower()}")
+        # All or nothing, so a wallet rejection does not also spend the IP's token
+        rate = endpoint.per_minute / 60.0
+        if self.store.blocking:
+            wait = await asyncio.to_thread(self.store.take_all, keys, rate, endpoint.burst)
+        else:
+            wait = self.store.take_all(keys, rate, endpoint.burst)
+        if wait > 0:
+            ADMISSION_DECISIONS.inc(endpoint_class=endpoint.name, decision="rate_limited")
+            raise AdmissionRejected(429, f"Rate limit exceeded for {endpoint.name} requests", wait)
+
+    def stats(self) -> dict:
+        return {
+            "classes": {name: endpoint.stats() for name, endpoint in self.classes.items()},
+            "store": type(self.store).__name__
+        }
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware applying an AdmissionController
+
+    Written as raw ASGI (not an http middleware function) so the
+    concurrency slot is held until a streamed response body finishes.
+    """
+
+    def __init__(self, app, controller: AdmissionController):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        endpoint = self.controller.classify(scope["method"], scope["path"])
+        if endpoint is None:
+            await self.app(scope, receive, send)
+            return
+
+        headers = {key.decode("latin-1"): value.decode("latin-1") for key, value in scope["headers"]}
+        try:
+            await self.controller.check_rate(
+                endpoint,
+                self.controller.client_ip(scope, headers),
+                headers.get(WALLET_HEADER)
+            )
+            async with endpoint.slot(self.controller.queue_timeout):
+                await self.app(scope, receive, send)
+        except AdmissionRejected as e:
+            await _reject(send, e)
+
+
+async def _reject(send, rejection: AdmissionRejected):
+    body = json.dumps({"detail": rejection.detail}).encode()
+    headers = [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+    if rejection.status in (429, 503):
+        headers.append((b"retry-after", str(max(1, math.ceil(rejection.retry_after))).encode()))
+    await send({"type": "http.response.start", "status": rejection.status, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,295 @@
+"""
+Answer Checker - Off-chain answer pre-check
+Matches guesses against each map's answer, aliases and an edit-distance
+index so hopeless commits are rejected before they cost gas
+"""
+
+import os
+import re
+import unicodedata
+from collections import OrderedDict
+from typing import Optional
+
+from app.utils.helpers import hash_answer
+from app.utils.metrics import REGISTRY
+
+
+VERDICTS = ("match", "ambiguous", "mismatch")
+
+ANSWER_CHECKS = REGISTRY.counter(
+    "answer_checks_total",
+    "Off-chain answer pre-checks by verdict and deciding source",
+    labels=("verdict", "source")
+)
+
+_LEADING_ARTICLE = re.compile(r"^(?:the|a|an)\s+")
+# Thousands separators go; decimal points between digits are kept
+_DIGIT_COMMA = re.compile(r"(?<=\d)[,，](?=\d)")
+_DIGIT_POINT = re.compile(r"(?<=\d)\.(?=\d)")
+
+
+class UnknownMap(LookupError):
+    """Raised when no answer is registered for an answer hash"""
+
+
+def normalize_answer(text: str) -> str:
+    """
+    Normalize an answer for comparison
+
+    NFKC folds full-width and compatibility forms (common with CJK input
+    methods), case is folded, a leading English article is dropped and all
+    punctuation, whitespace and control characters are removed.
+
+    Args:
+        text: Raw answer
+
+    Returns:
+        Normalized answer (may be empty)
+    """
+    text = unicodedata.normalize("NFKC", text).casefold().strip()
+    text = _LEADING_ARTICLE.sub("", text)
+    text = _DIGIT_COMMA.sub("", text)
+    return "".join(
+        ch for i, ch in enumerate(text)
+        if unicodedata.category(ch)[0] not in "PZC" or (ch == "." and _DIGIT_POINT.match(text, i))
+    )
+
+
+def max_distance(length: int) -> int:
+    """Edit distance still considered a near miss for an answer of this length"""
+    if length <= 2:
+        return 0
+    if length <= 5:
+        return 1
+    return 2
+
+
+def bounded_levenshtein(a: str, b: str, limit: int) -> Optional[int]:
+    """
+    Levenshtein distance between two strings, giving up past ``limit``
+
+    Only a diagonal band of width 2 * limit + 1 is evaluated, so the cost is
+    O(len * limit) rather than O(len^2).
+
+    Returns:
+        The distance, or None if it exceeds ``limit``
+    """
+    if abs(len(a) - len(b)) > limit:
+        return None
+    if len(a) > len(b):
+        a, b = b, a
+    beyond = limit + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        low, high = max(1, i - limit), min(len(b), i + limit)
+        current = [beyond] * (len(b) + 1)
+        if low == 1:
+            current[0] = i
+        best = current[0]
+        for j in range(low, high + 1):
+            cost = 0 if char_a == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            current[j] = value
+            if value < best:
+                best = value
+        if best > limit:
+            return None
+        previous = current
+    distance = previous[len(b)]
+    return distance if distance <= limit else None
+
+
+class AnswerProfile:
+    """
+    Answer, aliases and match index for one treasure map
+
+    Args:
+        answer: Canonical answer as hashed on-chain
+        aliases: Other accepted phrasings generated with the puzzle
+        question: Puzzle question, used when an ambiguous guess goes to GPT
+        cache_size: Verdicts remembered for this map
+    """
+
+    def __init__(
+        self,
+        answer: str,
+        aliases: Optional[list[str]] = None,
+        question: str = "",
+        cache_size: int = 256
+    ):
+        self.answer = answer
+        self.answer_hash = hash_answer(answer)
+        self.question = question
+        self.aliases = [alias for alias in (aliases or []) if alias and alias != answer]
+        # normalized variant -> "exact" | "alias"
+        self.variants: dict[str, str] = {}
+        for alias in self.aliases:
+            normalized = normalize_answer(alias)
+            if normalized:
+                self.variants[normalized] = "alias"
+        self.variants[normalize_answer(answer)] = "exact"
+        # Variants bucketed by length so fuzzy lookups skip impossible lengths
+        self._by_length: dict[int, list[str]] = {}
+        for variant in self.variants:
+            self._by_length.setdefault(len(variant), []).append(variant)
+        self.cache_size = cache_size
+        self._verdicts: OrderedDict[str, dict] = OrderedDict()
+
+    def _nearest(self, guess: str) -> Optional[int]:
+        limit = max_distance(len(guess))
+        best = None
+        for length in range(len(guess) - limit, len(guess) + limit + 1):
+            for variant in self._by_length.get(length, ()):
+                distance = bounded_levenshtein(guess, variant, min(limit, max_distance(len(variant))))
+                if distance is not None and (best is None or distance < best):
+                    best = distance
+        return best
+
+    def _contains(self, guess: str) -> bool:
+        """Guess embeds a variant (or the reverse) with little extra text"""
+        for variant in self.variants:
+            shorter, longer = sorted((guess, variant), key=len)
+            if len(shorter) >= 2 and shorter in longer and len(longer) <= 2 * len(shorter) + 2:
+                return True
+        return False
+
+    def evaluate(self, normalized: str) -> dict:
+        """Classify a normalized guess without consulting the cache"""
+        source = self.variants.get(normalized)
+        if source is not None:
+            return {"verdict": "match", "source": source, "distance": 0}
+        if normalized:
+            distance = self._nearest(normalized)
+            if distance is not None:
+                return {"verdict": "ambiguous", "source": "fuzzy", "distance": distance}
+            if self._contains(normalized):
+                return {"verdict": "ambiguous", "source": "contains", "distance": None}
+        return {"verdict": "mismatch", "source": "index", "distance": None}
+
+    def cached(self, normalized: str) -> Optional[dict]:
+        verdict = self._verdicts.get(normalized)
+        if verdict is not None:
+            self._verdicts.move_to_end(normalized)
+        return verdict
+
+    def remember(self, normalized: str, verdict: dict):
+        self._verdicts[normalized] = verdict
+        self._verdicts.move_to_end(normalized)
+        while len(self._verdicts) > self.cache_size:
+            self._verdicts.popitem(last=False)
+
+
+class AnswerChecker:
+    """
+    In-memory answer pre-check index keyed by on-chain answer hash
+
+    Maps are registered when their puzzle is generated. ``check`` is pure
+    CPU work (normalization, dictionary lookups and a banded edit distance
+    over a handful of variants) and never calls out; callers decide whether
+    to escalate "ambiguous" verdicts to GPT.
+
+    Args:
+        max_maps: Registered maps kept before the least recently used is dropped
+        cache_size: Verdicts remembered per map
+    """
+
+    def __init__(self, max_maps: int = 10000, cache_size: int = 256):
+        self.max_maps = max_maps
+        self.cache_size = cache_size
+        self._maps: OrderedDict[str, AnswerProfile] = OrderedDict()
+        self._stats = {"checks": 0, "cache_hits": 0, "registered": 0, "evictions": 0}
+
+    @classmethod
+    def from_env(cls) -> "AnswerChecker":
+        """Build a checker from ANSWER_CHECK_* environment variables"""
+        return cls(
+            max_maps=int(os.getenv("ANSWER_CHECK_MAX_MAPS", "10000")),
+            cache_size=int(os.getenv("ANSWER_CHECK_CACHE_SIZE", "256"))
+        )
+
+    def register(
+        self,
+        answer: str,
+        aliases: Optional[list[str]] = None,
+        question: str = ""
+    ) -> AnswerProfile:
+        """
+        Index a map's answer and aliases
+
+        Re-registering the same answer refreshes its aliases and question.
+
+        Returns:
+            The map's profile (``answer_hash`` is the lookup key)
+        """
+        profile = AnswerProfile(answer, aliases, question, self.cache_size)
+        existing = self._maps.get(profile.answer_hash)
+        if existing is not None and existing.aliases == profile.aliases and existing.question == question:
+            self._maps.move_to_end(profile.answer_hash)
+            return existing
+        self._maps[profile.answer_hash] = profile
+        self._stats["registered"] += 1
+        while len(self._maps) > self.max_maps:
+            self._maps.popitem(last=False)
+            self._stats["evictions"] += 1
+        return profile
+
+    def register_puzzle(self, puzzle: dict) -> Optional[AnswerProfile]:
+        """Register a generated puzzle dict (no-op if it has no answer)"""
+        answer = puzzle.get("answer")
+        if not answer:
+            return None
+        return self.register(answer, puzzle.get("aliases"), puzzle.get("question") or "")
+
+    def get(self, answer_hash: str) -> AnswerProfile:
+        """
+        Look up a registered map
+
+        Raises:
+            UnknownMap: If no answer is registered for the hash
+        """
+        profile = self._maps.get(answer_hash.lower())
+        if profile is None:
+            raise UnknownMap(answer_hash)
+        return profile
+
+    def check(self, answer_hash: str, guess: str) -> dict:
+        """
+        Pre-check a guess against a registered map
+
+        Args:
+            answer_hash: keccak256 of the canonical answer (0x-prefixed)
+            guess: Player's answer as typed
+
+        Returns:
+            Dictionary with verdict ("match", "ambiguous" or "mismatch"),
+            source, distance, whether the guess as typed would pass the
+            on-chain hash check and, for matches, the exact answer to commit
+
+        Raises:
+            UnknownMap: If no answer is registered for the hash
+        """
+        profile = self.get(answer_hash)
+        self._stats["checks"] += 1
+        normalized = normalize_answer(guess)
+        result = profile.cached(normalized)
+        if result is None:
+            result = profile.evaluate(normalized)
+            profile.remember(normalized, result)
+        else:
+            self._stats["cache_hits"] += 1
+        ANSWER_CHECKS.inc(verdict=result["verdict"], source=result["source"])
+        return {
+            **result,
+            "onchain_exact": guess == profile.answer,
+            "commit_answer": profile.answer if result["verdict"] == "match" else None
+        }
+
+    def resolve(self, answer_hash: str, guess: str, is_correct: bool):
+        """Cache an externally decided (e.g. GPT) verdict for a guess"""
+        profile = self.get(answer_hash)
+        verdict = "match" if is_correct else "mismatch"
+        profile.remember(normalize_answer(guess), {"verdict": verdict, "source": "ai", "distance": None})
+        ANSWER_CHECKS.inc(verdict=verdict, source="ai")
+
+    def stats(self) -> dict:
+        return {**self._stats, "maps": len(self._maps)}
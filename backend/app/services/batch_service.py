@@ -0,0 +1,274 @@
+"""
+Batch Service - Bulk puzzle and treasure map generation
+Fans many keyword sets out through the AI and IPFS services with bounded
+concurrency, provider rate limits and resumable, file-backed jobs
+"""
+
+import asyncio
+import fcntl
+import json
+import os
+import time
+import uuid
+from typing import IO, AsyncIterator, Optional
+
+from app.utils.rate_limit import TokenBucket
+
+
+BATCH_MODES = ("puzzle", "map")
+
+
+class BatchJobNotFound(LookupError):
+    """Raised when a batch job ID is unknown"""
+
+
+class BatchJobRunning(RuntimeError):
+    """Raised when a batch job is already being executed"""
+
+
+class BatchService:
+    """
+    Runs batch jobs and persists per-item results
+
+    Each job is stored as ``<job_id>.json`` (the request) plus
+    ``<job_id>.ndjson`` (one line per finished item). Resuming a job replays
+    the stored results and only re-runs items that never succeeded. A job
+    being run holds an flock on ``<job_id>.lock``, so it runs at most once
+    across every process sharing ``store_dir``; the OS drops the lock if
+    the process dies.
+    """
+
+    def __init__(
+        self,
+        openai_service,
+        pipeline,
+        store_dir: str = ".cache/batches",
+        max_concurrency: int = 8,
+        llm_per_minute: float = 60,
+        image_per_minute: float = 7
+    ):
+        self.openai_service = openai_service
+        self.pipeline = pipeline
+        self.store_dir = store_dir
+        self.max_concurrency = max_concurrency
+        # Shared across jobs so concurrent batches respect the provider quota
+        self.llm_bucket = TokenBucket.per_minute(llm_per_minute)
+        self.image_bucket = TokenBucket.per_minute(image_per_minute)
+
+    @classmethod
+    def from_env(cls, openai_service, pipeline) -> "BatchService":
+        """Build the service from BATCH_* environment variables"""
+        return cls(
+            openai_service,
+            pipeline,
+            store_dir=os.getenv("BATCH_STORE_DIR", ".cache/batches"),
+            max_concurrency=int(os.getenv("BATCH_MAX_CONCURRENCY", "8")),
+            llm_per_minute=float(os.getenv("BATCH_LLM_PER_MINUTE", "60")),
+            image_per_minute=float(os.getenv("BATCH_IMAGE_PER_MINUTE", "7"))
+        )
+
+    def _spec_path(self, job_id: str) -> str:
+        return os.path.join(self.store_dir, f"{job_id}.json")
+
+    def _results_path(self, job_id: str) -> str:
+        return os.path.join(self.store_dir, f"{job_id}.ndjson")
+
+    def _lock_path(self, job_id: str) -> str:
+        return os.path.join(self.store_dir, f"{job_id}.lock")
+
+    def create_job(
+        self,
+        items: list[dict],
+        mode: str = "puzzle",
+        concurrency: Optional[int] = None
+    ) -> str:
+        """
+        Persist a new batch job
+
+        Args:
+            items: Puzzle requests (keywords, difficulty, language, cache)
+            mode: "puzzle" for puzzles only, "map" for the full pipeline
+            concurrency: Requested parallelism, capped by max_concurrency
+
+        Returns:
+            Job ID
+        """
+        if mode not in BATCH_MODES:
+            raise ValueError(f"Unknown batch mode: {mode}")
+        if concurrency is not None and concurrency < 1:
+            raise ValueError(f"Batch concurrency must be at least 1, got {concurrency}")
+        os.makedirs(self.store_dir, exist_ok=True)
+        job_id = uuid.uuid4().hex
+        spec = {
+            "job_id": job_id,
+            "mode": mode,
+            "concurrency": min(concurrency or self.max_concurrency, self.max_concurrency),
+            "items": items,
+            "created_at": time.time()
+        }
+        with open(self._spec_path(job_id), "w", encoding="utf-8") as f:
+            json.dump(spec, f, ensure_ascii=False)
+        return job_id
+
+    def _load_spec(self, job_id: str) -> dict:
+        # Job IDs are hex UUIDs; anything else cannot be a stored job
+        if not job_id.isalnum():
+            raise BatchJobNotFound(job_id)
+        try:
+            with open(self._spec_path(job_id), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise BatchJobNotFound(job_id)
+
+    def _load_results(self, job_id: str) -> dict[int, dict]:
+        """Latest stored record per item index"""
+        results = {}
+        try:
+            with open(self._results_path(job_id), encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # Torn write from a crash
+                    results[record["index"]] = record
+        except FileNotFoundError:
+            pass
+        return results
+
+    def claim(self, job_id: str) -> IO:
+        """
+        Take the job's run lock
+
+        Returns:
+            Open lock file to pass to run(), which releases it. Closing the
+            file (or dropping it) releases the lock as well.
+
+        Raises:
+            BatchJobNotFound: If the job does not exist
+            BatchJobRunning: If another run holds the lock, in any process
+        """
+        self._load_spec(job_id)
+        lock = open(self._lock_path(job_id), "a")
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock.close()
+            raise BatchJobRunning(job_id)
+        return lock
+
+    def _is_running(self, job_id: str) -> bool:
+        try:
+            probe = open(self._lock_path(job_id))
+        except FileNotFoundError:
+            return False
+        with probe:
+            try:
+                fcntl.flock(probe, fcntl.LOCK_SH | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return True
+        return False
+
+    def status(self, job_id: str) -> dict:
+        """
+        Summarize a batch job
+
+        Returns:
+            Dictionary with totals and completed/failed counts
+        """
+        spec = self._load_spec(job_id)
+        results = self._load_results(job_id)
+        succeeded = sum(1 for record in results.values() if record["status"] == "ok")
+        return {
+            "job_id": job_id,
+            "mode": spec["mode"],
+            "total": len(spec["items"]),
+            "succeeded": succeeded,
+            "failed": len(results) - succeeded,
+            "pending": len(spec["items"]) - len(results),
+            "running": self._is_running(job_id)
+        }
+
+    async def _run_item(self, mode: str, item: dict) -> dict:
+        await self.llm_bucket.acquire()
+        if mode == "puzzle":
+            return await self.openai_service.generate_puzzle(
+                keywords=item["keywords"],
+                difficulty=item.get("difficulty") or "medium",
+                language=item.get("language") or "zh",
+                cache=item.get("cache") or "prefer"
+            )
+        await self.image_bucket.acquire()
+        return await self.pipeline.run(
+            keywords=item["keywords"],
+            difficulty=item.get("difficulty") or "medium",
+            language=item.get("language") or "zh",
+            cache=item.get("cache") or "prefer"
+        )
+
+    async def run(self, job_id: str, lock: Optional[IO] = None) -> AsyncIterator[dict]:
+        """
+        Execute (or resume) a batch job, yielding results as they complete
+
+        Previously successful items are replayed first. Each item failure is
+        reported in its own record and does not affect the others.
+
+        Args:
+            job_id: Job to run
+            lock: Lock from claim(); taken here if not given
+
+        Yields:
+            {"event": "job"|"item"|"done", "data": ...} dictionaries
+        """
+        if lock is None:
+            lock = self.claim(job_id)
+
+        with lock:
+            spec = self._load_spec(job_id)
+            done = {
+                index: record
+                for index, record in self._load_results(job_id).items()
+                if record["status"] == "ok"
+            }
+            pending = [index for index in range(len(spec["items"])) if index not in done]
+            yield {
+                "event": "job",
+                "data": {"job_id": job_id, "total": len(spec["items"]), "resumed": len(done)}
+            }
+            for record in done.values():
+                yield {"event": "item", "data": record}
+
+            queue: asyncio.Queue = asyncio.Queue()
+            # Jobs stored before concurrency was validated may hold 0 or less
+            semaphore = asyncio.Semaphore(max(1, spec["concurrency"]))
+
+            async def worker(index: int):
+                async with semaphore:
+                    try:
+                        result = await self._run_item(spec["mode"], spec["items"][index])
+                        record = {"index": index, "status": "ok", "result": result}
+                    except Exception as e:
+                        record = {"index": index, "status": "error", "error": str(e)}
+                with open(self._results_path(job_id), "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                await queue.put(record)
+
+            tasks = [asyncio.create_task(worker(index)) for index in pending]
+            failed = 0
+            try:
+                for _ in range(len(tasks)):
+                    record = await queue.get()
+                    failed += record["status"] != "ok"
+                    yield {"event": "item", "data": record}
+            finally:
+                # A dropped stream stops the job; it can be resumed later
+                for task in tasks:
+                    task.cancel()
+
+            yield {
+                "event": "done",
+                "data": {
+                    "job_id": job_id,
+                    "succeeded": len(spec["items"]) - failed,
+                    "failed": failed
+                }
+            }
@@ -0,0 +1,774 @@
+"""
+Chain Indexer - Local read model of TreasureMap contract events
+Streams MapCreated / MapUnlocked / AnswerCommitted / AnswerIsWrong /
+PrizeClaimed logs in block-range batches into SQLite, with reorg-safe
+checkpoints, so map listings don't need an RPC round trip per page view
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from typing import TYPE_CHECKING, Optional
+
+from eth_hash.auto import keccak
+
+from app.utils.resilience import CircuitBreaker, RetryPolicy, Upstream, UpstreamError
+
+if TYPE_CHECKING:
+    import aiohttp
+
+
+@lru_cache(maxsize=None)
+def _abi_decode():
+    """Import eth_abi (slow to load) on the first decode instead of at startup"""
+    from eth_abi import decode
+    return decode
+
+
+def _topic(signature: str) -> str:
+    return "0x" + keccak(signature.encode()).hex()
+
+
+EVENT_SIGNATURES = {
+    "MapCreated": "MapCreated(uint256,address,uint256,uint256)",
+    "MapUnlocked": "MapUnlocked(uint256,address)",
+    "AnswerCommitted": "AnswerCommitted(uint256,address,bytes32)",
+    "AnswerIsWrong": "AnswerIsWrong(uint256,address)",
+    "PrizeClaimed": "PrizeClaimed(uint256,address,uint256)",
+}
+EVENT_TOPICS = {_topic(signature): name for name, signature in EVENT_SIGNATURES.items()}
+# Non-indexed event parameters, ABI-encoded in the log data
+EVENT_DATA_TYPES = {
+    "MapCreated": (("prize_pool", "uint256"), ("entry_fee", "uint256")),
+    "MapUnlocked": (),
+    "AnswerCommitted": (("commit_hash", "bytes32"),),
+    "AnswerIsWrong": (),
+    "PrizeClaimed": (("amount", "uint256"),),
+}
+GET_MAP_SELECTOR = _topic("getMap(uint256)")[:10]
+GET_MAP_TYPES = ("address", "string", "string", "uint256", "uint256", "bool", "address")
+
+MAP_SORTS = {"created": "created_block", "prize_pool": "prize_pool", "entry_fee": "entry_fee"}
+
+
+class ChainSourceError(Exception):
+    """Raised when a log source cannot serve a request"""
+
+
+def decode_log(log: dict) -> Optional[dict]:
+    """
+    Decode a raw eth_getLogs entry from the TreasureMap contract
+
+    Returns:
+        Flat event dictionary, or None for unrelated topics
+    """
+    topics = log.get("topics") or []
+    name = EVENT_TOPICS.get(topics[0].lower()) if topics else None
+    if name is None:
+        return None
+    event = {
+        "event": name,
+        "block_number": int(log["blockNumber"], 16),
+        "block_hash": log["blockHash"],
+        "log_index": int(log["logIndex"], 16),
+        "tx_hash": log.get("transactionHash"),
+        "map_id": int(topics[1], 16),
+        "account": "0x" + topics[2][-40:].lower(),
+    }
+    fields = EVENT_DATA_TYPES[name]
+    if fields:
+        values = _abi_decode()([kind for _, kind in fields], bytes.fromhex(log["data"].removeprefix("0x")))
+        for (field, kind), value in zip(fields, values):
+            event[field] = "0x" + value.hex() if kind == "bytes32" else value
+    return event
+
+
+def _word(value: int) -> str:
+    """uint256 as fixed-width hex so SQLite text ordering is numeric ordering"""
+    return format(value, "064x")
+
+
+class LogSource(ABC):
+    """Where the indexer reads chain data from"""
+
+    @abstractmethod
+    async def head(self) -> int:
+        """Latest block number"""
+
+    @abstractmethod
+    async def block_hash(self, number: int) -> Optional[str]:
+        """Hash of a block, or None if the source does not have it"""
+
+    @abstractmethod
+    async def get_logs(self, from_block: int, to_block: int) -> list[dict]:
+        """Contract logs in an inclusive block range"""
+
+    async def get_map(self, map_id: int) -> Optional[dict]:
+        """Static map fields (name, metadata URI) not carried by events"""
+        return None
+
+    async def close(self):
+        pass
+
+
+class RPCLogSource(LogSource):
+    """
+    JSON-RPC log source (any node, e.g. a local Hardhat node)
+
+    Args:
+        rpc_url: Node HTTP endpoint
+        address: TreasureMap contract address
+        timeout: Per-request timeout in seconds
+    """
+
+    def __init__(self, rpc_url: str, address: str, timeout: float = 30.0):
+        self.rpc_url = rpc_url
+        self.address = address.lower()
+        self.upstream = Upstream(
+            "chain-rpc",
+            timeout=timeout,
+            retry=RetryPolicy(
+                attempts=int(os.getenv("CHAIN_RPC_RETRY_ATTEMPTS", "3")),
+                base_delay=float(os.getenv("CHAIN_RPC_RETRY_BASE_DELAY", "0.5"))
+            ),
+            breaker=CircuitBreaker(
+                failure_threshold=int(os.getenv("CHAIN_RPC_BREAKER_FAILURES", "5")),
+                reset_timeout=float(os.getenv("CHAIN_RPC_BREAKER_RESET", "30"))
+            )
+        )
+        self._session: Optional["aiohttp.ClientSession"] = None
+        self._ids = 0
+
+    async def _rpc(self, method: str, params: list):
+        if self._session is None or self._session.closed:
+            import aiohttp
+            self._session = aiohttp.ClientSession()
+        self._ids += 1
+        payload = {"jsonrpc": "2.0", "id": self._ids, "method": method, "params": params}
+
+        async def attempt():
+            async with self._session.post(self.rpc_url, json=payload) as response:
+                if response.status != 200:
+                    raise UpstreamError(f"RPC {method} failed: HTTP {response.status}", status=response.status)
+                return await response.json(content_type=None)
+
+        body = await self.upstream.call(attempt)
+        if body.get("error"):
+            raise ChainSourceError(f"RPC {method} failed: {body['error'].get('message')}")
+        return body["result"]
+
+    async def head(self) -> int:
+        return int(await self._rpc("eth_blockNumber", []), 16)
+
+    async def block_hash(self, number: int) -> Optional[str]:
+        block = await self._rpc("eth_getBlockByNumber", [hex(number), False])
+        return block["hash"] if block else None
+
+    async def get_logs(self, from_block: int, to_block: int) -> list[dict]:
+        return await self._rpc("eth_getLogs", [{
+            "address": self.address,
+            "fromBlock": hex(from_block),
+            "toBlock": hex(to_block),
+            "topics": [list(EVENT_TOPICS)],
+        }])
+
+    async def get_map(self, map_id: int) -> Optional[dict]:
+        data = GET_MAP_SELECTOR + format(map_id, "064x")
+        try:
+            result = await self._rpc("eth_call", [{"to": self.address, "data": data}, "latest"])
+        except ChainSourceError:
+            return None  # Reverted, e.g. the map was reorged away
+        _, name, metadata_uri, *_ = _abi_decode()(GET_MAP_TYPES, bytes.fromhex(result.removeprefix("0x")))
+        return {"name": name, "metadata_uri": metadata_uri}
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+class FixtureLogSource(LogSource):
+    """
+    Log source replaying a recorded fixture file
+
+    The fixture is JSON with ``head``, ``blocks`` (number -> hash), ``logs``
+    (raw eth_getLogs entries) and optionally ``maps`` (map ID -> getMap
+    fields), as written by ``record_fixture``. Only blocks carrying logs and
+    the head need recorded hashes.
+    """
+
+    def __init__(self, path: str):
+        with open(path, encoding="utf-8") as f:
+            fixture = json.load(f)
+        self.fixture_head = fixture["head"]
+        self.blocks = {int(number): block_hash for number, block_hash in fixture["blocks"].items()}
+        self.logs = fixture["logs"]
+        self.maps = {int(map_id): fields for map_id, fields in fixture.get("maps", {}).items()}
+
+    async def head(self) -> int:
+        return self.fixture_head
+
+    async def block_hash(self, number: int) -> Optional[str]:
+        if number > self.fixture_head:
+            return None
+        # Blocks without recorded logs get a stable stand-in hash
+        return self.blocks.get(number) or _topic(f"fixture-block:{number}")
+
+    async def get_logs(self, from_block: int, to_block: int) -> list[dict]:
+        return [
+            log for log in self.logs
+            if from_block <= int(log["blockNumber"], 16) <= to_block
+        ]
+
+    async def get_map(self, map_id: int) -> Optional[dict]:
+        return self.maps.get(map_id)
+
+
+class ChainStore:
+    """
+    SQLite read model: raw events plus materialized maps and unlocks
+
+    Materialized rows are a pure function of the events table, so rolling
+    back a reorg deletes the orphaned events and replays the rest for the
+    affected maps.
+    """
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS events ("
+            " block_number INTEGER NOT NULL,"
+            " log_index INTEGER NOT NULL,"
+            " block_hash TEXT NOT NULL,"
+            " tx_hash TEXT,"
+            " event TEXT NOT NULL,"
+            " map_id INTEGER NOT NULL,"
+            " account TEXT NOT NULL,"
+            " data TEXT NOT NULL,"
+            " PRIMARY KEY (block_number, log_index));"
+            "CREATE INDEX IF NOT EXISTS events_map ON events (map_id, block_number, log_index);"
+            "CREATE TABLE IF NOT EXISTS maps ("
+            " map_id INTEGER PRIMARY KEY,"
+            " creator TEXT NOT NULL,"
+            " prize_pool TEXT NOT NULL,"
+            " entry_fee TEXT NOT NULL,"
+            " solved INTEGER NOT NULL DEFAULT 0,"
+            " winner TEXT,"
+            " claimed_amount TEXT,"
+            " unlock_count INTEGER NOT NULL DEFAULT 0,"
+            " attempt_count INTEGER NOT NULL DEFAULT 0,"
+            " wrong_count INTEGER NOT NULL DEFAULT 0,"
+            " created_block INTEGER NOT NULL,"
+            " updated_block INTEGER NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS maps_open_prize ON maps (solved, prize_pool);"
+            "CREATE INDEX IF NOT EXISTS maps_creator ON maps (creator, created_block);"
+            "CREATE TABLE IF NOT EXISTS unlocks ("
+            " map_id INTEGER NOT NULL,"
+            " player TEXT NOT NULL,"
+            " block_number INTEGER NOT NULL,"
+            " PRIMARY KEY (map_id, player));"
+            "CREATE INDEX IF NOT EXISTS unlocks_player ON unlocks (player, block_number);"
+            "CREATE TABLE IF NOT EXISTS map_details ("
+            " map_id INTEGER PRIMARY KEY,"
+            " name TEXT,"
+            " metadata_uri TEXT);"
+            "CREATE TABLE IF NOT EXISTS checkpoints ("
+            " block_number INTEGER PRIMARY KEY,"
+            " block_hash TEXT NOT NULL);"
+        )
+        self._lock = threading.Lock()
+
+    # ---- materialization ----
+
+    def _apply(self, event: dict):
+        """Fold one event into the materialized tables (caller holds the lock)"""
+        name, map_id, block = event["event"], event["map_id"], event["block_number"]
+        if name == "MapCreated":
+            self._db.execute(
+                "INSERT OR REPLACE INTO maps (map_id, creator, prize_pool, entry_fee,"
+                " created_block, updated_block) VALUES (?, ?, ?, ?, ?, ?)",
+                (map_id, event["account"], _word(event["prize_pool"]), _word(event["entry_fee"]), block, block)
+            )
+        elif name == "MapUnlocked":
+            self._db.execute(
+                "INSERT OR IGNORE INTO unlocks (map_id, player, block_number) VALUES (?, ?, ?)",
+                (map_id, event["account"], block)
+            )
+            self._db.execute(
+                "UPDATE maps SET unlock_count = unlock_count + 1, updated_block = ? WHERE map_id = ?",
+                (block, map_id)
+            )
+        elif name == "AnswerCommitted":
+            self._db.execute(
+                "UPDATE maps SET attempt_count = attempt_count + 1, updated_block = ? WHERE map_id = ?",
+                (block, map_id)
+            )
+        elif name == "AnswerIsWrong":
+            self._db.execute(
+                "UPDATE maps SET wrong_count = wrong_count + 1, updated_block = ? WHERE map_id = ?",
+                (block, map_id)
+            )
+        elif name == "PrizeClaimed":
+            self._db.execute(
+                "UPDATE maps SET solved = 1, winner = ?, claimed_amount = ?, updated_block = ?"
+                " WHERE map_id = ?",
+                (event["account"], _word(event["amount"]), block, map_id)
+            )
+
+    def apply_batch(self, events: list[dict], checkpoints: dict[int, str], keep_checkpoints: int):
+        """
+        Store a batch of decoded events and block checkpoints atomically
+
+        Args:
+            events: Decoded events in chain order
+            checkpoints: Block number -> hash for blocks in this batch
+            keep_checkpoints: Newest checkpoints to retain for reorg detection
+        """
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                for event in events:
+                    extra = {
+                        key: value for key, value in event.items()
+                        if key not in ("event", "block_number", "block_hash", "log_index",
+                                       "tx_hash", "map_id", "account")
+                    }
+                    cursor = self._db.execute(
+                        "INSERT OR IGNORE INTO events (block_number, log_index, block_hash, tx_hash,"
+                        " event, map_id, account, data) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        (event["block_number"], event["log_index"], event["block_hash"],
+                         event["tx_hash"], event["event"], event["map_id"], event["account"],
+                         json.dumps(extra))
+                    )
+                    if cursor.rowcount:
+                        self._apply(event)
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO checkpoints (block_number, block_hash) VALUES (?, ?)",
+                    checkpoints.items()
+                )
+                self._db.execute(
+                    "DELETE FROM checkpoints WHERE block_number NOT IN"
+                    " (SELECT block_number FROM checkpoints ORDER BY block_number DESC LIMIT ?)",
+                    (keep_checkpoints,)
+                )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def rollback(self, fork_block: int) -> int:
+        """
+        Drop everything from ``fork_block`` onwards and rebuild affected maps
+
+        Returns:
+            Number of orphaned events removed
+        """
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                affected = [row[0] for row in self._db.execute(
+                    "SELECT DISTINCT map_id FROM events WHERE block_number >= ?", (fork_block,)
+                )]
+                removed = self._db.execute(
+                    "DELETE FROM events WHERE block_number >= ?", (fork_block,)
+                ).rowcount
+                self._db.execute("DELETE FROM checkpoints WHERE block_number >= ?", (fork_block,))
+                for map_id in affected:
+                    self._db.execute("DELETE FROM maps WHERE map_id = ?", (map_id,))
+                    self._db.execute("DELETE FROM unlocks WHERE map_id = ?", (map_id,))
+                    rows = self._db.execute(
+                        "SELECT event, block_number, map_id, account, data FROM events"
+                        " WHERE map_id = ? ORDER BY block_number, log_index", (map_id,)
+                    ).fetchall()
+                    for name, block, row_map_id, account, data in rows:
+                        self._apply({
+                            "event": name, "block_number": block, "map_id": row_map_id,
+                            "account": account, **json.loads(data)
+                        })
+                    if not rows:
+                        self._db.execute("DELETE FROM map_details WHERE map_id = ?", (map_id,))
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return removed
+
+    def set_details(self, map_id: int, name: str, metadata_uri: str):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO map_details (map_id, name, metadata_uri) VALUES (?, ?, ?)",
+                (map_id, name, metadata_uri)
+            )
+
+    def missing_details(self, limit: int = 50) -> list[int]:
+        with self._lock:
+            return [row[0] for row in self._db.execute(
+                "SELECT maps.map_id FROM maps LEFT JOIN map_details USING (map_id)"
+                " WHERE map_details.map_id IS NULL ORDER BY maps.map_id LIMIT ?", (limit,)
+            )]
+
+    # ---- checkpoints ----
+
+    def last_checkpoint(self) -> Optional[tuple[int, str]]:
+        with self._lock:
+            return self._db.execute(
+                "SELECT block_number, block_hash FROM checkpoints ORDER BY block_number DESC LIMIT 1"
+            ).fetchone()
+
+    def checkpoints(self) -> list[tuple[int, str]]:
+        """Stored checkpoints, newest first"""
+        with self._lock:
+            return self._db.execute(
+                "SELECT block_number, block_hash FROM checkpoints ORDER BY block_number DESC"
+            ).fetchall()
+
+    # ---- queries ----
+
+    _MAP_COLUMNS = (
+        "maps.map_id, creator, prize_pool, entry_fee, solved, winner, claimed_amount,"
+        " unlock_count, attempt_count, wrong_count, created_block, updated_block,"
+        " map_details.name, map_details.metadata_uri"
+    )
+
+    @staticmethod
+    def _map_row(row) -> dict:
+        return {
+            "map_id": row[0],
+            "creator": row[1],
+            "prize_pool": str(int(row[2], 16)),
+            "entry_fee": str(int(row[3], 16)),
+            "solved": bool(row[4]),
+            "winner": row[5],
+            "claimed_amount": str(int(row[6], 16)) if row[6] else None,
+            "unlock_count": row[7],
+            "attempt_count": row[8],
+            "wrong_count": row[9],
+            "created_block": row[10],
+            "updated_block": row[11],
+            "name": row[12],
+            "metadata_uri": row[13],
+        }
+
+    def list_maps(
+        self,
+        status: Optional[str] = None,
+        creator: Optional[str] = None,
+        min_prize: Optional[int] = None,
+        sort: str = "created",
+        descending: bool = True,
+        limit: int = 50,
+        offset: int = 0
+    ) -> list[dict]:
+        """
+        Filter and page through indexed maps
+
+        Args:
+            status: "open" or "solved"
+            creator: Creator address
+            min_prize: Minimum prize pool in wei
+            sort: One of MAP_SORTS
+            descending: Sort direction
+            limit: Page size
+            offset: Rows to skip
+
+        Returns:
+            Map dictionaries (wei amounts as decimal strings)
+        """
+        if sort not in MAP_SORTS:
+            raise ValueError(f"Unknown sort: {sort}")
+        clauses, params = [], []
+        if status == "open":
+            clauses.append("solved = 0")
+        elif status == "solved":
+            clauses.append("solved = 1")
+        if creator:
+            clauses.append("creator = ?")
+            params.append(creator.lower())
+        if min_prize is not None:
+            clauses.append("prize_pool >= ?")
+            params.append(_word(min_prize))
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        direction = "DESC" if descending else "ASC"
+        query = (
+            f"SELECT {self._MAP_COLUMNS} FROM maps LEFT JOIN map_details USING (map_id) {where}"
+            f" ORDER BY {MAP_SORTS[sort]} {direction}, maps.map_id {direction} LIMIT ? OFFSET ?"
+        )
+        with self._lock:
+            rows = self._db.execute(query, (*params, limit, offset)).fetchall()
+        return [self._map_row(row) for row in rows]
+
+    def get_map(self, map_id: int) -> Optional[dict]:
+        with self._lock:
+            row = self._db.execute(
+                f"SELECT {self._MAP_COLUMNS} FROM maps LEFT JOIN map_details USING (map_id)"
+                " WHERE maps.map_id = ?", (map_id,)
+            ).fetchone()
+        return self._map_row(row) if row else None
+
+    def has_unlocked(self, map_id: int, player: str) -> bool:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT 1 FROM unlocks WHERE map_id = ? AND player = ?", (map_id, player.lower())
+            ).fetchone()
+        return row is not None
+
+    def player_unlocks(self, player: str) -> list[int]:
+        with self._lock:
+            return [row[0] for row in self._db.execute(
+                "SELECT map_id FROM unlocks WHERE player = ? ORDER BY block_number", (player.lower(),)
+            )]
+
+    def events(self, map_id: int, limit: int = 100) -> list[dict]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT event, block_number, log_index, tx_hash, account, data FROM events"
+                " WHERE map_id = ? ORDER BY block_number DESC, log_index DESC LIMIT ?",
+                (map_id, limit)
+            ).fetchall()
+        return [
+            {
+                "event": name, "block_number": block, "log_index": log_index,
+                "tx_hash": tx_hash, "account": account,
+                **{key: str(value) if isinstance(value, int) else value
+                   for key, value in json.loads(data).items()}
+            }
+            for name, block, log_index, tx_hash, account, data in rows
+        ]
+
+    def counts(self) -> dict:
+        with self._lock:
+            events, maps, open_maps = self._db.execute(
+                "SELECT (SELECT COUNT(*) FROM events), (SELECT COUNT(*) FROM maps),"
+                " (SELECT COUNT(*) FROM maps WHERE solved = 0)"
+            ).fetchone()
+        return {"events": events, "maps": maps, "open_maps": open_maps}
+
+
+class ChainIndexer:
+    """
+    Follows the contract's logs and keeps a ChainStore up to date
+
+    Each batch covers up to ``batch_size`` blocks. Before a batch the hash of
+    the last checkpointed block is compared with the chain; on mismatch the
+    indexer walks back through its stored checkpoints to the newest block
+    that still matches and rolls the store back to just after it.
+
+    Args:
+        source: Where logs are read from
+        store: SQLite read model
+        start_block: First block to index (e.g. the deployment block)
+        batch_size: Blocks per eth_getLogs request
+        confirmations: Blocks behind head to stay
+        reorg_depth: Checkpoints kept for reorg detection
+        poll_interval: Seconds between polls once caught up
+    """
+
+    def __init__(
+        self,
+        source: LogSource,
+        store: ChainStore,
+        start_block: int = 0,
+        batch_size: int = 2000,
+        confirmations: int = 0,
+        reorg_depth: int = 64,
+        poll_interval: float = 2.0
+    ):
+        self.source = source
+        self.store = store
+        self.start_block = start_block
+        self.batch_size = batch_size
+        self.confirmations = confirmations
+        self.reorg_depth = reorg_depth
+        self.poll_interval = poll_interval
+        self._worker: Optional[asyncio.Task] = None
+        self._stats = {
+            "head": None,
+            "batches": 0,
+            "events": 0,
+            "reorgs": 0,
+            "orphaned_events": 0,
+            "range_splits": 0,
+            "errors": 0,
+            "last_error": None,
+            "last_sync": None,
+        }
+
+    @classmethod
+    def from_env(cls) -> Optional["ChainIndexer"]:
+        """
+        Build an indexer from CHAIN_* environment variables
+
+        CHAIN_LOG_FIXTURE selects a recorded fixture; otherwise CHAIN_RPC_URL
+        and TREASURE_MAP_ADDRESS select a node. Returns None when neither is
+        configured.
+        """
+        fixture = os.getenv("CHAIN_LOG_FIXTURE")
+        rpc_url = os.getenv("CHAIN_RPC_URL")
+        address = os.getenv("TREASURE_MAP_ADDRESS")
+        if fixture:
+            source = FixtureLogSource(fixture)
+        elif rpc_url and address:
+            source = RPCLogSource(rpc_url, address, timeout=float(os.getenv("CHAIN_RPC_TIMEOUT", "30")))
+        else:
+            return None
+        return cls(
+            source,
+            ChainStore(os.getenv("CHAIN_INDEX_DB", ".cache/chain-index.sqlite3")),
+            start_block=int(os.getenv("CHAIN_START_BLOCK", "0")),
+            batch_size=int(os.getenv("CHAIN_BATCH_BLOCKS", "2000")),
+            confirmations=int(os.getenv("CHAIN_CONFIRMATIONS", "0")),
+            reorg_depth=int(os.getenv("CHAIN_REORG_DEPTH", "64")),
+            poll_interval=float(os.getenv("CHAIN_POLL_INTERVAL", "2"))
+        )
+
+    async def _check_reorg(self) -> Optional[int]:
+        """Roll back past a reorg if the last checkpoint is no longer canonical"""
+        last = self.store.last_checkpoint()
+        if last is None or await self.source.block_hash(last[0]) == last[1]:
+            return None
+        fork_block = self.start_block
+        for number, block_hash in self.store.checkpoints():
+            if await self.source.block_hash(number) == block_hash:
+                fork_block = number + 1
+                break
+        self._stats["reorgs"] += 1
+        self._stats["orphaned_events"] += self.store.rollback(fork_block)
+        return fork_block
+
+    async def _fetch_logs(self, from_block: int, to_block: int) -> list[dict]:
+        """eth_getLogs, halving the range when the node refuses a large one"""
+        try:
+            return await self.source.get_logs(from_block, to_block)
+        except (ChainSourceError, UpstreamError):
+            if from_block == to_block:
+                raise
+            self._stats["range_splits"] += 1
+            middle = (from_block + to_block) // 2
+            return (
+                await self._fetch_logs(from_block, middle)
+                + await self._fetch_logs(middle + 1, to_block)
+            )
+
+    async def _index_range(self, from_block: int, to_block: int):
+        events = [event for event in map(decode_log, await self._fetch_logs(from_block, to_block)) if event]
+        events.sort(key=lambda event: (event["block_number"], event["log_index"]))
+        checkpoints = {event["block_number"]: event["block_hash"] for event in events}
+        end_hash = await self.source.block_hash(to_block)
+        if end_hash is None:
+            raise ChainSourceError(f"Block {to_block} not available")
+        checkpoints[to_block] = end_hash
+        self.store.apply_batch(events, checkpoints, self.reorg_depth)
+        self._stats["batches"] += 1
+        self._stats["events"] += len(events)
+
+    async def _fill_details(self):
+        for map_id in self.store.missing_details():
+            details = await self.source.get_map(map_id)
+            if details is None:
+                continue
+            self.store.set_details(map_id, details["name"], details["metadata_uri"])
+
+    async def sync_once(self) -> int:
+        """
+        Index from the last checkpoint up to the (confirmed) head
+
+        Returns:
+            Last indexed block number
+        """
+        await self._check_reorg()
+        head = await self.source.head()
+        self._stats["head"] = head
+        target = head - self.confirmations
+        last = self.store.last_checkpoint()
+        next_block = last[0] + 1 if last else self.start_block
+        while next_block <= target:
+            end = min(next_block + self.batch_size - 1, target)
+            await self._index_range(next_block, end)
+            next_block = end + 1
+        await self._fill_details()
+        self._stats["last_sync"] = time.time()
+        return next_block - 1
+
+    async def _run(self):
+        while True:
+            try:
+                await self.sync_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._stats["errors"] += 1
+                self._stats["last_error"] = str(e)
+            await asyncio.sleep(self.poll_interval)
+
+    def start(self):
+        """Start following the chain in the background"""
+        if self._worker is None:
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the background follower and release the source"""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        await self.source.close()
+
+    def stats(self) -> dict:
+        last = self.store.last_checkpoint()
+        return {**self._stats, **self.store.counts(), "indexed_block": last[0] if last else None}
+
+
+async def record_fixture(source: LogSource, path: str, from_block: int = 0, to_block: Optional[int] = None):
+    """
+    Record a source's logs, block hashes and map details into a fixture file
+
+    Args:
+        source: Live source to record (usually an RPCLogSource)
+        path: Output JSON path
+        from_block: First block to record
+        to_block: Last block to record (defaults to the current head)
+    """
+    head = to_block if to_block is not None else await source.head()
+    logs = await source.get_logs(from_block, head)
+    numbers = {int(log["blockNumber"], 16) for log in logs} | {head}
+    blocks = {str(number): await source.block_hash(number) for number in sorted(numbers)}
+    events = [event for event in map(decode_log, logs) if event]
+    maps = {}
+    for map_id in sorted({event["map_id"] for event in events}):
+        details = await source.get_map(map_id)
+        if details is not None:
+            maps[str(map_id)] = details
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"head": head, "blocks": blocks, "logs": logs, "maps": maps}, f, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record TreasureMap logs into a fixture file")
+    parser.add_argument("output", help="Fixture path to write")
+    parser.add_argument("--rpc-url", default=os.getenv("CHAIN_RPC_URL", "http://127.0.0.1:8545"))
+    parser.add_argument("--address", default=os.getenv("TREASURE_MAP_ADDRESS"), required=not os.getenv("TREASURE_MAP_ADDRESS"))
+    parser.add_argument("--from-block", type=int, default=0)
+    parser.add_argument("--to-block", type=int, default=None)
+    args = parser.parse_args()
+
+    async def main():
+        source = RPCLogSource(args.rpc_url, args.address)
+        try:
+            await record_fixture(source, args.output, args.from_block, args.to_block)
+        finally:
+            await source.close()
+
+    asyncio.run(main())
@@ -0,0 +1,808 @@
+"""
+Chain Submitter - Relayed TreasureMap transactions
+Submissions are queued in SQLite and sent from one relayer account with a
+locally tracked nonce, so many createMap transactions are in flight at once;
+receipts are polled in JSON-RPC batches and stuck or dropped transactions
+are re-sent at the same nonce with bumped fees
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from typing import TYPE_CHECKING, Optional
+
+from app.utils.helpers import hash_answer
+from app.utils.resilience import CircuitBreaker, RetryPolicy, Upstream, UpstreamError
+
+if TYPE_CHECKING:
+    import aiohttp
+
+
+@lru_cache(maxsize=None)
+def _abi_encode():
+    """Import eth_abi (slow to load) on the first encode instead of at startup"""
+    from eth_abi import encode
+    return encode
+
+
+@lru_cache(maxsize=None)
+def _selector(signature: str) -> bytes:
+    """Function selector, hashed on first use so importing stays cheap"""
+    from eth_hash.auto import keccak
+    return keccak(signature.encode())[:4]
+
+
+CREATE_MAP = "createMap(string,bytes32,uint256,string)"
+
+TERMINAL_STATUSES = ("confirmed", "failed")
+
+GWEI = 10 ** 9
+ETHER = 10 ** 18
+
+
+class ChainRPCError(Exception):
+    """Raised when the node answers a JSON-RPC call with an error"""
+
+    def __init__(self, method: str, error: dict):
+        self.method = method
+        self.code = error.get("code")
+        self.message = error.get("message") or ""
+        super().__init__(f"RPC {method} failed: {self.message}")
+
+    @property
+    def nonce_too_low(self) -> bool:
+        message = self.message.lower()
+        return "nonce too low" in message or "nonce has already been used" in message
+
+    @property
+    def already_known(self) -> bool:
+        message = self.message.lower()
+        return "already known" in message or "known transaction" in message
+
+
+class SubmissionNotFound(LookupError):
+    """Raised when a submission ID is unknown"""
+
+
+class ChainRPC:
+    """
+    JSON-RPC client with batch calls
+
+    Args:
+        rpc_url: Node HTTP endpoint (e.g. a local Hardhat node)
+        timeout: Per-request timeout in seconds
+    """
+
+    def __init__(self, rpc_url: str, timeout: float = 30.0):
+        self.rpc_url = rpc_url
+        self.upstream = Upstream(
+            "chain-relay",
+            timeout=timeout,
+            retry=RetryPolicy(
+                attempts=int(os.getenv("CHAIN_RPC_RETRY_ATTEMPTS", "3")),
+                base_delay=float(os.getenv("CHAIN_RPC_RETRY_BASE_DELAY", "0.5"))
+            ),
+            breaker=CircuitBreaker(
+                failure_threshold=int(os.getenv("CHAIN_RPC_BREAKER_FAILURES", "5")),
+                reset_timeout=float(os.getenv("CHAIN_RPC_BREAKER_RESET", "30"))
+            )
+        )
+        self._session: Optional["aiohttp.ClientSession"] = None
+        self._ids = 0
+        self.requests = 0
+
+    async def _post(self, payload):
+        if self._session is None or self._session.closed:
+            import aiohttp
+            self._session = aiohttp.ClientSession()
+
+        async def attempt():
+            async with self._session.post(self.rpc_url, json=payload) as response:
+                if response.status != 200:
+                    raise UpstreamError(f"RPC failed: HTTP {response.status}", status=response.status)
+                return await response.json(content_type=None)
+
+        self.requests += 1
+        return await self.upstream.call(attempt)
+
+    def _request(self, method: str, params: list) -> dict:
+        self._ids += 1
+        return {"jsonrpc": "2.0", "id": self._ids, "method": method, "params": params}
+
+    async def call(self, method: str, params: list):
+        """
+        Raises:
+            ChainRPCError: If the node returns an error
+        """
+        body = await self._post(self._request(method, params))
+        if body.get("error"):
+            raise ChainRPCError(method, body["error"])
+        return body["result"]
+
+    async def batch(self, calls: list[tuple[str, list]]) -> list:
+        """
+        Send several calls in one HTTP request
+
+        Returns:
+            One entry per call, in order: the result, or a ChainRPCError
+        """
+        if not calls:
+            return []
+        requests = [self._request(method, params) for method, params in calls]
+        body = await self._post(requests)
+        if isinstance(body, dict):  # Some nodes answer a rejected batch with one error
+            error = ChainRPCError("batch", body.get("error") or {"message": "malformed batch response"})
+            return [error] * len(calls)
+        by_id = {response.get("id"): response for response in body}
+        results = []
+        for request in requests:
+            response = by_id.get(request["id"], {"error": {"message": "missing from batch response"}})
+            if response.get("error"):
+                results.append(ChainRPCError(request["method"], response["error"]))
+            else:
+                results.append(response.get("result"))
+        return results
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+class Signer(ABC):
+    """
+    How the relayer account authorizes transactions
+
+    Args:
+        address: Relayer account address
+    """
+
+    def __init__(self, address: str):
+        self.address = address.lower()
+
+    async def start(self, rpc: ChainRPC):
+        pass
+
+    @abstractmethod
+    def prepare(self, tx: dict) -> tuple[Optional[str], str, list]:
+        """
+        Turn a transaction into an RPC call
+
+        Returns:
+            (transaction hash if known before broadcast, method, params)
+        """
+
+
+class LocalSigner(Signer):
+    """
+    Signs EIP-1559 transactions with a private key (needs eth-account)
+
+    The transaction hash is known before broadcast, so a send that times
+    out can be recorded and re-sent without risking a second transaction.
+
+    Args:
+        private_key: Relayer key, 0x-prefixed hex
+        chain_id: Chain ID, read from the node on start if omitted
+    """
+
+    def __init__(self, private_key: str, chain_id: Optional[int] = None):
+        try:
+            from eth_account import Account
+        except ImportError:
+            raise RuntimeError("CHAIN_RELAYER_KEY requires eth-account (pip install eth-account)") from None
+        self._account = Account.from_key(private_key)
+        super().__init__(self._account.address)
+        self.chain_id = chain_id
+
+    async def start(self, rpc: ChainRPC):
+        if self.chain_id is None:
+            self.chain_id = int(await rpc.call("eth_chainId", []), 16)
+
+    def prepare(self, tx: dict) -> tuple[Optional[str], str, list]:
+        signed = self._account.sign_transaction({
+            "type": 2,
+            "chainId": self.chain_id,
+            "nonce": tx["nonce"],
+            "to": bytes.fromhex(tx["to"].removeprefix("0x")),
+            "value": tx["value"],
+            "data": tx["data"],
+            "gas": tx["gas"],
+            "maxFeePerGas": tx["max_fee"],
+            "maxPriorityFeePerGas": tx["priority_fee"],
+        })
+        return "0x" + signed.hash.hex().removeprefix("0x"), "eth_sendRawTransaction", [
+            "0x" + signed.raw_transaction.hex().removeprefix("0x")
+        ]
+
+
+class NodeSigner(Signer):
+    """
+    Lets the node sign with an account it holds unlocked (eth_sendTransaction)
+
+    Meant for development nodes such as ``npx hardhat node``.
+    """
+
+    def prepare(self, tx: dict) -> tuple[Optional[str], str, list]:
+        return None, "eth_sendTransaction", [{
+            "from": self.address,
+            "to": tx["to"],
+            "value": hex(tx["value"]),
+            "data": tx["data"],
+            "gas": hex(tx["gas"]),
+            "nonce": hex(tx["nonce"]),
+            "maxFeePerGas": hex(tx["max_fee"]),
+            "maxPriorityFeePerGas": hex(tx["priority_fee"]),
+        }]
+
+
+class SubmissionStore:
+    """
+    SQLite submission records, shared by every worker process
+
+    Any worker may queue a submission; only the process running the sender
+    loop moves it forward.
+    """
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5.0)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS submissions ("
+            " id TEXT PRIMARY KEY,"
+            " status TEXT NOT NULL,"
+            " nonce INTEGER,"
+            " created_at REAL NOT NULL,"
+            " data TEXT NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS submissions_status ON submissions (status, created_at);"
+        )
+        self._lock = threading.Lock()
+
+    def save(self, submission: dict):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO submissions (id, status, nonce, created_at, data) VALUES (?, ?, ?, ?, ?)",
+                (
+                    submission["id"], submission["status"], submission["nonce"],
+                    submission["created_at"], json.dumps(submission, ensure_ascii=False)
+                )
+            )
+
+    def get(self, submission_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._db.execute("SELECT data FROM submissions WHERE id = ?", (submission_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def with_status(self, status: str, limit: int = -1) -> list[dict]:
+        """Submissions in a status, oldest first (by nonce once sent)"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT data FROM submissions WHERE status = ? ORDER BY nonce, created_at LIMIT ?",
+                (status, limit)
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def max_nonce(self) -> Optional[int]:
+        """Highest nonce ever assigned"""
+        with self._lock:
+            return self._db.execute("SELECT MAX(nonce) FROM submissions").fetchone()[0]
+
+    def counts(self) -> dict:
+        with self._lock:
+            rows = self._db.execute("SELECT status, COUNT(*) FROM submissions GROUP BY status").fetchall()
+        return dict(rows)
+
+
+class ChainSubmitter:
+    """
+    Sends queued TreasureMap transactions from a relayer account
+
+    Each tick of the sender loop polls receipts for every sent transaction
+    in one JSON-RPC batch, re-sends those still without a receipt after
+    ``resubmit_after`` seconds that the node dropped or that hold the lowest
+    unmined nonce (priced out) at the same nonce with fees raised by
+    ``fee_bump`` (the replacement rule most nodes enforce is +10%), then
+    sends queued submissions until ``max_in_flight`` are unconfirmed. Gas is
+    estimated before a nonce is assigned, so a call that would revert fails
+    without leaving a nonce gap.
+
+    Transactions come from the relayer, so it is the creator of relayed
+    maps and pays their prize pools: TreasureMap has no on-behalf variants.
+    ``max_prize_pool`` and ``max_entry_fee`` bound what one submission can
+    commit. There is no relayed unlockMap, since it would unlock the map
+    for the relayer rather than for a player.
+
+    Args:
+        rpc: Node client
+        signer: Relayer account
+        contract: TreasureMap address
+        store: Submission records
+        max_in_flight: Sent but unconfirmed transactions allowed at once
+        resubmit_after: Seconds without a receipt before a fee-bumped re-send
+        fee_bump: Fractional fee increase per re-send
+        max_fee: Cap on maxFeePerGas in wei
+        max_base_fee: Keep submissions queued while the base fee is above
+            this (wei); None sends at any base fee up to ``max_fee``
+        max_prize_pool: Largest prize pool one createMap may send, in wei
+        max_entry_fee: Largest entry fee one createMap may set, in wei
+        gas_multiplier: Headroom over the gas estimate
+        confirmations: Blocks on top of a receipt before it counts
+        receipt_batch_size: Receipts per JSON-RPC batch
+        poll_interval: Seconds between ticks
+    """
+
+    def __init__(
+        self,
+        rpc: ChainRPC,
+        signer: Signer,
+        contract: str,
+        store: SubmissionStore,
+        max_in_flight: int = 16,
+        resubmit_after: float = 30.0,
+        fee_bump: float = 0.125,
+        max_fee: int = 500 * GWEI,
+        max_base_fee: Optional[int] = None,
+        max_prize_pool: int = ETHER // 100,
+        max_entry_fee: int = ETHER // 100,
+        gas_multiplier: float = 1.2,
+        confirmations: int = 0,
+        receipt_batch_size: int = 100,
+        poll_interval: float = 1.0
+    ):
+        self.rpc = rpc
+        self.signer = signer
+        self.contract = contract.lower()
+        self.store = store
+        self.max_in_flight = max_in_flight
+        self.resubmit_after = resubmit_after
+        self.fee_bump = fee_bump
+        self.max_fee = max_fee
+        self.max_base_fee = max_base_fee
+        self.max_prize_pool = max_prize_pool
+        self.max_entry_fee = max_entry_fee
+        self.gas_multiplier = gas_multiplier
+        self.confirmations = confirmations
+        self.receipt_batch_size = receipt_batch_size
+        self.poll_interval = poll_interval
+        self._nonce: Optional[int] = None
+        self._started = False
+        self._wake = asyncio.Event()
+        self._worker: Optional[asyncio.Task] = None
+        self._stats = {
+            "sends": 0,
+            "replacements": 0,
+            "receipt_batches": 0,
+            "nonce_resyncs": 0,
+            "fee_waits": 0,
+            "errors": 0,
+            "last_error": None,
+        }
+
+    @classmethod
+    def from_env(cls) -> Optional["ChainSubmitter"]:
+        """
+        Build a submitter from CHAIN_* environment variables
+
+        Needs CHAIN_RPC_URL, TREASURE_MAP_ADDRESS and a relayer: either
+        CHAIN_RELAYER_KEY (signed locally) or CHAIN_RELAYER_ADDRESS (an
+        account the node holds unlocked). Returns None otherwise.
+        """
+        rpc_url = os.getenv("CHAIN_RPC_URL")
+        address = os.getenv("TREASURE_MAP_ADDRESS")
+        key = os.getenv("CHAIN_RELAYER_KEY")
+        relayer = os.getenv("CHAIN_RELAYER_ADDRESS")
+        if not (rpc_url and address and (key or relayer)):
+            return None
+        chain_id = os.getenv("CHAIN_ID")
+        max_base_fee = os.getenv("CHAIN_MAX_BASE_FEE")
+        return cls(
+            ChainRPC(rpc_url, timeout=float(os.getenv("CHAIN_RPC_TIMEOUT", "30"))),
+            LocalSigner(key, int(chain_id) if chain_id else None) if key else NodeSigner(relayer),
+            address,
+            SubmissionStore(os.getenv("CHAIN_SUBMIT_DB", ".cache/chain-submissions.sqlite3")),
+            max_in_flight=int(os.getenv("CHAIN_MAX_IN_FLIGHT", "16")),
+            resubmit_after=float(os.getenv("CHAIN_RESUBMIT_AFTER", "30")),
+            fee_bump=float(os.getenv("CHAIN_FEE_BUMP", "0.125")),
+            max_fee=int(os.getenv("CHAIN_MAX_FEE", str(500 * GWEI))),
+            max_base_fee=int(max_base_fee) if max_base_fee else None,
+            max_prize_pool=int(os.getenv("CHAIN_MAX_PRIZE_POOL", str(ETHER // 100))),
+            max_entry_fee=int(os.getenv("CHAIN_MAX_ENTRY_FEE", str(ETHER // 100))),
+            gas_multiplier=float(os.getenv("CHAIN_GAS_MULTIPLIER", "1.2")),
+            confirmations=int(os.getenv("CHAIN_CONFIRMATIONS", "0")),
+            poll_interval=float(os.getenv("CHAIN_SUBMIT_POLL_INTERVAL", "1"))
+        )
+
+    # ---- submissions ----
+
+    def _submit(self, kind: str, data: bytes, value: int, params: dict) -> dict:
+        now = time.time()
+        submission = {
+            "id": uuid.uuid4().hex,
+            "kind": kind,
+            "status": "queued",
+            "params": params,
+            "data": "0x" + data.hex(),
+            "value": str(value),
+            "nonce": None,
+            "gas": None,
+            "max_fee": None,
+            "priority_fee": None,
+            "tx_hash": None,
+            "tx_hashes": [],
+            "sent_at": None,
+            "block_number": None,
+            "map_id": None,
+            "error": None,
+            "created_at": now,
+            "updated_at": now
+        }
+        self.store.save(submission)
+        self._wake.set()
+        return submission
+
+    def create_map(
+        self,
+        metadata_uri: str,
+        answer: str,
+        prize_pool: int,
+        entry_fee: int = 0,
+        name: str = ""
+    ) -> dict:
+        """
+        Queue ``createMap``, hashing the answer here so it never leaves the
+        backend
+
+        Args:
+            metadata_uri: ipfs:// URI of the map manifest
+            answer: Plain answer; only keccak256(answer) is stored or sent
+            prize_pool: Wei sent with the call (positive, at most max_prize_pool)
+            entry_fee: Unlock fee in wei (at most max_entry_fee)
+            name: Map name
+
+        Returns:
+            The queued submission record
+
+        Raises:
+            ValueError: If an amount is out of range
+        """
+        if not 0 < prize_pool <= self.max_prize_pool:
+            raise ValueError(f"prize_pool must be positive and at most {self.max_prize_pool} wei")
+        if not 0 <= entry_fee <= self.max_entry_fee:
+            raise ValueError(f"entry_fee must be between 0 and {self.max_entry_fee} wei")
+        answer_hash = hash_answer(answer)
+        data = _selector(CREATE_MAP) + _abi_encode()(
+            ("string", "bytes32", "uint256", "string"),
+            (metadata_uri, bytes.fromhex(answer_hash[2:]), entry_fee, name)
+        )
+        return self._submit("create_map", data, prize_pool, {
+            "metadata_uri": metadata_uri,
+            "answer_hash": answer_hash,
+            "entry_fee": str(entry_fee),
+            "name": name
+        })
+
+    def get(self, submission_id: str) -> dict:
+        """
+        Fetch a submission record
+
+        Raises:
+            SubmissionNotFound: If the submission does not exist
+        """
+        submission = self.store.get(submission_id)
+        if submission is None:
+            raise SubmissionNotFound(submission_id)
+        return submission
+
+    async def wait(self, submission_id: str, timeout: float) -> dict:
+        """Long-poll a submission until it is confirmed or failed, or ``timeout`` elapses"""
+        deadline = time.monotonic() + timeout
+        while True:
+            submission = self.get(submission_id)
+            remaining = deadline - time.monotonic()
+            if submission["status"] in TERMINAL_STATUSES or remaining <= 0:
+                return submission
+            await asyncio.sleep(min(remaining, self.poll_interval / 2))
+
+    def _update(self, submission: dict, **changes):
+        submission.update(changes)
+        submission["updated_at"] = time.time()
+        self.store.save(submission)
+
+    # ---- sender loop ----
+
+    async def _sync_nonce(self):
+        """Take the next nonce from the node's pending count or our records, whichever is higher"""
+        pending = int(await self.rpc.call("eth_getTransactionCount", [self.signer.address, "pending"]), 16)
+        recorded = self.store.max_nonce()
+        self._nonce = max(pending, recorded + 1 if recorded is not None else 0)
+        self._stats["nonce_resyncs"] += 1
+
+    async def _fees(self) -> tuple[int, int]:
+        """(base fee of the latest block, suggested priority fee)"""
+        block, priority = await self.rpc.batch([
+            ("eth_getBlockByNumber", ["latest", False]),
+            ("eth_maxPriorityFeePerGas", []),
+        ])
+        if isinstance(block, ChainRPCError):
+            raise block
+        base_fee = int(block.get("baseFeePerGas") or "0x0", 16)
+        priority_fee = 1 * GWEI if isinstance(priority, ChainRPCError) else int(priority, 16)
+        return base_fee, priority_fee
+
+    async def _broadcast(self, submission: dict, tx: dict):
+        """
+        Sign and send one attempt
+
+        With a local signer the attempt is recorded before it is sent, so a
+        send whose outcome is unknown is simply re-sent later.
+        """
+        tx_hash, method, params = self.signer.prepare(tx)
+        attempt = {
+            "nonce": tx["nonce"],
+            "gas": tx["gas"],
+            "max_fee": tx["max_fee"],
+            "priority_fee": tx["priority_fee"],
+            "sent_at": time.time()
+        }
+        if tx_hash is not None:
+            self._update(
+                submission, status="sent", tx_hash=tx_hash,
+                tx_hashes=submission["tx_hashes"] + [tx_hash], **attempt
+            )
+        try:
+            result = await self.rpc.call(method, params)
+        except ChainRPCError as e:
+            if e.already_known and tx_hash is not None:
+                return
+            raise
+        except UpstreamError:
+            if tx_hash is not None:
+                return  # May have reached the node; the receipt poll decides
+            raise
+        self._stats["sends"] += 1
+        if tx_hash is None:
+            self._update(
+                submission, status="sent", tx_hash=result,
+                tx_hashes=submission["tx_hashes"] + [result], **attempt
+            )
+
+    async def _send(self, submission: dict, base_fee: int, priority_fee: int):
+        """Estimate, assign the next nonce and send a queued submission"""
+        call = {
+            "from": self.signer.address,
+            "to": self.contract,
+            "value": hex(int(submission["value"])),
+            "data": submission["data"],
+        }
+        try:
+            gas = int(await self.rpc.call("eth_estimateGas", [call]), 16)
+        except ChainRPCError as e:
+            self._update(submission, status="failed", error=f"Would revert: {e.message}")
+            return
+        tx = {
+            "to": self.contract,
+            "value": int(submission["value"]),
+            "data": submission["data"],
+            "gas": math.ceil(gas * self.gas_multiplier),
+            "nonce": self._nonce,
+            "priority_fee": min(priority_fee, self.max_fee),
+            "max_fee": min(2 * base_fee + priority_fee, self.max_fee),
+        }
+        try:
+            await self._broadcast(submission, tx)
+        except ChainRPCError as e:
+            # Rejected outright, so the nonce stays free for the next submission
+            reset = {"nonce": None, "tx_hash": None, "tx_hashes": [], "sent_at": None}
+            if e.nonce_too_low:
+                self._nonce = None  # Resync and retry on the next tick
+                self._update(submission, status="queued", **reset)
+            else:
+                self._update(submission, status="failed", error=str(e), **reset)
+            return
+        self._nonce += 1
+
+    async def _resend(self, submission: dict, base_fee: int, priority_fee: int):
+        """Replace a stuck or dropped transaction with a fee-bumped one at the same nonce"""
+        bump = 1 + self.fee_bump
+        new_priority = max(math.ceil(submission["priority_fee"] * bump), priority_fee)
+        new_max = max(math.ceil(submission["max_fee"] * bump), 2 * base_fee + new_priority)
+        if new_max > self.max_fee:
+            if submission["error"] is None:
+                self._update(submission, error="Fee cap reached; waiting for the base fee to fall")
+            return
+        tx = {
+            "to": self.contract,
+            "value": int(submission["value"]),
+            "data": submission["data"],
+            "gas": submission["gas"],
+            "nonce": submission["nonce"],
+            "priority_fee": new_priority,
+            "max_fee": new_max,
+        }
+        try:
+            await self._broadcast(submission, tx)
+        except ChainRPCError as e:
+            # e.g. underpriced or nonce too low; the next poll or bump settles it
+            self._update(submission, error=str(e), max_fee=new_max, priority_fee=new_priority, sent_at=time.time())
+            return
+        self._stats["replacements"] += 1
+
+    def _map_id(self, receipt: dict) -> Optional[int]:
+        from app.services.chain_indexer import decode_log
+
+        for log in receipt.get("logs") or []:
+            if (log.get("address") or "").lower() != self.contract:
+                continue
+            event = decode_log(log)
+            if event is not None and event["event"] == "MapCreated":
+                return event["map_id"]
+        return None
+
+    async def _poll_receipts(self, sent: list[dict]) -> tuple[list[dict], int]:
+        """
+        Settle sent submissions from batched receipt lookups
+
+        The relayer's mined nonce count is read in the same batch ahead of
+        the receipts, so every nonce below it has its receipt in the results.
+
+        Returns:
+            (submissions with no receipt for any of their transactions,
+            mined nonce count)
+        """
+        calls = [("eth_blockNumber", []), ("eth_getTransactionCount", [self.signer.address, "latest"])]
+        owners = []
+        for submission in sent:
+            for tx_hash in submission["tx_hashes"]:
+                calls.append(("eth_getTransactionReceipt", [tx_hash]))
+                owners.append(submission)
+        results = []
+        for start in range(0, len(calls), self.receipt_batch_size):
+            results.extend(await self.rpc.batch(calls[start:start + self.receipt_batch_size]))
+            self._stats["receipt_batches"] += 1
+        head, mined, *receipts = results
+        for result in (head, mined):
+            if isinstance(result, ChainRPCError):
+                raise result
+        head = int(head, 16)
+
+        settled = set()
+        for submission, receipt in zip(owners, receipts):
+            if not isinstance(receipt, dict) or submission["id"] in settled:
+                continue
+            settled.add(submission["id"])
+            block_number = int(receipt["blockNumber"], 16)
+            if head - block_number < self.confirmations:
+                continue  # Mined; wait for confirmations without re-sending
+            if int(receipt.get("status", "0x1"), 16) == 1:
+                self._update(
+                    submission, status="confirmed", tx_hash=receipt["transactionHash"],
+                    block_number=block_number, map_id=self._map_id(receipt), error=None
+                )
+            else:
+                self._update(
+                    submission, status="failed", tx_hash=receipt["transactionHash"],
+                    block_number=block_number, error="Transaction reverted"
+                )
+        return [submission for submission in sent if submission["id"] not in settled], int(mined, 16)
+
+    async def _handle_stale(self, unsettled: list[dict], mined: int, base_fee: int, priority_fee: int):
+        now = time.time()
+        stale = [
+            submission for submission in unsettled
+            if submission["sent_at"] is not None and now - submission["sent_at"] >= self.resubmit_after
+        ]
+        if not stale:
+            return
+        known = await self.rpc.batch([("eth_getTransactionByHash", [submission["tx_hash"]]) for submission in stale])
+        for submission, transaction in zip(stale, known):
+            if submission["nonce"] < mined:
+                # The nonce is used but none of our hashes has a receipt
+                self._update(submission, status="failed", error="Nonce used by another transaction")
+            elif transaction is None or submission["nonce"] == mined:
+                # Dropped from the mempool, or first in line and priced out
+                await self._resend(submission, base_fee, priority_fee)
+            # Otherwise it is waiting behind an earlier nonce; bumping would not help
+
+    async def process_once(self) -> int:
+        """
+        Run one tick of the sender loop
+
+        Returns:
+            Submissions still queued or awaiting a receipt
+        """
+        if not self._started:
+            await self.signer.start(self.rpc)
+            self._started = True
+        if self._nonce is None:
+            await self._sync_nonce()
+        sent = self.store.with_status("sent")
+        unsettled, mined = await self._poll_receipts(sent) if sent else ([], 0)
+        queued = self.store.with_status("queued", max(self.max_in_flight - len(unsettled), 0))
+        if unsettled or queued:
+            base_fee, priority_fee = await self._fees()
+            await self._handle_stale(unsettled, mined, base_fee, priority_fee)
+            if queued and self.max_base_fee is not None and base_fee > self.max_base_fee:
+                self._stats["fee_waits"] += 1
+                queued = []
+            for submission in queued:
+                if self._nonce is None:
+                    break  # Resync before assigning more nonces
+                await self._send(submission, base_fee, priority_fee)
+
+        counts = self.store.counts()
+        return counts.get("queued", 0) + counts.get("sent", 0)
+
+    async def _run(self):
+        while True:
+            try:
+                await self.process_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._nonce = None
+                self._stats["errors"] += 1
+                self._stats["last_error"] = str(e)
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    def start(self):
+        """Start sending in the background (run in one process only)"""
+        if self._worker is None:
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the sender loop and close the RPC client; queued work stays in the store"""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        await self.rpc.close()
+
+    def stats(self) -> dict:
+        return {
+            **self._stats,
+            **self.store.counts(),
+            "relayer": self.signer.address,
+            "next_nonce": self._nonce,
+            "rpc_requests": self.rpc.requests
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Queue a relayed createMap and wait for its receipt")
+    parser.add_argument("metadata_uri")
+    parser.add_argument("answer")
+    parser.add_argument("--prize-pool", type=int, required=True, help="Wei")
+    parser.add_argument("--entry-fee", type=int, default=0, help="Wei")
+    parser.add_argument("--name", default="")
+    parser.add_argument("--timeout", type=float, default=120)
+    args = parser.parse_args()
+
+    async def main():
+        submitter = ChainSubmitter.from_env()
+        if submitter is None:
+            raise SystemExit("Set CHAIN_RPC_URL, TREASURE_MAP_ADDRESS and CHAIN_RELAYER_KEY or CHAIN_RELAYER_ADDRESS")
+        submission = submitter.create_map(args.metadata_uri, args.answer, args.prize_pool, args.entry_fee, args.name)
+        submitter.start()
+        try:
+            print(json.dumps(await submitter.wait(submission["id"], args.timeout), indent=2))
+        finally:
+            await submitter.stop()
+
+    asyncio.run(main())
@@ -0,0 +1,157 @@
+"""
+Content Cache - Content-addressed CID lookup for IPFS uploads
+Maps the SHA-256 of uploaded bytes to the CID previously returned for them
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+
+class ContentCache:
+    """
+    Two-tier digest -> IPFS URI cache
+
+    An in-memory LRU sits in front of an optional SQLite table. Entries
+    expire after ``ttl`` seconds and the disk tier is trimmed to
+    ``disk_max_entries`` by least recent use.
+    """
+
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        memory_max_entries: int = 1024,
+        disk_max_entries: int = 100_000,
+        ttl: float = 7 * 24 * 3600
+    ):
+        self.memory_max_entries = memory_max_entries
+        self.disk_max_entries = disk_max_entries
+        self.ttl = ttl
+        self._memory: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+        if db_path:
+            directory = os.path.dirname(db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS content_cids ("
+                " digest TEXT PRIMARY KEY,"
+                " uri TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " accessed_at REAL NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS content_cids_accessed ON content_cids (accessed_at)"
+            )
+
+    @classmethod
+    def from_env(cls) -> "ContentCache":
+        """Build a cache from IPFS_CACHE_* environment variables"""
+        return cls(
+            db_path=os.getenv("IPFS_CACHE_DB", ".cache/ipfs-cids.sqlite3") or None,
+            memory_max_entries=int(os.getenv("IPFS_CACHE_MEMORY_MAX", "1024")),
+            disk_max_entries=int(os.getenv("IPFS_CACHE_DISK_MAX", "100000")),
+            ttl=float(os.getenv("IPFS_CACHE_TTL", str(7 * 24 * 3600)))
+        )
+
+    def _remember(self, digest: str, uri: str, created_at: float):
+        self._memory[digest] = (uri, created_at)
+        self._memory.move_to_end(digest)
+        while len(self._memory) > self.memory_max_entries:
+            self._memory.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def get(self, digest: str) -> Optional[str]:
+        """
+        Look up a previously stored URI
+
+        Args:
+            digest: Content digest key
+
+        Returns:
+            IPFS URI, or None on miss or expiry
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(digest)
+            if entry is not None:
+                uri, created_at = entry
+                if now - created_at < self.ttl:
+                    self._memory.move_to_end(digest)
+                    self._stats["memory_hits"] += 1
+                    return uri
+                del self._memory[digest]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT uri, created_at FROM content_cids WHERE digest = ?", (digest,)
+                ).fetchone()
+                if row is not None:
+                    uri, created_at = row
+                    if now - created_at < self.ttl:
+                        self._db.execute(
+                            "UPDATE content_cids SET accessed_at = ? WHERE digest = ?",
+                            (now, digest)
+                        )
+                        self._remember(digest, uri, created_at)
+                        self._stats["disk_hits"] += 1
+                        return uri
+                    self._db.execute("DELETE FROM content_cids WHERE digest = ?", (digest,))
+
+            self._stats["misses"] += 1
+            return None
+
+    def put(self, digest: str, uri: str):
+        """
+        Store the URI returned for a digest
+
+        Args:
+            digest: Content digest key
+            uri: IPFS URI returned by the provider
+        """
+        now = time.time()
+        with self._lock:
+            self._remember(digest, uri, now)
+            self._stats["stores"] += 1
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO content_cids (digest, uri, created_at, accessed_at)"
+                    " VALUES (?, ?, ?, ?)",
+                    (digest, uri, now, now)
+                )
+                # Trim periodically rather than on every write
+                if self._stats["stores"] % 100 == 0:
+                    self._evict_disk(now)
+
+    def _evict_disk(self, now: float):
+        self._db.execute("DELETE FROM content_cids WHERE created_at < ?", (now - self.ttl,))
+        self._db.execute(
+            "DELETE FROM content_cids WHERE digest IN ("
+            " SELECT digest FROM content_cids ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.disk_max_entries,)
+        )
+
+    def stats(self) -> dict:
+        """Hit/miss counters and tier sizes"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+            if self._db is not None:
+                stats["disk_entries"] = self._db.execute(
+                    "SELECT COUNT(*) FROM content_cids"
+                ).fetchone()[0]
+            return stats
+
+    def close(self):
+        """Close the SQLite tier"""
+        if self._db is not None:
+            self._db.close()
+            self._db = None
@@ -0,0 +1,120 @@
+"""
+Image Cache - Coalesce duplicate DALL-E generations
+Concurrent identical requests share one upstream call, and results are kept
+for a short TTL so retries and double-clicks do not pay for a new image
+"""
+
+import hashlib
+import os
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional
+
+from app.utils.metrics import REGISTRY
+from app.utils.singleflight import SingleFlight
+
+
+IMAGE_CALLS_SAVED = REGISTRY.counter(
+    "openai_image_calls_saved_total",
+    "Image generations answered without an upstream call (coalesced, cached)",
+    labels=("reason",)
+)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def image_key(model: str, prompt: str, response_format: str) -> str:
+    """
+    Hash of a normalized image request
+
+    Prompts differing only in Unicode form, case or whitespace share a key.
+    """
+    normalized = _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", prompt)).strip().casefold()
+    return hashlib.sha256(f"{model}\0{response_format}\0{normalized}".encode("utf-8")).hexdigest()
+
+
+class ImageCache:
+    """
+    In-flight deduplication plus a small TTL/LRU result cache
+
+    Every waiter is shielded from the shared call: a client that disconnects
+    cancels only its own wait. The generation runs to completion for the
+    others, and its result is cached even if every waiter has gone, so the
+    client's retry is served from the cache.
+
+    Args:
+        ttl: Seconds a generated image is reused (DALL-E URLs expire after
+            about an hour, so keep this well below that)
+        max_entries: Cached results kept; image bytes are ~1-2 MB each
+    """
+
+    def __init__(self, ttl: float = 300, max_entries: int = 32):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[object, float]] = OrderedDict()
+        self._flights = SingleFlight()
+        self._stats = {"hits": 0, "expired": 0, "evictions": 0}
+
+    @classmethod
+    def from_env(cls) -> "ImageCache":
+        """Build a cache from IMAGE_CACHE_* environment variables"""
+        return cls(
+            ttl=float(os.getenv("IMAGE_CACHE_TTL", "300")),
+            max_entries=int(os.getenv("IMAGE_CACHE_MAX_ENTRIES", "32"))
+        )
+
+    def _get(self, key: str) -> Optional[object]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        result, created_at = entry
+        if time.time() - created_at > self.ttl:
+            del self._entries[key]
+            self._stats["expired"] += 1
+            return None
+        self._entries.move_to_end(key)
+        return result
+
+    def _put(self, key: str, result: object):
+        self._entries[key] = (result, time.time())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    async def get_or_generate(self, key: str, generate: Callable[[], Awaitable]):
+        """
+        Return the cached result for ``key``, join its in-flight generation,
+        or start one
+
+        Failures are not cached; the next request tries again.
+        """
+        result = self._get(key)
+        if result is not None:
+            self._stats["hits"] += 1
+            IMAGE_CALLS_SAVED.inc(reason="cached")
+            return result
+
+        async def run():
+            result = await generate()
+            if self.ttl > 0:
+                self._put(key, result)
+            return result
+
+        # No await between the check and do(), so this caller joins iff running
+        if self._flights.running(key):
+            IMAGE_CALLS_SAVED.inc(reason="coalesced")
+        return await self._flights.do(key, run)
+
+    def stats(self) -> dict:
+        """Upstream calls made, calls saved and cache state"""
+        return {
+            **self._stats,
+            "upstream_calls": self._flights.calls,
+            "coalesced": self._flights.shared,
+            "saved_calls": self._stats["hits"] + self._flights.shared,
+            "in_flight": self._flights.in_flight(),
+            "entries": len(self._entries)
+        }
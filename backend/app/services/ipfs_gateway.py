@@ -0,0 +1,473 @@
+"""
+IPFS Gateway Reader - Verified read-through cache for ipfs:// content
+Races a pool of HTTP gateways for each block, checks it against its CID and
+keeps results in a size-bounded memory tier plus a disk tier whose large
+files are served through mmap
+"""
+
+import asyncio
+import hashlib
+import mmap
+import os
+import re
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Iterator, Optional
+
+from app.utils.cid import (
+    CID,
+    CODEC_DAG_PB,
+    CODEC_RAW,
+    HASH_IDENTITY,
+    InvalidCID,
+    decode_file_node,
+    parse_cid,
+    verify_block,
+)
+from app.utils.resilience import CircuitBreaker, RetryPolicy, Upstream, UpstreamError
+from app.utils.singleflight import SingleFlight
+
+if TYPE_CHECKING:
+    import aiohttp  # Sessions are passed in by IPFSService
+
+
+DEFAULT_GATEWAYS = ("https://w3s.link/ipfs/", "https://ipfs.io/ipfs/", "https://dweb.link/ipfs/")
+CHUNK_SIZE = 64 * 1024
+
+_SNIFF = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF8", "image/gif"),
+    (b"%PDF", "application/pdf"),
+)
+_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class GatewayFetchError(Exception):
+    """Raised when no gateway returned valid content"""
+
+
+class RangeNotSatisfiable(ValueError):
+    """Raised for a Range header outside the object"""
+
+
+def sniff_content_type(head: bytes) -> str:
+    """Guess a media type from the first bytes of an object"""
+    for magic, content_type in _SNIFF:
+        if head.startswith(magic):
+            return content_type
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    stripped = head.lstrip()
+    if stripped[:1] in (b"{", b"["):
+        return "application/json"
+    return "application/octet-stream"
+
+
+def parse_byte_range(header: Optional[str], size: int) -> Optional[tuple[int, int]]:
+    """
+    Parse a single-range ``Range`` header
+
+    Returns:
+        Inclusive (start, end) offsets, or None to serve the whole object
+        (no header, or a multi-range/unsupported request)
+
+    Raises:
+        RangeNotSatisfiable: If the range lies outside the object
+    """
+    if not header:
+        return None
+    match = _RANGE.match(header.strip())
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise RangeNotSatisfiable(header)
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        raise RangeNotSatisfiable(header)
+    return start, end
+
+
+class Blob:
+    """
+    A cached object, held in memory or as a file read through mmap
+
+    Args:
+        size: Object size in bytes
+        data: In-memory bytes, or None for disk-backed objects
+        path: Disk file, used when ``data`` is None
+        verified: Whether the bytes were checked against the CID
+    """
+
+    def __init__(self, size: int, data: Optional[bytes] = None, path: Optional[str] = None, verified: bool = True):
+        self.size = size
+        self.data = data
+        self.path = path
+        self.verified = verified
+
+    def head(self, length: int = 512) -> bytes:
+        if self.data is not None:
+            return self.data[:length]
+        with open(self.path, "rb") as f:
+            return f.read(length)
+
+    def read(self) -> bytes:
+        if self.data is not None:
+            return self.data
+        with open(self.path, "rb") as f:
+            return f.read()
+
+    def iter_range(self, start: int = 0, end: Optional[int] = None, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+        """Yield bytes ``start``..``end`` (inclusive) in chunks"""
+        end = self.size - 1 if end is None else end
+        if self.data is not None:
+            view = memoryview(self.data)
+            for offset in range(start, end + 1, chunk_size):
+                yield bytes(view[offset:min(offset + chunk_size, end + 1)])
+            return
+        if self.size == 0:
+            return
+        with open(self.path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            for offset in range(start, end + 1, chunk_size):
+                yield mapped[offset:min(offset + chunk_size, end + 1)]
+
+
+class BlobCache:
+    """
+    Byte-bounded LRU memory tier in front of a byte-bounded disk tier
+
+    Objects of at least ``mmap_threshold`` bytes skip the memory tier and are
+    served straight from disk through mmap (when a disk tier is configured).
+    Content is immutable, so entries never expire; they are only evicted.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        memory_max_bytes: int = 64 * 1024 * 1024,
+        disk_max_bytes: int = 1024 * 1024 * 1024,
+        mmap_threshold: int = 1024 * 1024
+    ):
+        self.directory = directory
+        self.memory_max_bytes = memory_max_bytes
+        self.disk_max_bytes = disk_max_bytes
+        self.mmap_threshold = mmap_threshold
+        self._memory: OrderedDict[str, Blob] = OrderedDict()
+        self._memory_bytes = 0
+        self._disk: OrderedDict[str, int] = OrderedDict()
+        self._disk_bytes = 0
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            entries = []
+            for name in os.listdir(directory):
+                if name.endswith(".tmp"):
+                    continue
+                stat = os.stat(os.path.join(directory, name))
+                entries.append((stat.st_mtime, name, stat.st_size))
+            for _, name, size in sorted(entries):
+                self._disk[name] = size
+                self._disk_bytes += size
+
+    @classmethod
+    def from_env(cls) -> "BlobCache":
+        """Build a cache from IPFS_READ_CACHE_* environment variables"""
+        return cls(
+            directory=os.getenv("IPFS_READ_CACHE_DIR", ".cache/ipfs-blobs") or None,
+            memory_max_bytes=int(os.getenv("IPFS_READ_CACHE_MEMORY_BYTES", str(64 * 1024 * 1024))),
+            disk_max_bytes=int(os.getenv("IPFS_READ_CACHE_DISK_BYTES", str(1024 * 1024 * 1024))),
+            mmap_threshold=int(os.getenv("IPFS_READ_MMAP_THRESHOLD", str(1024 * 1024)))
+        )
+
+    @staticmethod
+    def _file_name(key: str) -> str:
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    def _remember(self, key: str, blob: Blob):
+        if blob.size > self.memory_max_bytes:
+            return
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_bytes -= previous.size
+        self._memory[key] = blob
+        self._memory_bytes += blob.size
+        while self._memory_bytes > self.memory_max_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted.size
+            self._stats["evictions"] += 1
+
+    def get(self, key: str) -> Optional[Blob]:
+        blob = self._memory.get(key)
+        if blob is not None:
+            self._memory.move_to_end(key)
+            self._stats["memory_hits"] += 1
+            return blob
+
+        name = self._file_name(key)
+        size = self._disk.get(name)
+        if size is not None:
+            path = os.path.join(self.directory, name)
+            self._disk.move_to_end(name)
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                # Removed behind our back
+                del self._disk[name]
+                self._disk_bytes -= size
+            else:
+                self._stats["disk_hits"] += 1
+                if size >= self.mmap_threshold:
+                    return Blob(size, path=path)
+                with open(path, "rb") as f:
+                    blob = Blob(size, data=f.read())
+                self._remember(key, blob)
+                return blob
+
+        self._stats["misses"] += 1
+        return None
+
+    def put(self, key: str, data: bytes, verified: bool = True) -> Blob:
+        """Store an object and return a blob serving it"""
+        self._stats["stores"] += 1
+        if self.directory is None:
+            blob = Blob(len(data), data=data, verified=verified)
+            self._remember(key, blob)
+            return blob
+
+        name = self._file_name(key)
+        path = os.path.join(self.directory, name)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        if name in self._disk:
+            self._disk_bytes -= self._disk.pop(name)
+        self._disk[name] = len(data)
+        self._disk_bytes += len(data)
+        while self._disk_bytes > self.disk_max_bytes and len(self._disk) > 1:
+            evicted, size = self._disk.popitem(last=False)
+            self._disk_bytes -= size
+            self._stats["evictions"] += 1
+            try:
+                os.remove(os.path.join(self.directory, evicted))
+            except FileNotFoundError:
+                pass
+
+        if len(data) >= self.mmap_threshold:
+            return Blob(len(data), path=path, verified=verified)
+        blob = Blob(len(data), data=data, verified=verified)
+        self._remember(key, blob)
+        return blob
+
+    def stats(self) -> dict:
+        return {
+            **self._stats,
+            "memory_entries": len(self._memory),
+            "memory_bytes": self._memory_bytes,
+            "disk_entries": len(self._disk),
+            "disk_bytes": self._disk_bytes,
+        }
+
+
+class GatewayReader:
+    """
+    Fetches IPFS content through racing gateways with CID verification
+
+    Bare CIDs are fetched block by block in the trustless raw format
+    (``?format=raw``); every block is hashed against its CID and dag-pb file
+    nodes are walked to reassemble the file. ``CID/path`` targets cannot be
+    verified this way and are fetched as-is, marked unverified.
+
+    Args:
+        gateways: Gateway base URLs ending in ``/ipfs/``
+        cache: Blob cache tiers
+        stagger: Seconds between starting successive gateways in a race
+        timeout: Per-gateway request timeout
+        max_bytes: Largest object accepted
+        block_concurrency: Child blocks fetched in parallel per object
+    """
+
+    def __init__(
+        self,
+        gateways=DEFAULT_GATEWAYS,
+        cache: Optional[BlobCache] = None,
+        stagger: float = 0.2,
+        timeout: float = 30.0,
+        max_bytes: int = 50 * 1024 * 1024,
+        block_concurrency: int = 8
+    ):
+        self.gateways = [gateway if gateway.endswith("/") else gateway + "/" for gateway in gateways]
+        self.cache = cache if cache is not None else BlobCache()
+        self.stagger = stagger
+        self.max_bytes = max_bytes
+        self.block_concurrency = block_concurrency
+        self.upstreams = {
+            gateway: Upstream(
+                gateway,
+                timeout=timeout,
+                retry=RetryPolicy(attempts=1),
+                breaker=CircuitBreaker(failure_threshold=5, reset_timeout=30)
+            )
+            for gateway in self.gateways
+        }
+        self._fetches = SingleFlight()
+        self._stats = {"fetches": 0, "blocks": 0, "invalid_blocks": 0, "unverified": 0}
+        self._wins: dict[str, int] = {gateway: 0 for gateway in self.gateways}
+
+    @classmethod
+    def from_env(cls, default_gateway: Optional[str] = None) -> "GatewayReader":
+        """Build a reader from IPFS_READ_* environment variables"""
+        configured = os.getenv("IPFS_READ_GATEWAYS")
+        if configured:
+            gateways = [gateway.strip() for gateway in configured.split(",") if gateway.strip()]
+        else:
+            gateways = list(DEFAULT_GATEWAYS)
+            if default_gateway and default_gateway not in gateways:
+                gateways.insert(0, default_gateway)
+        return cls(
+            gateways,
+            cache=BlobCache.from_env(),
+            stagger=float(os.getenv("IPFS_READ_STAGGER", "0.2")),
+            timeout=float(os.getenv("IPFS_READ_TIMEOUT", "30")),
+            max_bytes=int(os.getenv("IPFS_READ_MAX_BYTES", str(50 * 1024 * 1024)))
+        )
+
+    async def _get(self, session: "aiohttp.ClientSession", url: str, raw: bool) -> bytes:
+        headers = {"Accept": "application/vnd.ipld.raw"} if raw else {}
+        async with session.get(url, headers=headers) as response:
+            if response.status != 200:
+                raise UpstreamError(f"Gateway returned {response.status}", status=response.status)
+            if (response.content_length or 0) > self.max_bytes:
+                raise UpstreamError("Object exceeds size limit", status=413)
+            body = bytearray()
+            async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                body.extend(chunk)
+                if len(body) > self.max_bytes:
+                    raise UpstreamError("Object exceeds size limit", status=413)
+            return bytes(body)
+
+    async def _race(self, session: "aiohttp.ClientSession", path: str, cid: Optional[CID]) -> bytes:
+        """Fetch ``path`` from every gateway, staggered; first valid body wins"""
+        raw = cid is not None
+        suffix = f"{path}?format=raw" if raw else path
+        tasks: dict[asyncio.Task, str] = {}
+        errors: list[str] = []
+        pending_gateways = list(self.gateways)
+        try:
+            while pending_gateways or tasks:
+                if pending_gateways:
+                    gateway = pending_gateways.pop(0)
+                    upstream = self.upstreams[gateway]
+                    task = asyncio.ensure_future(
+                        upstream.call(lambda url=gateway + suffix: self._get(session, url, raw))
+                    )
+                    tasks[task] = gateway
+                wait = self.stagger if pending_gateways else None
+                done, _ = await asyncio.wait(tasks, timeout=wait, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    gateway = tasks.pop(task)
+                    if task.exception() is not None:
+                        errors.append(f"{gateway}: {task.exception()}")
+                        continue
+                    body = task.result()
+                    if cid is not None and not verify_block(cid, body):
+                        self._stats["invalid_blocks"] += 1
+                        errors.append(f"{gateway}: content does not match CID")
+                        continue
+                    self._wins[gateway] += 1
+                    return body
+        finally:
+            for task in tasks:
+                task.cancel()
+        raise GatewayFetchError(f"No gateway returned {path}: {'; '.join(errors) or 'no gateways'}")
+
+    async def _fetch_block(self, session: "aiohttp.ClientSession", cid: CID) -> bytes:
+        self._stats["blocks"] += 1
+        if cid.hash_code == HASH_IDENTITY:
+            return cid.digest
+        return await self._race(session, str(cid), cid)
+
+    async def _fetch_file(self, session: "aiohttp.ClientSession", cid: CID, budget: list) -> bytes:
+        """Fetch a verified file, walking dag-pb nodes depth-first"""
+        block = await self._fetch_block(session, cid)
+        if cid.codec == CODEC_RAW:
+            inline, links = block, []
+        elif cid.codec == CODEC_DAG_PB:
+            inline, links = decode_file_node(block)
+        else:
+            raise InvalidCID(f"Unsupported CID codec: {cid.codec:#x}")
+        # Shared across the whole tree: bytes still allowed for this object
+        budget[0] -= len(inline)
+        if budget[0] < 0:
+            raise GatewayFetchError("Object exceeds size limit")
+        if not links:
+            return inline
+
+        semaphore = asyncio.Semaphore(self.block_concurrency)
+
+        async def child(link: CID) -> bytes:
+            async with semaphore:
+                return await self._fetch_file(session, link, budget)
+
+        parts = await asyncio.gather(*(child(link) for link in links))
+        return inline + b"".join(parts)
+
+    async def fetch(self, session: "aiohttp.ClientSession", target: str) -> Blob:
+        """
+        Read ``CID`` or ``CID/path`` through the cache
+
+        Args:
+            session: Shared HTTP session
+            target: IPFS path, with or without the ``ipfs://`` prefix
+
+        Returns:
+            Cached blob
+
+        Raises:
+            InvalidCID: If the CID cannot be parsed
+            GatewayFetchError: If no gateway returned valid content
+        """
+        target = target.removeprefix("ipfs://").strip("/")
+        cid_text, _, path = target.partition("/")
+        cid = parse_cid(cid_text)
+        key = f"{cid}/{path}" if path else str(cid)
+
+        blob = self.cache.get(key)
+        if blob is not None:
+            blob.verified = not path
+            return blob
+
+        async def load() -> Blob:
+            self._stats["fetches"] += 1
+            if path:
+                self._stats["unverified"] += 1
+                data = await self._race(session, key, None)
+                return self.cache.put(key, data, verified=False)
+            data = await self._fetch_file(session, cid, [self.max_bytes])
+            return self.cache.put(key, data)
+
+        return await self._fetches.do(key, load)
+
+    def stats(self) -> dict:
+        return {
+            **self._stats,
+            "coalesced": self._fetches.shared,
+            "cache": self.cache.stats(),
+            "gateways": {
+                gateway: {
+                    "wins": self._wins[gateway],
+                    "breaker": upstream.breaker.state,
+                    "latency_p50": upstream.latency.percentile(50),
+                    "latency_p95": upstream.latency.percentile(95),
+                }
+                for gateway, upstream in self.upstreams.items()
+            }
+        }
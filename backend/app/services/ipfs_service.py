@@ -5,22 +5,271 @@ Handles uploading content to IPFS via Web3.Storage or Pinata
 
 import os
 import json
+import asyncio
+import hashlib
 import aiohttp
-from typing import Optional
+from contextlib import ExitStack, asynccontextmanager
+from typing import Awaitable, Callable, Optional, Union
+
+from app.services.content_cache import ContentCache
+from app.services.ipfs_gateway import Blob, GatewayReader
+from app.services.manifest import ManifestCodec, canonical_json
+from app.utils.car import CarEntry, DirectoryPlan
+from app.utils.metrics import instrumented
+from app.utils.resilience import (
+    CircuitBreaker,
+    RetryPolicy,
+    Upstream,
+    UpstreamError,
+    default_retryable,
+    failover_call,
+    hedged_call,
+    parse_retry_after,
+)
+from app.utils.singleflight import SingleFlight
+
+
+def _is_retryable(error: BaseException) -> bool:
+    return default_retryable(error) or isinstance(error, aiohttp.ClientError)
+
+
+def _upstream_error(provider: str, response: aiohttp.ClientResponse, error: str) -> UpstreamError:
+    return UpstreamError(
+        f"{provider} failed: {error}",
+        status=response.status,
+        retry_after=parse_retry_after(response.headers.get("Retry-After"))
+    )
+
+
+class BulkUnsupported(UpstreamError):
+    """Raised when a provider has no bulk (CAR or directory) upload endpoint"""
+
+    @property
+    def retryable(self) -> bool:
+        return False
+
+
+# Statuses meaning the endpoint does not exist, rather than that it failed
+_MISSING_ENDPOINT = (404, 405, 501)
+
+BulkObject = Union[dict, bytes, os.PathLike]
+
+
+def content_digest(data: bytes) -> str:
+    """SHA-256 hex digest used for dedup keys and development mock CIDs"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def _guess_content_type(name: str) -> str:
+    extension = os.path.splitext(name)[1].lower()
+    return {
+        ".json": "application/json",
+        ".png": "image/png",
+        ".webp": "image/webp",
+        ".jpg": "image/jpeg",
+        ".jpeg": "image/jpeg",
+    }.get(extension, "application/octet-stream")
 
 
 class IPFSService:
     """Service for interacting with IPFS storage providers"""
     
-    def __init__(self):
+    def __init__(self, cache: Optional[ContentCache] = None, reader: Optional[GatewayReader] = None):
         # Support multiple IPFS providers
         self.web3_storage_token = os.getenv("WEB3_STORAGE_TOKEN")
         self.pinata_api_key = os.getenv("PINATA_API_KEY")
         self.pinata_secret = os.getenv("PINATA_SECRET")
         
+        # Provider endpoints (overridable to point at local stand-in servers)
+        self.web3_storage_url = os.getenv("WEB3_STORAGE_API_URL", "https://api.web3.storage").rstrip("/")
+        self.pinata_url = os.getenv("PINATA_API_URL", "https://api.pinata.cloud").rstrip("/")
+        
         # Default gateway for retrieval
         self.gateway = os.getenv("IPFS_GATEWAY", "https://w3s.link/ipfs/")
+        
+        # Connection pool tuning
+        self.pool_limit = int(os.getenv("IPFS_POOL_LIMIT", "100"))
+        self.pool_limit_per_host = int(os.getenv("IPFS_POOL_LIMIT_PER_HOST", "20"))
+        self.dns_cache_ttl = int(os.getenv("IPFS_DNS_CACHE_TTL", "300"))
+        self.keepalive_timeout = float(os.getenv("IPFS_KEEPALIVE_TIMEOUT", "30"))
+        self.request_timeout = float(os.getenv("IPFS_REQUEST_TIMEOUT", "60"))
+        self.max_concurrency = int(os.getenv("IPFS_MAX_CONCURRENCY", "16"))
+        # Objects per round when a bulk upload falls back to single uploads
+        self.bulk_chunk_size = int(os.getenv("IPFS_BULK_CHUNK_SIZE", str(self.max_concurrency)))
+        
+        # Per-provider timeouts, retries and circuit breakers
+        retry = RetryPolicy(
+            attempts=int(os.getenv("IPFS_RETRY_ATTEMPTS", "3")),
+            base_delay=float(os.getenv("IPFS_RETRY_BASE_DELAY", "0.5"))
+        )
+        self.upstreams = {
+            name: Upstream(
+                name,
+                timeout=float(os.getenv(f"IPFS_{env}_TIMEOUT", "30")),
+                retry=retry,
+                breaker=CircuitBreaker(
+                    failure_threshold=int(os.getenv("IPFS_BREAKER_FAILURES", "5")),
+                    reset_timeout=float(os.getenv("IPFS_BREAKER_RESET", "30"))
+                ),
+                retryable=_is_retryable
+            )
+            for name, env in (("web3.storage", "WEB3_STORAGE"), ("pinata", "PINATA"))
+        }
+        # Fire the second provider when the first is slower than its p95
+        self.hedge = os.getenv("IPFS_HEDGE", "1").lower() in ("1", "true", "yes")
+        hedge_after = os.getenv("IPFS_HEDGE_AFTER")
+        self.hedge_after = float(hedge_after) if hedge_after else None
+        
+        # Content-addressed dedup of repeated uploads
+        self.cache = cache if cache is not None else ContentCache.from_env()
+        self._uploads = SingleFlight()
+        
+        # Verified, cached reads through a pool of public gateways
+        self.reader = reader if reader is not None else GatewayReader.from_env(self.gateway)
+        
+        # Treasure map manifests are pinned in a compact, size-checked format
+        self.manifests = ManifestCodec.from_env(self.get_gateway_url)
+        
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        # Providers whose bulk endpoint answered "not found"; skipped from then on
+        self._no_bulk: set[str] = set()
+        self._stats = {
+            "bulk_uploads": 0,
+            "bulk_objects": 0,
+            "bulk_fallbacks": 0,
+            "requests": 0,
+            "errors": 0,
+            "in_flight": 0,
+            "max_in_flight": 0,
+            "waiting": 0,
+            "connections_created": 0,
+            "connections_reused": 0,
+            "sessions_created": 0,
+        }
+    
+    def _trace_config(self) -> aiohttp.TraceConfig:
+        """Count new vs. reused pooled connections"""
+        trace_config = aiohttp.TraceConfig()
+        
+        async def on_connection_create_end(session, context, params):
+            self._stats["connections_created"] += 1
+        
+        async def on_connection_reuseconn(session, context, params):
+            self._stats["connections_reused"] += 1
+        
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+        return trace_config
+    
+    async def start(self):
+        """Create the shared HTTP session (called on application startup)"""
+        if self._session is not None and not self._session.closed:
+            return
+        connector = aiohttp.TCPConnector(
+            limit=self.pool_limit,
+            limit_per_host=self.pool_limit_per_host,
+            ttl_dns_cache=self.dns_cache_ttl,
+            keepalive_timeout=self.keepalive_timeout,
+        )
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.request_timeout),
+            trace_configs=[self._trace_config()],
+        )
+        self._stats["sessions_created"] += 1
+    
+    async def close(self):
+        """Close the shared HTTP session (called on application shutdown)"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+    
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Return the shared session, creating it lazily outside the app lifecycle"""
+        if self._session is None or self._session.closed:
+            await self.start()
+        return self._session
+    
+    @asynccontextmanager
+    async def _post(self, url: str, **kwargs):
+        """POST through the shared session, bounded by the concurrency cap"""
+        session = await self._get_session()
+        self._stats["waiting"] += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._stats["waiting"] -= 1  # Also when the waiter is cancelled
+        try:
+            self._stats["requests"] += 1
+            self._stats["in_flight"] += 1
+            self._stats["max_in_flight"] = max(
+                self._stats["max_in_flight"], self._stats["in_flight"]
+            )
+            try:
+                async with session.post(url, **kwargs) as response:
+                    yield response
+            except Exception:
+                self._stats["errors"] += 1
+                raise
+            finally:
+                self._stats["in_flight"] -= 1
+        finally:
+            self._semaphore.release()
+    
+    def pool_stats(self) -> dict:
+        """
+        Connection pool metrics
+        
+        Returns:
+            Dictionary of request counters and connector state
+        """
+        stats = dict(self._stats)
+        stats["max_concurrency"] = self.max_concurrency
+        stats["pool_limit"] = self.pool_limit
+        stats["pool_limit_per_host"] = self.pool_limit_per_host
+        stats["session_open"] = self._session is not None and not self._session.closed
+        return stats
+    
+    async def _upload_with_failover(self, calls: dict) -> str:
+        """Upload through configured providers with hedging or ordered failover"""
+        candidates = [(self.upstreams[name], fn) for name, fn in calls.items()]
+        if self.hedge and len(candidates) == 2:
+            _, uri = await hedged_call(*candidates, hedge_after=self.hedge_after)
+        else:
+            _, uri = await failover_call(candidates)
+        return uri
     
+    def upstream_stats(self) -> dict:
+        """Breaker state, retry counters and latency per IPFS provider"""
+        return {name: upstream.stats() for name, upstream in self.upstreams.items()}
+    
+    async def _dedup_upload(
+        self,
+        key: str,
+        upload: Callable[[], Awaitable[str]]
+    ) -> str:
+        """Return the cached URI for ``key`` or run a single shared upload"""
+        # The cache's SQLite tier blocks (and put() periodically trims it),
+        # so both calls run in a thread
+        uri = await asyncio.to_thread(self.cache.get, key)
+        if uri is not None:
+            return uri
+        
+        async def run() -> str:
+            result = await upload()
+            await asyncio.to_thread(self.cache.put, key, result)
+            return result
+        
+        return await self._uploads.do(key, run)
+    
+    def cache_stats(self) -> dict:
+        """Dedup cache counters, including collapsed concurrent uploads"""
+        stats = self.cache.stats()
+        stats["coalesced_uploads"] = self._uploads.shared
+        return stats
+    
+    @instrumented("ipfs", "upload_json")
     async def upload_json(
         self,
         content: dict,
@@ -36,17 +285,23 @@ class IPFSService:
         Returns:
             IPFS URI (ipfs://...)
         """
-        # Try Web3.Storage first
-        if self.web3_storage_token:
-            return await self._upload_to_web3_storage(content, filename)
+        data = canonical_json(content)
+        content_hash = content_digest(data)
         
-        # Fall back to Pinata
+        # Web3.Storage first, Pinata as hedge/failover
+        calls = {}
+        if self.web3_storage_token:
+            calls["web3.storage"] = lambda: self._upload_to_web3_storage(content, filename)
         if self.pinata_api_key and self.pinata_secret:
-            return await self._upload_to_pinata(content, filename)
+            calls["pinata"] = lambda: self._upload_to_pinata(content, filename)
+        
+        if calls:
+            return await self._dedup_upload(
+                f"json:{content_hash}",
+                lambda: self._upload_with_failover(calls)
+            )
         
         # If no IPFS service configured, return mock URI for development
-        import hashlib
-        content_hash = hashlib.sha256(json.dumps(content).encode()).hexdigest()
         return f"ipfs://Qm{content_hash[:44]}"
     
     async def _upload_to_web3_storage(
@@ -55,27 +310,24 @@ class IPFSService:
         filename: str
     ) -> str:
         """Upload to Web3.Storage"""
-        url = "https://api.web3.storage/upload"
+        url = f"{self.web3_storage_url}/upload"
         headers = {
             "Authorization": f"Bearer {self.web3_storage_token}",
             "X-NAME": filename
         }
         
-        json_content = json.dumps(content, ensure_ascii=False)
-        
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                url,
-                headers=headers,
-                data=json_content.encode("utf-8")
-            ) as response:
-                if response.status == 200:
-                    result = await response.json()
-                    cid = result.get("cid")
-                    return f"ipfs://{cid}"
-                else:
-                    error = await response.text()
-                    raise Exception(f"Web3.Storage upload failed: {error}")
+        async with self._post(
+            url,
+            headers=headers,
+            data=canonical_json(content)
+        ) as response:
+            if response.status == 200:
+                result = await response.json()
+                cid = result.get("cid")
+                return f"ipfs://{cid}"
+            else:
+                error = await response.text()
+                raise _upstream_error("Web3.Storage upload", response, error)
     
     async def _upload_to_pinata(
         self,
@@ -83,7 +335,7 @@ class IPFSService:
         filename: str
     ) -> str:
         """Upload to Pinata"""
-        url = "https://api.pinata.cloud/pinning/pinJSONToIPFS"
+        url = f"{self.pinata_url}/pinning/pinJSONToIPFS"
         headers = {
             "pinata_api_key": self.pinata_api_key,
             "pinata_secret_api_key": self.pinata_secret,
@@ -97,20 +349,20 @@ class IPFSService:
             }
         }
         
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                url,
-                headers=headers,
-                json=payload
-            ) as response:
-                if response.status == 200:
-                    result = await response.json()
-                    ipfs_hash = result.get("IpfsHash")
-                    return f"ipfs://{ipfs_hash}"
-                else:
-                    error = await response.text()
-                    raise Exception(f"Pinata upload failed: {error}")
+        async with self._post(
+            url,
+            headers=headers,
+            json=payload
+        ) as response:
+            if response.status == 200:
+                result = await response.json()
+                ipfs_hash = result.get("IpfsHash")
+                return f"ipfs://{ipfs_hash}"
+            else:
+                error = await response.text()
+                raise _upstream_error("Pinata upload", response, error)
     
+    @instrumented("ipfs", "upload_file")
     async def upload_file(
         self,
         file_content: bytes,
@@ -128,19 +380,25 @@ class IPFSService:
         Returns:
             IPFS URI (ipfs://...)
         """
+        content_hash = content_digest(file_content)
+        
+        calls = {}
         if self.web3_storage_token:
-            return await self._upload_file_to_web3_storage(
+            calls["web3.storage"] = lambda: self._upload_file_to_web3_storage(
                 file_content, filename, content_type
             )
-        
         if self.pinata_api_key and self.pinata_secret:
-            return await self._upload_file_to_pinata(
+            calls["pinata"] = lambda: self._upload_file_to_pinata(
                 file_content, filename, content_type
             )
         
+        if calls:
+            return await self._dedup_upload(
+                f"file:{content_hash}",
+                lambda: self._upload_with_failover(calls)
+            )
+        
         # Mock for development
-        import hashlib
-        content_hash = hashlib.sha256(file_content).hexdigest()
         return f"ipfs://Qm{content_hash[:44]}"
     
     async def _upload_file_to_web3_storage(
@@ -150,25 +408,24 @@ class IPFSService:
         content_type: str
     ) -> str:
         """Upload binary file to Web3.Storage"""
-        url = "https://api.web3.storage/upload"
+        url = f"{self.web3_storage_url}/upload"
         headers = {
             "Authorization": f"Bearer {self.web3_storage_token}",
             "X-NAME": filename
         }
         
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                url,
-                headers=headers,
-                data=file_content
-            ) as response:
-                if response.status == 200:
-                    result = await response.json()
-                    cid = result.get("cid")
-                    return f"ipfs://{cid}"
-                else:
-                    error = await response.text()
-                    raise Exception(f"Web3.Storage file upload failed: {error}")
+        async with self._post(
+            url,
+            headers=headers,
+            data=file_content
+        ) as response:
+            if response.status == 200:
+                result = await response.json()
+                cid = result.get("cid")
+                return f"ipfs://{cid}"
+            else:
+                error = await response.text()
+                raise _upstream_error("Web3.Storage file upload", response, error)
     
     async def _upload_file_to_pinata(
         self,
@@ -177,7 +434,7 @@ class IPFSService:
         content_type: str
     ) -> str:
         """Upload binary file to Pinata"""
-        url = "https://api.pinata.cloud/pinning/pinFileToIPFS"
+        url = f"{self.pinata_url}/pinning/pinFileToIPFS"
         headers = {
             "pinata_api_key": self.pinata_api_key,
             "pinata_secret_api_key": self.pinata_secret
@@ -191,19 +448,217 @@ class IPFSService:
             content_type=content_type
         )
         
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                url,
-                headers=headers,
-                data=form_data
-            ) as response:
+        async with self._post(
+            url,
+            headers=headers,
+            data=form_data
+        ) as response:
+            if response.status == 200:
+                result = await response.json()
+                ipfs_hash = result.get("IpfsHash")
+                return f"ipfs://{ipfs_hash}"
+            else:
+                error = await response.text()
+                raise _upstream_error("Pinata file upload", response, error)
+    
+    @instrumented("ipfs", "upload_bulk")
+    async def upload_bulk(self, objects: dict[str, BulkObject], name: str = "bulk") -> dict:
+        """
+        Upload many objects as one directory in a single request
+        
+        Web3.Storage receives a CAR archive streamed block by block; Pinata
+        receives a multipart directory upload. When neither provider offers
+        a bulk endpoint the objects are uploaded individually, in rounds of
+        ``bulk_chunk_size``.
+        
+        Args:
+            objects: File name -> JSON dict, bytes, or path of a file to stream
+            name: Upload name shown by the provider
+        
+        Returns:
+            {"root": directory URI or None, "objects": {name: {"cid", "path",
+            "uri"}}}; ``cid`` is None when the provider's CID could not be
+            confirmed, in which case ``uri`` is the directory path
+        """
+        entries = [self._bulk_entry(object_name, value) for object_name, value in objects.items()]
+        plan = await asyncio.to_thread(DirectoryPlan, entries)
+        self._stats["bulk_objects"] += len(entries)
+        
+        providers = {}
+        if self.web3_storage_token:
+            providers["web3.storage"] = lambda: self._upload_car_to_web3_storage(plan, name)
+        if self.pinata_api_key and self.pinata_secret:
+            providers["pinata"] = lambda: self._upload_directory_to_pinata(plan, name)
+        if not providers:
+            # No provider configured (development): report the local CIDs
+            return self._bulk_result(plan, str(plan.root))
+        
+        calls = {n: fn for n, fn in providers.items() if n not in self._no_bulk}
+        if calls:
+            try:
+                _, root = await failover_call([(self.upstreams[n], fn) for n, fn in calls.items()])
+                self._stats["bulk_uploads"] += 1
+                return self._bulk_result(plan, root)
+            except Exception:
+                # A provider without a bulk endpoint may still take the
+                # objects one by one, whatever the others failed with;
+                # with none of those, individual uploads would fail too
+                if not self._no_bulk.intersection(providers):
+                    raise
+        
+        self._stats["bulk_fallbacks"] += 1
+        return await self._upload_individually(entries)
+    
+    @staticmethod
+    def _bulk_entry(name: str, value: BulkObject) -> CarEntry:
+        if isinstance(value, dict):
+            return CarEntry(name, data=canonical_json(value))
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            return CarEntry(name, data=bytes(value))
+        if isinstance(value, os.PathLike):
+            return CarEntry(name, path=os.fspath(value))
+        raise TypeError(f"Unsupported bulk object for {name}: {type(value).__name__}")
+    
+    @staticmethod
+    def _bulk_result(plan: DirectoryPlan, root: str) -> dict:
+        """Map objects to CIDs, trusting local CIDs only if the root matches"""
+        confirmed = root == str(plan.root)
+        objects = {}
+        for object_name, cid in plan.objects.items():
+            path = f"ipfs://{root}/{object_name}"
+            objects[object_name] = {
+                "cid": str(cid) if confirmed else None,
+                "path": path,
+                "uri": f"ipfs://{cid}" if confirmed else path
+            }
+        return {"root": f"ipfs://{root}", "objects": objects}
+    
+    async def _upload_individually(self, entries: list[CarEntry]) -> dict:
+        objects = {}
+        for start in range(0, len(entries), self.bulk_chunk_size):
+            chunk = entries[start:start + self.bulk_chunk_size]
+            contents = await asyncio.gather(*(asyncio.to_thread(entry.read) for entry in chunk))
+            uris = await asyncio.gather(*(
+                self.upload_file(data, entry.name, _guess_content_type(entry.name))
+                for entry, data in zip(chunk, contents)
+            ))
+            for entry, uri in zip(chunk, uris):
+                objects[entry.name] = {"cid": uri.removeprefix("ipfs://"), "path": None, "uri": uri}
+        return {"root": None, "objects": objects}
+    
+    def _check_bulk_response(self, provider: str, response: aiohttp.ClientResponse, error: str):
+        if response.status in _MISSING_ENDPOINT:
+            self._no_bulk.add(provider)
+            raise BulkUnsupported(f"{provider} has no bulk upload endpoint", status=response.status)
+        raise _upstream_error(f"{provider} bulk upload", response, error)
+    
+    async def _upload_car_to_web3_storage(self, plan: DirectoryPlan, name: str) -> str:
+        """Stream the directory to Web3.Storage as a CAR archive"""
+        url = f"{self.web3_storage_url}/car"
+        headers = {
+            "Authorization": f"Bearer {self.web3_storage_token}",
+            "X-NAME": name,
+            "Content-Type": "application/vnd.ipld.car"
+        }
+        
+        async def body():
+            frames = plan.iter_car()
+            while True:
+                frame = await asyncio.to_thread(next, frames, None)
+                if frame is None:
+                    return
+                yield frame
+        
+        async with self._post(url, headers=headers, data=body()) as response:
+            if response.status == 200:
+                result = await response.json()
+                return result.get("cid")
+            self._check_bulk_response("web3.storage", response, await response.text())
+    
+    async def _upload_directory_to_pinata(self, plan: DirectoryPlan, name: str) -> str:
+        """Upload the directory to Pinata as one multipart request"""
+        url = f"{self.pinata_url}/pinning/pinFileToIPFS"
+        headers = {
+            "pinata_api_key": self.pinata_api_key,
+            "pinata_secret_api_key": self.pinata_secret
+        }
+        
+        with ExitStack() as files:
+            form_data = aiohttp.FormData()
+            for entry in plan.entries:
+                content = entry.data if entry.data is not None else files.enter_context(open(entry.path, "rb"))
+                form_data.add_field(
+                    "file",
+                    content,
+                    filename=f"{name}/{entry.name}",
+                    content_type=_guess_content_type(entry.name)
+                )
+            form_data.add_field("pinataMetadata", json.dumps({"name": name}))
+            # CIDv1 makes Pinata lay files out like DirectoryPlan does
+            form_data.add_field("pinataOptions", json.dumps({"cidVersion": 1}))
+            
+            async with self._post(url, headers=headers, data=form_data) as response:
                 if response.status == 200:
                     result = await response.json()
-                    ipfs_hash = result.get("IpfsHash")
-                    return f"ipfs://{ipfs_hash}"
-                else:
-                    error = await response.text()
-                    raise Exception(f"Pinata file upload failed: {error}")
+                    return result.get("IpfsHash")
+                self._check_bulk_response("pinata", response, await response.text())
+    
+    async def upload_manifest(self, manifest: dict, filename: str = "manifest.json") -> str:
+        """
+        Pin a treasure map manifest in the compact wire format
+        
+        The encoded bytes are pinned as a file so the CID covers exactly
+        those bytes; identical maps therefore share one CID.
+        
+        Args:
+            manifest: Expanded manifest (see ManifestCodec)
+            filename: Name of the file
+        
+        Returns:
+            IPFS URI (ipfs://...)
+        
+        Raises:
+            ManifestError: If the manifest is invalid or over the size budget
+        """
+        data = self.manifests.encode(manifest)
+        return await self.upload_file(data, filename, "application/json")
+    
+    async def fetch_manifest(self, ipfs_uri: str) -> dict:
+        """
+        Read and decode a pinned manifest (current or legacy format)
+        
+        Raises:
+            ManifestError: If the content is not a valid manifest
+        """
+        blob = await self.fetch(ipfs_uri)
+        return self.manifests.decode(blob.read())
+    
+    async def migrate_manifest(self, ipfs_uri: str) -> str:
+        """
+        Re-pin an existing manifest in the current format
+        
+        Returns:
+            URI of the re-pinned manifest (unchanged content re-pins to the
+            same CID)
+        """
+        return await self.upload_manifest(await self.fetch_manifest(ipfs_uri))
+    
+    @instrumented("ipfs", "fetch")
+    async def fetch(self, ipfs_uri: str) -> Blob:
+        """
+        Read IPFS content through the gateway pool and local cache
+        
+        Args:
+            ipfs_uri: IPFS URI (ipfs://CID[/path]) or bare CID[/path]
+        
+        Returns:
+            Cached blob; bare CIDs are verified block by block
+        """
+        return await self.reader.fetch(await self._get_session(), ipfs_uri)
+    
+    def reader_stats(self) -> dict:
+        """Gateway race wins, block verification and read cache counters"""
+        return self.reader.stats()
     
     def get_gateway_url(self, ipfs_uri: str) -> str:
         """
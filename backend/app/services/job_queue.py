@@ -0,0 +1,374 @@
+"""
+Job Queue - Asynchronous treasure map creation
+Submissions return a job ID immediately; an in-process worker pool runs the
+puzzle/image/IPFS pipeline and clients poll for the result
+"""
+
+import asyncio
+import itertools
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import Optional
+
+from app.services.pipeline import PipelineError, TreasureMapPipeline
+
+
+# Lower value runs first
+PRIORITIES = {"high": 0, "normal": 1, "low": 2}
+TERMINAL_STATUSES = ("succeeded", "failed")
+
+
+class JobNotFound(LookupError):
+    """Raised when a job ID is unknown"""
+
+
+class JobStore(ABC):
+    """Storage backend interface for job records"""
+
+    @abstractmethod
+    def save(self, job: dict):
+        """Insert or replace a job record"""
+
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[dict]:
+        """Job record by ID, or None if unknown"""
+
+    @abstractmethod
+    def unfinished(self) -> list[dict]:
+        """Jobs that were queued or running, e.g. before a restart"""
+
+    @abstractmethod
+    def claim(self, job_id: str) -> Optional[dict]:
+        """
+        Mark a queued job as running
+
+        Returns:
+            The job record, or None if it is unknown or another worker already
+            claimed it
+        """
+
+    @abstractmethod
+    def purge(self, finished_before: float) -> int:
+        """Drop finished jobs last updated before the given timestamp"""
+
+
+class InMemoryJobStore(JobStore):
+    """Process-local job storage"""
+
+    def __init__(self):
+        self._jobs: dict[str, dict] = {}
+
+    def save(self, job: dict):
+        self._jobs[job["id"]] = dict(job)
+
+    def get(self, job_id: str) -> Optional[dict]:
+        job = self._jobs.get(job_id)
+        return dict(job) if job is not None else None
+
+    def unfinished(self) -> list[dict]:
+        return [dict(job) for job in self._jobs.values() if job["status"] not in TERMINAL_STATUSES]
+
+    def claim(self, job_id: str) -> Optional[dict]:
+        job = self._jobs.get(job_id)
+        if job is None or job["status"] != "queued":
+            return None
+        job["status"] = "running"
+        return dict(job)
+
+    def purge(self, finished_before: float) -> int:
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job["status"] in TERMINAL_STATUSES and job["updated_at"] < finished_before
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+        return len(expired)
+
+
+class SQLiteJobStore(JobStore):
+    """
+    Job storage persisted to SQLite so queued jobs survive restarts
+
+    Several worker processes may share one file; ``claim`` makes sure each
+    job runs in only one of them.
+    """
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5.0)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY,"
+            " status TEXT NOT NULL,"
+            " updated_at REAL NOT NULL,"
+            " data TEXT NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, updated_at)")
+        self._lock = threading.Lock()
+
+    def save(self, job: dict):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO jobs (id, status, updated_at, data) VALUES (?, ?, ?, ?)",
+                (job["id"], job["status"], job["updated_at"], json.dumps(job, ensure_ascii=False))
+            )
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._db.execute("SELECT data FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def unfinished(self) -> list[dict]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT data FROM jobs WHERE status NOT IN (?, ?)", TERMINAL_STATUSES
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def claim(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE jobs SET status = 'running' WHERE id = ? AND status = 'queued'", (job_id,)
+            )
+            if cursor.rowcount == 0:
+                return None
+            row = self._db.execute("SELECT data FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        job = json.loads(row[0])
+        job["status"] = "running"
+        return job
+
+    def purge(self, finished_before: float) -> int:
+        with self._lock:
+            cursor = self._db.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?",
+                (*TERMINAL_STATUSES, finished_before)
+            )
+        return cursor.rowcount
+
+
+class JobQueue:
+    """
+    Priority job queue with an asyncio worker pool
+
+    Args:
+        pipeline: Pipeline used to execute jobs (configure retries/limits on it)
+        store: Job storage backend
+        workers: Number of concurrent worker tasks
+        retention: Seconds to keep finished jobs
+        recover_after: On start, only requeue running jobs not updated for
+            this many seconds (set it when several processes share a store,
+            so live jobs of other workers are left alone)
+        poll_interval: Seconds between store reads while long-polling, so
+            updates made by other processes are seen
+    """
+
+    def __init__(
+        self,
+        pipeline: TreasureMapPipeline,
+        store: Optional[JobStore] = None,
+        workers: int = 4,
+        retention: float = 3600,
+        recover_after: float = 0,
+        poll_interval: float = 1.0
+    ):
+        self.pipeline = pipeline
+        self.store = store or InMemoryJobStore()
+        self.workers = workers
+        self.retention = retention
+        self.recover_after = recover_after
+        self.poll_interval = poll_interval
+        self._queue: asyncio.PriorityQueue = asyncio.PriorityQueue()
+        self._queued_ids: set[str] = set()
+        self._sequence = itertools.count()
+        self._tasks: list[asyncio.Task] = []
+        self._busy: set[asyncio.Task] = set()
+        self._closing = False
+        # Replaced on every update; long-pollers wait on the current one
+        self._changed = asyncio.Event()
+
+    @classmethod
+    def from_env(cls, openai_service, ipfs_service) -> "JobQueue":
+        """Build a queue from JOB_* environment variables"""
+        pipeline = TreasureMapPipeline(
+            openai_service,
+            ipfs_service,
+            retries=int(os.getenv("JOB_STAGE_RETRIES", "2")),
+            retry_backoff=float(os.getenv("JOB_RETRY_BACKOFF", "1.0")),
+            limits={"image": asyncio.Semaphore(int(os.getenv("JOB_MAX_IMAGE_JOBS", "2")))}
+        )
+        if os.getenv("JOB_STORE", "memory") == "sqlite":
+            store = SQLiteJobStore(os.getenv("JOB_STORE_PATH", ".cache/jobs.sqlite3"))
+        else:
+            store = InMemoryJobStore()
+        return cls(
+            pipeline,
+            store=store,
+            workers=int(os.getenv("JOB_WORKERS", "4")),
+            retention=float(os.getenv("JOB_RETENTION", "3600")),
+            recover_after=float(os.getenv("JOB_RECOVER_AFTER", "0"))
+        )
+
+    def _update(self, job: dict, **changes):
+        job.update(changes)
+        job["updated_at"] = time.time()
+        self.store.save(job)
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    def _enqueue(self, job: dict):
+        self._queued_ids.add(job["id"])
+        self._queue.put_nowait((PRIORITIES[job["priority"]], next(self._sequence), job["id"]))
+
+    def submit(self, request: dict, priority: str = "normal") -> dict:
+        """
+        Queue a treasure map creation job
+
+        Args:
+            request: Puzzle request fields (keywords, difficulty, language, cache)
+            priority: Lane name (high, normal, low)
+
+        Returns:
+            The new job record
+        """
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority: {priority}")
+        now = time.time()
+        job = {
+            "id": uuid.uuid4().hex,
+            "status": "queued",
+            "priority": priority,
+            "stage": None,
+            "request": request,
+            "result": None,
+            "error": None,
+            "created_at": now,
+            "updated_at": now
+        }
+        self.store.save(job)
+        self._enqueue(job)
+        return job
+
+    def get(self, job_id: str) -> dict:
+        """
+        Fetch a job record
+
+        Raises:
+            JobNotFound: If the job does not exist
+        """
+        job = self.store.get(job_id)
+        if job is None:
+            raise JobNotFound(job_id)
+        return job
+
+    async def wait(self, job_id: str, timeout: float) -> dict:
+        """
+        Long-poll a job until it finishes or ``timeout`` elapses
+
+        Returns:
+            The latest job record
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            changed = self._changed
+            job = self.get(job_id)
+            remaining = deadline - time.monotonic()
+            if job["status"] in TERMINAL_STATUSES or remaining <= 0:
+                return job
+            try:
+                await asyncio.wait_for(changed.wait(), timeout=min(remaining, self.poll_interval))
+            except asyncio.TimeoutError:
+                pass
+
+    async def _execute(self, job: dict):
+        self._update(job, status="running", stage="puzzle")
+        request = job["request"]
+        try:
+            async for event in self.pipeline.stream(
+                keywords=request["keywords"],
+                difficulty=request.get("difficulty") or "medium",
+                language=request.get("language") or "zh",
+                cache=request.get("cache") or "prefer"
+            ):
+                if event["event"] == "complete":
+                    self._update(job, status="succeeded", stage=None, result=event["data"])
+                else:
+                    self._update(job, stage=event["event"])
+        except asyncio.CancelledError:
+            # Interrupted by stop(): hand the job back so the next start (here
+            # or in another process) picks it up instead of treating it as owned
+            self._update(job, status="queued", stage=None)
+            raise
+        except PipelineError as e:
+            self._update(job, status="failed", error={"message": str(e), "errors": e.errors})
+        except Exception as e:
+            self._update(job, status="failed", error={"message": str(e)})
+
+    async def _worker(self):
+        task = asyncio.current_task()
+        while not self._closing:
+            _, _, job_id = await self._queue.get()
+            self._queued_ids.discard(job_id)
+            self._busy.add(task)
+            try:
+                job = self.store.claim(job_id)
+                if job is not None:
+                    await self._execute(job)
+                self.store.purge(time.time() - self.retention)
+            finally:
+                self._busy.discard(task)
+                self._queue.task_done()
+
+    def start(self):
+        """Start the worker pool and requeue jobs left unfinished by a restart"""
+        if self._tasks:
+            return
+        self._closing = False
+        stale_before = time.time() - self.recover_after
+        for job in sorted(self.store.unfinished(), key=lambda job: job["created_at"]):
+            if job["id"] in self._queued_ids:
+                continue
+            if job["status"] == "running":
+                if job["updated_at"] > stale_before:
+                    continue  # Still being worked on by another process
+                self._update(job, status="queued", stage=None)
+            self._enqueue(job)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self, drain_timeout: float = 0):
+        """
+        Stop the worker pool
+
+        Args:
+            drain_timeout: Seconds to let running jobs finish before they are
+                cancelled; queued and interrupted jobs are requeued on next
+                start when the store is persistent
+        """
+        self._closing = True
+        busy = set(self._busy)
+        for task in self._tasks:
+            if task not in busy:
+                task.cancel()
+        if busy and drain_timeout > 0:
+            await asyncio.wait(busy, timeout=drain_timeout)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._busy.clear()
+
+    def stats(self) -> dict:
+        """Queue depth and worker counts"""
+        return {
+            "queued": self._queue.qsize(),
+            "workers": len(self._tasks),
+            "running": len(self._busy),
+            "stage_retries": dict(self.pipeline.retry_counts)
+        }
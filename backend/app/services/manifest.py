@@ -0,0 +1,209 @@
+"""
+Map Manifests - Versioned, compact wire format for pinned treasure maps
+Identical maps serialize to identical bytes (and so identical CIDs); long
+stories are deflated and every manifest is held to a size budget before it
+is pinned
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import os
+import zlib
+from typing import Callable, Optional
+
+from pydantic import ValidationError
+
+from app.schemas import MANIFEST_VERSION, MapManifest
+
+
+DEFAULT_MAX_BYTES = 8 * 1024
+DEFAULT_COMPRESS_OVER = 1024
+# Upper bound on an inflated story, so a hostile manifest cannot balloon
+MAX_STORY_BYTES = 64 * 1024
+
+
+class ManifestError(ValueError):
+    """Raised for content that is not a valid manifest"""
+
+
+class ManifestTooLarge(ManifestError):
+    """Raised when an encoded manifest exceeds the size budget"""
+
+    def __init__(self, size: int, limit: int):
+        super().__init__(f"Manifest is {size} bytes, over the {limit} byte budget")
+        self.size = size
+        self.limit = limit
+
+
+def canonical_json(content: dict) -> bytes:
+    """Serialize JSON deterministically so equal content yields equal bytes"""
+    return json.dumps(
+        content, sort_keys=True, separators=(",", ":"), ensure_ascii=False
+    ).encode("utf-8")
+
+
+def _deflate(text: str) -> str:
+    compressor = zlib.compressobj(9, zlib.DEFLATED, -15)
+    data = compressor.compress(text.encode("utf-8")) + compressor.flush()
+    return base64.b85encode(data).decode("ascii")
+
+
+def _inflate(encoded: str) -> str:
+    try:
+        decompressor = zlib.decompressobj(-15)
+        data = decompressor.decompress(base64.b85decode(encoded), MAX_STORY_BYTES)
+    except (ValueError, zlib.error) as e:
+        raise ManifestError(f"Invalid compressed story: {e}") from e
+    if decompressor.unconsumed_tail:
+        raise ManifestError(f"Story inflates past {MAX_STORY_BYTES} bytes")
+    return data.decode("utf-8")
+
+
+class ManifestCodec:
+    """
+    Encode pipeline manifests to the wire format and decode them back
+
+    The expanded form is what the pipeline builds and the API returns:
+    story, question, hints, difficulty, image, image_url, image_variants
+    ({name: {"uri", "url"}}) and metadata. Legacy manifests (pinned before
+    the format was versioned) are accepted by ``decode``.
+
+    Args:
+        max_bytes: Size budget for an encoded manifest
+        compress_over: Deflate stories of at least this many UTF-8 bytes
+            when that makes them smaller (0 disables compression)
+        gateway_url: Maps an ipfs:// URI to an HTTP URL when expanding
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        compress_over: int = DEFAULT_COMPRESS_OVER,
+        gateway_url: Optional[Callable[[str], str]] = None
+    ):
+        self.max_bytes = max_bytes
+        self.compress_over = compress_over
+        self.gateway_url = gateway_url or (lambda uri: uri)
+
+    @classmethod
+    def from_env(cls, gateway_url: Optional[Callable[[str], str]] = None) -> "ManifestCodec":
+        """Build a codec from MANIFEST_* environment variables"""
+        return cls(
+            max_bytes=int(os.getenv("MANIFEST_MAX_BYTES", str(DEFAULT_MAX_BYTES))),
+            compress_over=int(os.getenv("MANIFEST_COMPRESS_OVER", str(DEFAULT_COMPRESS_OVER))),
+            gateway_url=gateway_url
+        )
+
+    def _compact_story(self, story: str) -> dict:
+        if self.compress_over and len(story.encode("utf-8")) >= self.compress_over:
+            packed = _deflate(story)
+            if len(packed) < len(json.dumps(story, ensure_ascii=False).encode("utf-8")):
+                return {"story_z": packed}
+        return {"story": story}
+
+    def encode(self, manifest: dict) -> bytes:
+        """
+        Serialize an expanded manifest
+
+        Raises:
+            ManifestError: If required fields are missing or invalid
+            ManifestTooLarge: If the result exceeds ``max_bytes``
+        """
+        variants = manifest.get("image_variants") or {}
+        try:
+            compact = MapManifest(
+                **self._compact_story(manifest["story"]),
+                question=manifest["question"],
+                hints=manifest["hints"],
+                difficulty=manifest["difficulty"],
+                image=manifest.get("image"),
+                variants={
+                    name: info["uri"] if isinstance(info, dict) else info
+                    for name, info in variants.items()
+                },
+                metadata=manifest.get("metadata")
+            )
+        except (KeyError, ValidationError) as e:
+            raise ManifestError(f"Invalid manifest: {e}") from e
+
+        data = canonical_json(compact.model_dump(exclude_defaults=True) | {"v": MANIFEST_VERSION})
+        if len(data) > self.max_bytes:
+            raise ManifestTooLarge(len(data), self.max_bytes)
+        return data
+
+    def decode(self, data: bytes) -> dict:
+        """
+        Parse and validate a pinned manifest into the expanded form
+
+        Raises:
+            ManifestError: If the bytes are not a valid (current or legacy)
+                manifest
+        """
+        if len(data) > self.max_bytes:
+            raise ManifestTooLarge(len(data), self.max_bytes)
+        try:
+            compact = MapManifest.model_validate_json(data)
+        except ValidationError as e:
+            compact = self._decode_legacy(data, e)
+
+        image = compact.image
+        return {
+            "version": compact.v,
+            "story": compact.story if compact.story is not None else _inflate(compact.story_z),
+            "question": compact.question,
+            "hints": compact.hints,
+            "difficulty": compact.difficulty,
+            "image": image,
+            "image_url": self.gateway_url(image) if image else None,
+            "image_variants": {
+                name: {"uri": uri, "url": self.gateway_url(uri)}
+                for name, uri in compact.variants.items()
+            },
+            "metadata": compact.metadata
+        }
+
+    @staticmethod
+    def _decode_legacy(data: bytes, error: ValidationError) -> MapManifest:
+        try:
+            content = json.loads(data)
+        except ValueError:
+            raise ManifestError("Manifest is not JSON") from None
+        if not isinstance(content, dict) or "v" in content:
+            raise ManifestError(f"Invalid manifest: {error}") from None
+        variants = content.get("image_variants") or {}
+        try:
+            return MapManifest(
+                story=content.get("story"),
+                question=content.get("question"),
+                hints=content.get("hints"),
+                difficulty=content.get("difficulty"),
+                image=content.get("image"),
+                variants={name: info["uri"] for name, info in variants.items()},
+                metadata=content.get("metadata")
+            )
+        except (KeyError, TypeError, ValidationError) as e:
+            raise ManifestError(f"Invalid legacy manifest: {e}") from None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-pin treasure map manifests in the current format")
+    parser.add_argument("uris", nargs="+", help="ipfs:// URIs or CIDs of existing manifests")
+    args = parser.parse_args()
+
+    async def main():
+        from app.services.ipfs_service import IPFSService
+
+        ipfs_service = IPFSService()
+        await ipfs_service.start()
+        try:
+            for uri in args.uris:
+                try:
+                    print(f"{uri} -> {await ipfs_service.migrate_manifest(uri)}")
+                except ManifestError as e:
+                    print(f"{uri} !! {e}")
+        finally:
+            await ipfs_service.close()
+
+    asyncio.run(main())
@@ -0,0 +1,230 @@
+"""
+Model Router - Per-task model selection for OpenAI chat calls
+Sends cheap tasks (answer checks, easy puzzles) to a fast tier and the rest
+to a quality tier, with per-route concurrency limits and usage accounting
+"""
+
+import asyncio
+import json
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from app.utils.metrics import REGISTRY
+from app.utils.resilience import LatencyHistogram
+
+
+ROUTE_SECONDS = REGISTRY.histogram(
+    "openai_route_duration_seconds",
+    "OpenAI chat call duration by route and task",
+    labels=("route", "task", "outcome")
+)
+ROUTE_ESCALATIONS = REGISTRY.counter(
+    "openai_route_escalations_total",
+    "Calls retried on the escalation route after output validation failed",
+    labels=("task", "from_route")
+)
+RESPONSE_FORMATS = (None, "json_object", "json_schema")
+
+# Prices are USD per 1K tokens and only feed the cost estimates in stats.
+# response_format is "json_schema" (structured outputs), "json_object" (JSON
+# mode) or omitted for models that support neither
+DEFAULT_CONFIG = {
+    "routes": {
+        "fast": {
+            "model": "gpt-4o-mini",
+            "concurrency": 16,
+            "prompt_cost": 0.00015,
+            "completion_cost": 0.0006,
+            "response_format": "json_schema"
+        },
+        "quality": {
+            "model": "gpt-4",
+            "concurrency": 4,
+            "prompt_cost": 0.03,
+            "completion_cost": 0.06
+        }
+    },
+    # First matching rule wins; omitted fields match anything
+    "rules": [
+        {"task": "validate_answer", "route": "fast"},
+        {"task": "puzzle", "difficulty": "easy", "route": "fast"},
+        {"route": "quality"}
+    ],
+    "escalate_to": "quality"
+}
+
+
+class Route:
+    """
+    One model tier with its own concurrency limit and usage counters
+
+    Args:
+        name: Route name used in rules and stats
+        model: OpenAI model ID
+        concurrency: Maximum in-flight calls on this route
+        prompt_cost: USD per 1K prompt tokens
+        completion_cost: USD per 1K completion tokens
+        response_format: Structured-output mode the model supports
+            ("json_schema", "json_object" or None)
+    """
+
+    def __init__(
+        self,
+        name: str,
+        model: str,
+        concurrency: int = 8,
+        prompt_cost: float = 0.0,
+        completion_cost: float = 0.0,
+        response_format: Optional[str] = None
+    ):
+        if response_format not in RESPONSE_FORMATS:
+            raise ValueError(f"Unknown response format for route {name}: {response_format}")
+        self.name = name
+        self.model = model
+        self.concurrency = concurrency
+        self.prompt_cost = prompt_cost
+        self.completion_cost = completion_cost
+        self.response_format = response_format
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.latency = LatencyHistogram()
+        self.in_flight = 0
+        self._stats = {"calls": 0, "errors": 0, "prompt_tokens": 0, "completion_tokens": 0}
+
+    @asynccontextmanager
+    async def slot(self, task: str):
+        """Hold a concurrency slot on this route and time the enclosed call"""
+        async with self.semaphore:
+            self.in_flight += 1
+            self._stats["calls"] += 1
+            started = time.perf_counter()
+            outcome = "error"
+            try:
+                yield self
+                outcome = "ok"
+            except BaseException:
+                self._stats["errors"] += 1
+                raise
+            finally:
+                elapsed = time.perf_counter() - started
+                self.in_flight -= 1
+                self.latency.observe(elapsed)
+                ROUTE_SECONDS.observe(elapsed, route=self.name, task=task, outcome=outcome)
+
+    def record_usage(self, response):
+        """Add a completion's token usage to this route"""
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            self._stats["prompt_tokens"] += usage.prompt_tokens or 0
+            self._stats["completion_tokens"] += usage.completion_tokens or 0
+
+    @property
+    def tokens(self) -> tuple[int, int]:
+        return self._stats["prompt_tokens"], self._stats["completion_tokens"]
+
+    def cost(self, prompt_tokens: int, completion_tokens: int) -> float:
+        return (prompt_tokens * self.prompt_cost + completion_tokens * self.completion_cost) / 1000
+
+    def stats(self) -> dict:
+        return {
+            **self._stats,
+            "model": self.model,
+            "response_format": self.response_format,
+            "in_flight": self.in_flight,
+            "concurrency": self.concurrency,
+            "estimated_cost": round(self.cost(*self.tokens), 6),
+            "latency": self.latency.snapshot()
+        }
+
+
+class ModelRouter:
+    """
+    Chooses a route per (task, difficulty) from declarative rules
+
+    Args:
+        routes: Route name -> Route
+        rules: Ordered rule dicts with optional ``task``/``difficulty`` and
+            the ``route`` to use
+        escalate_to: Route to retry on when a cheaper route's output fails
+            validation (None disables escalation)
+    """
+
+    def __init__(self, routes: dict[str, Route], rules: list[dict], escalate_to: Optional[str] = None):
+        for rule in rules:
+            if rule["route"] not in routes:
+                raise ValueError(f"Rule refers to unknown route: {rule['route']}")
+        if escalate_to is not None and escalate_to not in routes:
+            raise ValueError(f"Unknown escalation route: {escalate_to}")
+        self.routes = routes
+        self.rules = rules
+        self.escalate_to = escalate_to
+        self.escalations: dict[str, int] = {}
+
+    @classmethod
+    def from_config(cls, config: dict) -> "ModelRouter":
+        routes = {
+            name: Route(
+                name,
+                spec["model"],
+                concurrency=int(spec.get("concurrency", 8)),
+                prompt_cost=float(spec.get("prompt_cost", 0)),
+                completion_cost=float(spec.get("completion_cost", 0)),
+                response_format=spec.get("response_format")
+            )
+            for name, spec in config["routes"].items()
+        }
+        return cls(routes, list(config["rules"]), config.get("escalate_to"))
+
+    @classmethod
+    def from_env(cls) -> "ModelRouter":
+        """
+        Build a router from OPENAI_ROUTES (inline JSON) or OPENAI_ROUTES_FILE
+
+        Without either, DEFAULT_CONFIG is used with OPENAI_FAST_MODEL and
+        OPENAI_QUALITY_MODEL overriding the two tiers' models.
+        """
+        inline = os.getenv("OPENAI_ROUTES")
+        path = os.getenv("OPENAI_ROUTES_FILE")
+        if inline:
+            return cls.from_config(json.loads(inline))
+        if path:
+            with open(path, encoding="utf-8") as f:
+                return cls.from_config(json.load(f))
+        config = json.loads(json.dumps(DEFAULT_CONFIG))
+        config["routes"]["fast"]["model"] = os.getenv("OPENAI_FAST_MODEL", config["routes"]["fast"]["model"])
+        config["routes"]["quality"]["model"] = os.getenv("OPENAI_QUALITY_MODEL", config["routes"]["quality"]["model"])
+        return cls.from_config(config)
+
+    def route(self, task: str, difficulty: Optional[str] = None) -> Route:
+        """Pick the route for a task; falls back to the escalation route"""
+        for rule in self.rules:
+            if rule.get("task", task) == task and rule.get("difficulty", difficulty) == difficulty:
+                return self.routes[rule["route"]]
+        return self.routes[self.escalate_to or next(iter(self.routes))]
+
+    def escalation(self, task: str, current: Route) -> Optional[Route]:
+        """Route to retry on after ``current`` produced invalid output, if any"""
+        if self.escalate_to is None or self.escalate_to == current.name:
+            return None
+        key = f"{task}:{current.name}"
+        self.escalations[key] = self.escalations.get(key, 0) + 1
+        ROUTE_ESCALATIONS.inc(task=task, from_route=current.name)
+        return self.routes[self.escalate_to]
+
+    def stats(self) -> dict:
+        """Per-route usage plus the estimated saving versus the escalation route"""
+        routes = {name: route.stats() for name, route in self.routes.items()}
+        baseline = self.routes.get(self.escalate_to) if self.escalate_to else None
+        savings = 0.0
+        if baseline is not None:
+            for route in self.routes.values():
+                if route is baseline:
+                    continue
+                prompt, completion = route.tokens
+                savings += baseline.cost(prompt, completion) - route.cost(prompt, completion)
+        return {
+            "routes": routes,
+            "escalations": dict(self.escalations),
+            "estimated_savings": round(savings, 6)
+        }
@@ -4,23 +4,132 @@ Handles AI-powered puzzle and image generation
 """
 
 import os
-from typing import Optional
-from openai import AsyncOpenAI
+import base64
+import json
+from typing import TYPE_CHECKING, Optional
+
+from app.schemas import PUZZLE_FIELDS, PuzzleContent, field_error, puzzle_json_schema
+from app.services.answer_checker import AnswerChecker, normalize_answer
+from app.services.model_router import ModelRouter, Route
+from app.services.image_cache import ImageCache, image_key
+from app.services.prompts import PromptLibrary, PromptPack
+from app.services.puzzle_cache import PuzzleCache, PuzzleCacheMiss
+from app.utils.json_stream import IncrementalJSONParser, MalformedJSON
+from app.utils.metrics import REGISTRY, instrumented
+from app.utils.resilience import CircuitBreaker, RetryPolicy, Upstream
+from app.utils.singleflight import SingleFlight
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+
+TOKENS_USED = REGISTRY.counter(
+    "openai_tokens_total",
+    "Tokens reported in OpenAI completion usage",
+    labels=("model", "kind")
+)
+PUZZLE_JSON_PARSE = REGISTRY.counter(
+    "puzzle_json_parse_total",
+    "Puzzle completion parse outcomes (streamed, aborted, invalid)",
+    labels=("outcome",)
+)
+PUZZLE_REPAIRS = REGISTRY.counter(
+    "puzzle_repairs_total",
+    "Targeted repairs of missing or invalid puzzle fields (repaired, failed)",
+    labels=("outcome",)
+)
+
+
+def record_usage(response):
+    """Add completion token usage to the token counters"""
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return
+    model = getattr(response, "model", None) or "unknown"
+    TOKENS_USED.inc(usage.prompt_tokens or 0, model=model, kind="prompt")
+    TOKENS_USED.inc(usage.completion_tokens or 0, model=model, kind="completion")
+
+
+def _is_retryable(error: BaseException) -> bool:
+    """Retry rate limits, timeouts, connection and server errors"""
+    import openai  # Already loaded by the client that raised the error
+    return isinstance(error, (
+        TimeoutError,
+        openai.RateLimitError,
+        openai.APIConnectionError,
+        openai.InternalServerError,
+    ))
 
 
 class OpenAIService:
     """Service for interacting with OpenAI APIs"""
     
-    def __init__(self):
-        self.client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-        self.model = "gpt-4"
+    def __init__(
+        self,
+        puzzle_cache: Optional[PuzzleCache] = None,
+        answer_checker: Optional[AnswerChecker] = None,
+        router: Optional[ModelRouter] = None,
+        prompts: Optional[PromptLibrary] = None,
+        image_cache: Optional[ImageCache] = None
+    ):
+        # The SDK is imported with the first request (see client)
+        self._client: Optional["AsyncOpenAI"] = None
         self.image_model = "dall-e-3"
+        # Chat models are picked per task/difficulty by the router
+        self.router = router if router is not None else ModelRouter.from_env()
+        # Targeted re-asks for bad fields before regenerating a whole puzzle
+        self.puzzle_repairs = int(os.getenv("OPENAI_PUZZLE_REPAIRS", "1"))
+        
+        retry = RetryPolicy(
+            attempts=int(os.getenv("OPENAI_RETRY_ATTEMPTS", "3")),
+            base_delay=float(os.getenv("OPENAI_RETRY_BASE_DELAY", "1.0"))
+        )
+        self.upstreams = {
+            name: Upstream(
+                name,
+                timeout=float(os.getenv(env, default)),
+                retry=retry,
+                breaker=CircuitBreaker(
+                    failure_threshold=int(os.getenv("OPENAI_BREAKER_FAILURES", "5")),
+                    reset_timeout=float(os.getenv("OPENAI_BREAKER_RESET", "30"))
+                ),
+                retryable=_is_retryable
+            )
+            for name, env, default in (
+                ("openai-chat", "OPENAI_CHAT_TIMEOUT", "60"),
+                ("openai-image", "OPENAI_IMAGE_TIMEOUT", "120"),
+            )
+        }
+        
+        # Pluggable puzzle cache; concurrent misses share one upstream call
+        self.puzzle_cache = puzzle_cache if puzzle_cache is not None else PuzzleCache.from_env()
+        self._puzzle_flights = SingleFlight()
+        
+        # Identical image prompts in flight or generated recently share one DALL-E call
+        self.image_cache = image_cache if image_cache is not None else ImageCache.from_env()
+        
+        # Every puzzle handed out is indexed for off-chain answer pre-checks
+        self.answer_checker = answer_checker if answer_checker is not None else AnswerChecker.from_env()
+        
+        # Prompt packs are compiled once per process and shared by all calls
+        self.prompts = prompts if prompts is not None else PromptLibrary.from_env()
     
+    @property
+    def client(self) -> "AsyncOpenAI":
+        """OpenAI client, created (and the SDK imported) on first use"""
+        if self._client is None:
+            from openai import AsyncOpenAI
+            # Retries are handled by the upstream policies
+            self._client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0)
+        return self._client
+    
+    @instrumented("openai", "generate_puzzle")
     async def generate_puzzle(
         self,
         keywords: list[str],
         difficulty: str = "medium",
-        language: str = "zh"
+        language: str = "zh",
+        cache: str = "prefer"
     ) -> dict:
         """
         Generate a treasure hunt puzzle using GPT-4
@@ -29,69 +138,279 @@ class OpenAIService:
             keywords: List of keywords to inspire the puzzle
             difficulty: Puzzle difficulty (easy, medium, hard)
             language: Output language (zh or en)
+            cache: "prefer" to serve cached puzzles when available, "bypass"
+                to always generate (refreshing the cache), or "only" to
+                serve from cache without calling the API
         
         Returns:
-            Dictionary containing story, question, answer, and hints
+            Dictionary containing story, question, answer, aliases and hints
+        
+        Raises:
+            PuzzleCacheMiss: If cache is "only" and nothing is cached
         """
-        difficulty_descriptions = {
-            "easy": "简单，答案比较直观" if language == "zh" else "easy, the answer is straightforward",
-            "medium": "中等难度，需要一些思考" if language == "zh" else "medium difficulty, requires some thinking",
-            "hard": "困难，需要仔细分析多个线索" if language == "zh" else "hard, requires careful analysis of multiple clues"
-        }
+        key = self.puzzle_cache.make_key(keywords, difficulty, language, self.prompt_version(language))
         
-        lang_instruction = "请用中文回复" if language == "zh" else "Please respond in English"
+        if cache != "bypass":
+            cached = self.puzzle_cache.get(key)
+            if cached is not None:
+                self.answer_checker.register_puzzle(cached)
+                return cached
+            if cache == "only":
+                raise PuzzleCacheMiss("No cached puzzle for these keywords")
         
-        prompt = f"""
-        {lang_instruction}
-        
-        你是一个创意谜题设计师，需要根据以下关键词创建一个藏宝图谜题：
-        关键词：{', '.join(keywords)}
-        难度：{difficulty_descriptions.get(difficulty, difficulty_descriptions['medium'])}
-        
-        请生成以下内容（以JSON格式）：
-        1. story: 一个引人入胜的背景故事（100-200字）
-        2. question: 需要解答的谜题问题
-        3. answer: 谜题的正确答案（简短明确，1-5个字）
-        4. hints: 3个由易到难的提示
-        
-        回复格式：
-        {{
-            "story": "故事内容...",
-            "question": "谜题问题...",
-            "answer": "答案",
-            "hints": ["提示1", "提示2", "提示3"]
-        }}
-        
-        只返回JSON，不要其他文字。
-        """
-        
-        response = await self.client.chat.completions.create(
-            model=self.model,
-            messages=[
-                {"role": "system", "content": "你是一个专业的谜题设计师，擅长创造有趣且有深度的解谜内容。"},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.8,
-            max_tokens=1000
-        )
+        async def generate() -> dict:
+            result = await self._generate_puzzle(keywords, difficulty, language)
+            self.puzzle_cache.put(key, result)
+            return result
         
-        import json
-        content = response.choices[0].message.content
+        result = await self._puzzle_flights.do(key, generate)
+        self.answer_checker.register_puzzle(result)
+        return dict(result)
+    
+    def prompt_version(self, language: str) -> str:
+        """Version of the prompt pack used for ``language``"""
+        return self.prompts.get(language).version
+    
+    def route_stats(self) -> dict:
+        """Calls, tokens, latency and estimated cost per model route"""
+        return self.router.stats()
+    
+    async def _chat(self, route: Route, task: str, messages: list[dict], **kwargs):
+        """Run one chat completion on ``route`` within its concurrency limit"""
+        async with route.slot(task):
+            response = await self.upstreams["openai-chat"].call(
+                lambda: self.client.chat.completions.create(
+                    model=route.model,
+                    messages=messages,
+                    **kwargs
+                )
+            )
+        route.record_usage(response)
+        record_usage(response)
+        return response
+    
+    def upstream_stats(self) -> dict:
+        """Breaker state, retry counters and latency per OpenAI endpoint"""
+        return {name: upstream.stats() for name, upstream in self.upstreams.items()}
+    
+    def puzzle_cache_stats(self) -> dict:
+        """Puzzle cache counters, including coalesced concurrent misses"""
+        stats = self.puzzle_cache.stats()
+        stats["coalesced_requests"] = self._puzzle_flights.shared
+        return stats
+    
+    def image_cache_stats(self) -> dict:
+        """Image generation counters, including calls saved by coalescing"""
+        return self.image_cache.stats()
+    
+    async def _generate_puzzle(
+        self,
+        keywords: list[str],
+        difficulty: str,
+        language: str
+    ) -> dict:
+        """Call GPT-4 to generate a puzzle (uncached)"""
+        events = self._stream_puzzle(keywords, difficulty, language)
+        try:
+            async for event in events:
+                if event["event"] == "puzzle":
+                    return event["data"]
+        finally:
+            await events.aclose()
+        raise ValueError("Puzzle stream ended without a puzzle")
+    
+    async def _stream_completion(self, route: Route, task: str, messages: list[dict], **kwargs):
+        """
+        Yield the content deltas of a streamed chat completion on ``route``
+        
+        The route's concurrency slot is held until the generator finishes or
+        is closed; closing it early also closes the HTTP stream, so aborted
+        completions stop consuming tokens.
+        """
+        async with route.slot(task):
+            stream = await self.upstreams["openai-chat"].call(
+                lambda: self.client.chat.completions.create(
+                    model=route.model,
+                    messages=messages,
+                    stream=True,
+                    stream_options={"include_usage": True},
+                    **kwargs
+                )
+            )
+            try:
+                async for chunk in stream:
+                    # Usage arrives on a final chunk with no choices
+                    if getattr(chunk, "usage", None) is not None:
+                        route.record_usage(chunk)
+                        record_usage(chunk)
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+            finally:
+                await stream.close()
+    
+    async def _stream_puzzle(self, keywords: list[str], difficulty: str, language: str):
+        """
+        Generate a puzzle as a stream of events (uncached)
+        
+        Yields ``partial`` events with text appended to a string field,
+        ``field`` events as each valid top-level field completes and a final
+        ``puzzle`` event. Output that stops being a JSON object is abandoned
+        at the first bad token. Fields that are missing or fail PuzzleContent
+        validation are re-asked in a targeted repair call instead of
+        regenerating the whole puzzle; only output with nothing usable, or
+        that cannot be repaired, is regenerated on the escalation route,
+        announced by a ``retry`` event (clients should discard the fields
+        they received before it).
+        
+        Raises:
+            ValueError: If no route produces a valid puzzle
+        """
+        pack = self.prompts.get(language)
+        messages = pack.puzzle_messages(keywords, difficulty)
+        
+        # Easy puzzles start on the fast tier; invalid output escalates
+        route = self.router.route("puzzle", difficulty)
+        while True:
+            fields, errors = {}, {}
+            parser = IncrementalJSONParser()
+            deltas = self._stream_completion(
+                route, "puzzle", messages,
+                temperature=0.8, max_tokens=pack.max_tokens(), **self._response_format(route)
+            )
+            try:
+                async for delta in deltas:
+                    for kind, name, value in parser.feed(delta):
+                        if kind == "partial":
+                            yield {"event": "partial", "data": {"field": name, "text": value}}
+                        elif name in PuzzleContent.model_fields:
+                            error = field_error(name, value)
+                            if error is not None:
+                                errors[name] = error
+                                continue
+                            fields[name] = value
+                            yield {"event": "field", "data": {"field": name, "value": value}}
+                parser.close()
+                PUZZLE_JSON_PARSE.inc(outcome="streamed")
+            except MalformedJSON:
+                # Fields that completed before the bad token are kept
+                PUZZLE_JSON_PARSE.inc(outcome="aborted")
+            finally:
+                await deltas.aclose()
+            
+            for name in PUZZLE_FIELDS:
+                if name not in fields:
+                    errors.setdefault(name, "missing")
+            if fields and errors:
+                async for event in self._repair_puzzle(pack, route, messages, fields, errors):
+                    yield event
+            if not errors:
+                yield {"event": "puzzle", "data": {**fields, "prompt_version": pack.version}}
+                return
+            
+            PUZZLE_JSON_PARSE.inc(outcome="invalid")
+            error = ValueError(f"AI response has missing or invalid fields: {', '.join(errors)}")
+            route = self.router.escalation("puzzle", route)
+            if route is None:
+                raise error
+            yield {"event": "retry", "data": {"route": route.name, "reason": str(error)}}
+    
+    async def _repair_puzzle(self, pack: PromptPack, route: Route, messages: list[dict], fields: dict, errors: dict):
+        """
+        Re-ask ``route`` for only the fields listed in ``errors``
+        
+        The valid fields are sent back as the assistant turn so repaired
+        values stay consistent with them. Accepted values are merged into
+        ``fields``, removed from ``errors`` and yielded as ``field`` events.
+        """
+        for _ in range(self.puzzle_repairs):
+            names = list(errors)
+            problems = "\n".join(f"- {name}: {error}" for name, error in errors.items())
+            repair = messages + [
+                {"role": "assistant", "content": json.dumps(fields, ensure_ascii=False)},
+                {"role": "user", "content": pack.render("repair", problems=problems, fields=", ".join(names))}
+            ]
+            response = await self._chat(
+                route, "puzzle_repair", repair,
+                temperature=0.2,
+                max_tokens=pack.max_tokens(names),
+                **self._response_format(route, names)
+            )
+            try:
+                reply = json.loads(response.choices[0].message.content or "")
+            except json.JSONDecodeError:
+                reply = None
+            if isinstance(reply, dict):
+                for name in names:
+                    if name in reply and field_error(name, reply[name]) is None:
+                        fields[name] = reply[name]
+                        del errors[name]
+                        yield {"event": "field", "data": {"field": name, "value": reply[name]}}
+            if not errors:
+                PUZZLE_REPAIRS.inc(outcome="repaired")
+                return
+        PUZZLE_REPAIRS.inc(outcome="failed")
+    
+    @staticmethod
+    def _response_format(route: Route, fields: Optional[list[str]] = None) -> dict:
+        """Structured-output arguments for a puzzle call on ``route``"""
+        if route.response_format == "json_schema":
+            return {"response_format": puzzle_json_schema(fields)}
+        if route.response_format == "json_object":
+            return {"response_format": {"type": "json_object"}}
+        return {}
+    
+    async def stream_puzzle(
+        self,
+        keywords: list[str],
+        difficulty: str = "medium",
+        language: str = "zh",
+        cache: str = "prefer"
+    ):
+        """
+        Generate a puzzle, yielding fields as soon as the model finishes them
         
-        # Parse JSON response
+        Cache hits are replayed as ``field`` events followed by the ``puzzle``
+        event. Generated puzzles are cached and registered for answer
+        pre-checks like those from generate_puzzle.
+        
+        Args:
+            keywords: List of keywords to inspire the puzzle
+            difficulty: Puzzle difficulty (easy, medium, hard)
+            language: Output language (zh or en)
+            cache: Same as generate_puzzle
+        
+        Yields:
+            Event dicts with ``event`` and ``data`` keys (see _stream_puzzle)
+        
+        Raises:
+            PuzzleCacheMiss: If cache is "only" and nothing is cached
+        """
+        key = self.puzzle_cache.make_key(keywords, difficulty, language, self.prompt_version(language))
+        
+        if cache != "bypass":
+            cached = self.puzzle_cache.get(key)
+            if cached is not None:
+                self.answer_checker.register_puzzle(cached)
+                for name, value in cached.items():
+                    if name not in PuzzleContent.model_fields:
+                        continue
+                    yield {"event": "field", "data": {"field": name, "value": value}}
+                yield {"event": "puzzle", "data": cached, "cached": True}
+                return
+            if cache == "only":
+                raise PuzzleCacheMiss("No cached puzzle for these keywords")
+        
+        events = self._stream_puzzle(keywords, difficulty, language)
         try:
-            result = json.loads(content)
-        except json.JSONDecodeError:
-            # Try to extract JSON from the response
-            import re
-            json_match = re.search(r'\{.*\}', content, re.DOTALL)
-            if json_match:
-                result = json.loads(json_match.group())
-            else:
-                raise ValueError("Failed to parse AI response as JSON")
-        
-        return result
+            async for event in events:
+                if event["event"] == "puzzle":
+                    self.puzzle_cache.put(key, event["data"])
+                    self.answer_checker.register_puzzle(event["data"])
+                yield event
+        finally:
+            await events.aclose()
     
+    @instrumented("openai", "generate_image")
     async def generate_image(
         self,
         description: str,
@@ -100,6 +419,9 @@ class OpenAIService:
         """
         Generate a treasure map image using DALL-E
         
+        Identical requests in flight or made within IMAGE_CACHE_TTL share one
+        generation (see ImageCache).
+        
         Args:
             description: Description of the scene/story
             style: Art style for the image
@@ -107,6 +429,65 @@ class OpenAIService:
         Returns:
             URL of the generated image
         """
+        prompt = self._image_prompt(description, style)
+        
+        async def generate():
+            response = await self.upstreams["openai-image"].call(
+                lambda: self.client.images.generate(
+                    model=self.image_model,
+                    prompt=prompt,
+                    size="1024x1024",
+                    quality="standard",
+                    n=1
+                )
+            )
+            return response.data[0].url
+        
+        return await self.image_cache.get_or_generate(
+            image_key(self.image_model, prompt, "url"), generate
+        )
+    
+    @instrumented("openai", "generate_image_bytes")
+    async def generate_image_bytes(
+        self,
+        description: str,
+        style: str = "treasure map"
+    ) -> bytes:
+        """
+        Generate a treasure map image and return its PNG bytes
+        
+        Uses the b64_json response format so the image can be pinned directly
+        instead of being re-downloaded from an expiring OpenAI URL.
+        
+        Args:
+            description: Description of the scene/story
+            style: Art style for the image
+        
+        Returns:
+            PNG image bytes
+        """
+        prompt = self._image_prompt(description, style)
+        
+        async def generate():
+            response = await self.upstreams["openai-image"].call(
+                lambda: self.client.images.generate(
+                    model=self.image_model,
+                    prompt=prompt,
+                    size="1024x1024",
+                    quality="standard",
+                    response_format="b64_json",
+                    n=1
+                )
+            )
+            return base64.b64decode(response.data[0].b64_json)
+        
+        return await self.image_cache.get_or_generate(
+            image_key(self.image_model, prompt, "b64_json"), generate
+        )
+    
+    @staticmethod
+    def _image_prompt(description: str, style: str) -> str:
+        """Build the DALL-E prompt for a treasure map illustration"""
         prompt = f"""
         Create a {style} style illustration:
         {description}
@@ -115,22 +496,15 @@ class OpenAIService:
         mysterious symbols, compass rose, decorative borders.
         Make it look like an ancient, hand-drawn treasure map.
         """
-        
-        response = await self.client.images.generate(
-            model=self.image_model,
-            prompt=prompt[:4000],  # DALL-E prompt limit
-            size="1024x1024",
-            quality="standard",
-            n=1
-        )
-        
-        return response.data[0].url
+        return prompt[:4000]  # DALL-E prompt limit
     
+    @instrumented("openai", "validate_answer")
     async def validate_answer(
         self,
         question: str,
         user_answer: str,
-        correct_answer: str
+        correct_answer: str,
+        language: str = "zh"
     ) -> dict:
         """
         Use AI to validate if the user's answer is semantically correct
@@ -139,40 +513,75 @@ class OpenAIService:
             question: The puzzle question
             user_answer: User's submitted answer
             correct_answer: The expected correct answer
+            language: Prompt pack to use (zh or en)
         
         Returns:
             Dictionary with validation result and explanation
         """
-        prompt = f"""
-        判断用户答案是否与正确答案语义相同：
-        
-        问题：{question}
-        正确答案：{correct_answer}
-        用户答案：{user_answer}
-        
-        只需回复JSON格式：
-        {{
-            "is_correct": true/false,
-            "explanation": "解释原因"
-        }}
-        """
-        
-        response = await self.client.chat.completions.create(
-            model=self.model,
-            messages=[
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0,
-            max_tokens=200
+        pack = self.prompts.get(language)
+        prompt = pack.render(
+            "validate",
+            question=question,
+            correct_answer=correct_answer,
+            user_answer=user_answer
         )
         
-        import json
-        content = response.choices[0].message.content
+        messages = [{"role": "user", "content": prompt}]
+        route = self.router.route("validate_answer")
+        while route is not None:
+            json_mode = {"response_format": {"type": "json_object"}} if route.response_format else {}
+            response = await self._chat(route, "validate_answer", messages, temperature=0, max_tokens=200, **json_mode)
+            content = response.choices[0].message.content
+            try:
+                result = json.loads(content)
+            except json.JSONDecodeError:
+                result = None
+            if isinstance(result, dict) and "is_correct" in result:
+                return result
+            route = self.router.escalation("validate_answer", route)
         
-        try:
-            return json.loads(content)
-        except json.JSONDecodeError:
-            return {
-                "is_correct": user_answer.lower().strip() == correct_answer.lower().strip(),
-                "explanation": "直接字符串比较"
-            }
+        return {
+            "is_correct": normalize_answer(user_answer) == normalize_answer(correct_answer),
+            "explanation": pack.validate_fallback
+        }
+    
+    async def precheck_answer(
+        self,
+        answer_hash: str,
+        user_answer: str,
+        consult_ai: bool = False
+    ) -> dict:
+        """
+        Pre-check a guess before the player pays for a commit transaction
+        
+        The local index decides clear matches and misses; only "ambiguous"
+        guesses are sent to GPT, and only when ``consult_ai`` is set. AI
+        verdicts are cached per map like local ones.
+        
+        Args:
+            answer_hash: On-chain answer hash of the map
+            user_answer: Player's answer as typed
+            consult_ai: Ask GPT to settle ambiguous guesses
+        
+        Returns:
+            Dictionary with verdict, source, distance, onchain_exact and
+            commit_answer (see AnswerChecker.check)
+        
+        Raises:
+            UnknownMap: If the map's answer was never registered
+        """
+        result = self.answer_checker.check(answer_hash, user_answer)
+        if result["verdict"] != "ambiguous" or not consult_ai:
+            return result
+        
+        profile = self.answer_checker.get(answer_hash)
+        validation = await self.validate_answer(profile.question, user_answer, profile.answer)
+        is_correct = bool(validation.get("is_correct"))
+        self.answer_checker.resolve(answer_hash, user_answer, is_correct)
+        return {
+            **result,
+            "verdict": "match" if is_correct else "mismatch",
+            "source": "ai",
+            "commit_answer": profile.answer if is_correct else None,
+            "explanation": validation.get("explanation")
+        }
@@ -0,0 +1,287 @@
+"""
+Treasure Map Pipeline - Staged creation workflow
+Overlaps image generation with IPFS pinning and reports partial results
+"""
+
+import asyncio
+import os
+import time
+from typing import AsyncIterator, Awaitable, Callable, Optional
+
+from app.services.manifest import ManifestError
+from app.utils.images import make_variants
+from app.utils.metrics import REGISTRY, span
+
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "pipeline_stage_duration_seconds",
+    "Duration of treasure map pipeline stages including retries",
+    labels=("stage", "outcome")
+)
+
+
+# Default per-stage timeouts in seconds, overridable via PIPELINE_<STAGE>_TIMEOUT
+DEFAULT_STAGE_TIMEOUTS = {
+    "puzzle": 60.0,
+    "metadata": 30.0,
+    "image": 90.0,
+    "image_pin": 60.0,
+    "manifest": 30.0,
+}
+
+
+class PipelineError(Exception):
+    """Raised when the pipeline cannot produce a usable treasure map"""
+
+    def __init__(self, message: str, errors: Optional[dict] = None):
+        super().__init__(message)
+        self.errors = errors or {}
+
+
+class TreasureMapPipeline:
+    """
+    Staged treasure map creation
+
+    Stage 1: generate the puzzle
+    Stage 2: pin the text metadata and generate the image concurrently
+    Stage 3: pin the image bytes (and optional WebP variants), then pin the
+    final manifest referencing everything by ipfs:// URI and gateway URL
+
+    Only the puzzle stage is fatal. Failures or timeouts in later stages are
+    collected in ``errors`` and the best available URI is returned.
+
+    Args:
+        openai_service: Service used for puzzle and image generation
+        ipfs_service: Service used for pinning
+        timeouts: Per-stage timeout overrides in seconds
+        retries: Extra attempts per stage after a failure or timeout
+        retry_backoff: Base delay in seconds, doubled on each retry
+        limits: Optional per-stage semaphores capping concurrent executions
+        image_variants: Also pin WebP/thumbnail variants (requires Pillow);
+            defaults to the IMAGE_VARIANTS environment variable
+    """
+
+    def __init__(
+        self,
+        openai_service,
+        ipfs_service,
+        timeouts: Optional[dict] = None,
+        retries: int = 0,
+        retry_backoff: float = 0.5,
+        limits: Optional[dict[str, asyncio.Semaphore]] = None,
+        image_variants: Optional[bool] = None
+    ):
+        self.openai_service = openai_service
+        self.ipfs_service = ipfs_service
+        self.timeouts = {
+            stage: float(os.getenv(f"PIPELINE_{stage.upper()}_TIMEOUT", default))
+            for stage, default in DEFAULT_STAGE_TIMEOUTS.items()
+        }
+        self.timeouts.update(timeouts or {})
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.limits = limits or {}
+        if image_variants is None:
+            image_variants = os.getenv("IMAGE_VARIANTS", "").lower() in ("1", "true", "yes")
+        self.image_variants = image_variants
+        self.retry_counts: dict[str, int] = {stage: 0 for stage in DEFAULT_STAGE_TIMEOUTS}
+
+    async def _attempt_stage(self, stage: str, fn: Callable[[], Awaitable]):
+        limit = self.limits.get(stage)
+        if limit is None:
+            return await asyncio.wait_for(fn(), timeout=self.timeouts[stage])
+        # Waiting for a slot does not count against the stage timeout
+        async with limit:
+            return await asyncio.wait_for(fn(), timeout=self.timeouts[stage])
+
+    async def _run_stage(self, stage: str, fn: Callable[[], Awaitable]):
+        """Run a stage under its timeout, retrying with exponential backoff"""
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            with span(f"stage.{stage}"):
+                result = await self._run_stage_with_retries(stage, fn)
+            outcome = "ok"
+            return result
+        finally:
+            STAGE_SECONDS.observe(time.perf_counter() - started, stage=stage, outcome=outcome)
+
+    async def _run_stage_with_retries(self, stage: str, fn: Callable[[], Awaitable]):
+        for attempt in range(self.retries + 1):
+            try:
+                return await self._attempt_stage(stage, fn)
+            except asyncio.TimeoutError:
+                error = TimeoutError(f"Stage '{stage}' timed out after {self.timeouts[stage]}s")
+            except ManifestError:
+                raise  # Retrying cannot make the content valid
+            except Exception as e:
+                error = e
+            if attempt == self.retries:
+                raise error
+            self.retry_counts[stage] += 1
+            await asyncio.sleep(self.retry_backoff * (2 ** attempt))
+
+    def _pinned(self, uri: str) -> dict:
+        return {"uri": uri, "url": self.ipfs_service.get_gateway_url(uri)}
+
+    async def _pin_image(self, image_bytes: bytes) -> dict:
+        """Pin the image, together with any variants in one bulk upload"""
+        if self.image_variants:
+            variants = await asyncio.to_thread(make_variants, image_bytes)
+        else:
+            variants = {}
+
+        if variants:
+            filenames = {"original": "treasure-map.png"}
+            filenames.update({name: f"treasure-map-{name}.webp" for name in variants})
+            files = {filenames["original"]: image_bytes}
+            files.update({filenames[name]: data for name, data in variants.items()})
+            uploaded = await self.ipfs_service.upload_bulk(files, name="treasure-map")
+            uris = {name: uploaded["objects"][filename]["uri"] for name, filename in filenames.items()}
+        else:
+            uris = {"original": await self.ipfs_service.upload_file(image_bytes, "treasure-map.png", "image/png")}
+
+        pinned = {name: self._pinned(uri) for name, uri in uris.items()}
+        return {
+            "image_uri": pinned["original"]["uri"],
+            "image_url": pinned["original"]["url"],
+            "variants": {name: info for name, info in pinned.items() if name != "original"}
+        }
+
+    async def stream(
+        self,
+        keywords: list[str],
+        difficulty: str = "medium",
+        language: str = "zh",
+        cache: str = "prefer"
+    ) -> AsyncIterator[dict]:
+        """
+        Run the pipeline, yielding an event as each stage finishes
+
+        Args:
+            keywords: List of keywords to inspire the puzzle
+            difficulty: Puzzle difficulty (easy, medium, hard)
+            language: Output language (zh or en)
+            cache: Puzzle cache mode (bypass, prefer, only)
+
+        Yields:
+            Dictionaries of the form {"event": name, "data": payload}. The last
+            event is always "complete" with the full result.
+        """
+        errors = {}
+
+        # Stage 1: puzzle (fatal on failure)
+        puzzle = await self._run_stage(
+            "puzzle",
+            lambda: self.openai_service.generate_puzzle(
+                keywords=keywords,
+                difficulty=difficulty,
+                language=language,
+                cache=cache
+            )
+        )
+        yield {"event": "puzzle", "data": puzzle}
+
+        # Stage 2: pin text metadata while the image is being generated
+        metadata = {
+            "story": puzzle["story"],
+            "question": puzzle["question"],
+            "hints": puzzle["hints"],
+            "difficulty": difficulty
+        }
+        metadata_task = asyncio.create_task(
+            self._run_stage("metadata", lambda: self.ipfs_service.upload_manifest(metadata, "metadata.json"))
+        )
+        image_task = asyncio.create_task(
+            self._run_stage(
+                "image",
+                lambda: self.openai_service.generate_image_bytes(
+                    description=puzzle["story"][:500],  # Use first 500 chars of story
+                    style="treasure map"
+                )
+            )
+        )
+
+        metadata_uri = None
+        image_bytes = None
+        image = {"image_uri": None, "image_url": None, "variants": {}}
+        pending = {metadata_task, image_task}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    stage = "metadata" if task is metadata_task else "image"
+                    if task.exception() is not None:
+                        errors[stage] = str(task.exception())
+                    elif stage == "metadata":
+                        metadata_uri = task.result()
+                        yield {"event": "metadata", "data": {"metadata_uri": metadata_uri}}
+                    else:
+                        image_bytes = task.result()
+        finally:
+            # Client disconnects close the generator; don't leave stages running
+            for task in pending:
+                task.cancel()
+
+        # Stage 3a: pin the image bytes so the map never depends on an expiring URL
+        if image_bytes is not None:
+            try:
+                image = await self._run_stage("image_pin", lambda: self._pin_image(image_bytes))
+                puzzle["image_url"] = image["image_url"]
+                yield {"event": "image", "data": image}
+            except Exception as e:
+                errors["image_pin"] = str(e)
+
+        # Stage 3b: final manifest referencing everything that succeeded
+        manifest = {
+            **metadata,
+            "image": image["image_uri"],
+            "image_url": image["image_url"],
+            "image_variants": image["variants"],
+            "metadata": metadata_uri
+        }
+        ipfs_uri = None
+        try:
+            ipfs_uri = await self._run_stage(
+                "manifest", lambda: self.ipfs_service.upload_manifest(manifest)
+            )
+        except Exception as e:
+            errors["manifest"] = str(e)
+            ipfs_uri = metadata_uri
+
+        if ipfs_uri is None:
+            raise PipelineError("Failed to pin treasure map metadata to IPFS", errors)
+
+        yield {
+            "event": "complete",
+            "data": {
+                "puzzle": puzzle,
+                "ipfs_uri": ipfs_uri,
+                "metadata_uri": metadata_uri,
+                "image_uri": image["image_uri"],
+                "image_variants": image["variants"],
+                "answer_hash_input": puzzle["answer"],  # Frontend will hash this
+                "errors": errors
+            }
+        }
+
+    async def run(
+        self,
+        keywords: list[str],
+        difficulty: str = "medium",
+        language: str = "zh",
+        cache: str = "prefer"
+    ) -> dict:
+        """
+        Run the pipeline to completion
+
+        Returns:
+            The payload of the final "complete" event
+        """
+        result = None
+        async for event in self.stream(keywords, difficulty, language, cache):
+            if event["event"] == "complete":
+                result = event["data"]
+        return result
@@ -0,0 +1,146 @@
+"""
+Prompt Packs - Versioned per-language prompt templates for OpenAIService
+Packs are loaded and compiled once per process; each carries a version that
+is recorded on generated puzzles and folded into cache keys
+"""
+
+import hashlib
+import json
+import math
+import os
+import re
+from functools import lru_cache
+from string import Template
+from typing import Optional
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+
+DEFAULT_PACK_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "prompts")
+DEFAULT_LANGUAGE = "en"
+TEMPLATES = ("puzzle", "repair", "validate")
+# Output budgets are the pack's example output times this factor
+OUTPUT_HEADROOM = 2.0
+
+_CJK = re.compile(r"[　-ヿ㐀-䶿一-鿿가-힯＀-￯]")
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    return tiktoken.get_encoding("o200k_base") if tiktoken is not None else None
+
+
+def count_tokens(text: str) -> int:
+    """
+    Count (or, without tiktoken, estimate) the tokens in ``text``
+
+    The estimate treats each CJK character as one token and everything else
+    as four characters per token, which is close enough for sizing budgets.
+    """
+    encoding = _encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    cjk = len(_CJK.findall(text))
+    return cjk + math.ceil((len(text) - cjk) / 4)
+
+
+class PromptPack:
+    """
+    Prompts for one language
+
+    Args:
+        language: Language code the pack serves
+        spec: Parsed pack file (see app/prompts/*.json)
+    """
+
+    def __init__(self, language: str, spec: dict):
+        self.language = language
+        # The content hash changes the version even if "version" is not bumped
+        digest = hashlib.sha256(json.dumps(spec, sort_keys=True).encode()).hexdigest()[:8]
+        self.version = f"{language}-{spec['version']}+{digest}"
+        self.system = spec["system"]
+        self.difficulty = spec["difficulty"]
+        self.keyword_separator = spec.get("keyword_separator", ", ")
+        self.validate_fallback = spec["validate_fallback"]
+        self._templates = {name: Template(spec[name]) for name in TEMPLATES}
+        self.system_tokens = count_tokens(self.system)
+        self._field_tokens = {
+            name: count_tokens(json.dumps({name: value}, ensure_ascii=False))
+            for name, value in spec["example"].items()
+        }
+
+    def render(self, name: str, **values) -> str:
+        """Fill one of the pack's templates"""
+        return self._templates[name].substitute(values)
+
+    def puzzle_messages(self, keywords: list[str], difficulty: str) -> list[dict]:
+        """
+        Chat messages for a puzzle request
+
+        The system message is identical for every request in this language,
+        so providers that cache prompt prefixes can reuse it; only the short
+        user message varies.
+        """
+        description = self.difficulty.get(difficulty, self.difficulty["medium"])
+        return [
+            {"role": "system", "content": self.system},
+            {"role": "user", "content": self.render(
+                "puzzle",
+                keywords=self.keyword_separator.join(keywords),
+                difficulty=description
+            )}
+        ]
+
+    def max_tokens(self, fields: Optional[list[str]] = None) -> int:
+        """
+        Completion budget for a puzzle, or for only ``fields`` when repairing
+
+        Sized from the pack's example output so short requests do not
+        reserve (and risk paying for) a flat 1000 tokens.
+        """
+        names = fields if fields is not None else list(self._field_tokens)
+        budget = sum(self._field_tokens.get(name, 50) for name in names)
+        return math.ceil(budget * OUTPUT_HEADROOM) + 8
+
+
+class PromptLibrary:
+    """
+    All prompt packs, keyed by language
+
+    Args:
+        packs: Language -> PromptPack
+        default_language: Pack used for languages without their own
+    """
+
+    def __init__(self, packs: dict[str, PromptPack], default_language: str = DEFAULT_LANGUAGE):
+        if default_language not in packs:
+            raise ValueError(f"No prompt pack for default language: {default_language}")
+        self.packs = packs
+        self.default_language = default_language
+
+    @classmethod
+    def from_env(cls) -> "PromptLibrary":
+        """Load packs from PROMPT_PACK_DIR (default app/prompts)"""
+        return load_library(os.getenv("PROMPT_PACK_DIR", DEFAULT_PACK_DIR))
+
+    def get(self, language: str) -> PromptPack:
+        return self.packs.get(language) or self.packs[self.default_language]
+
+    def versions(self) -> dict[str, str]:
+        return {language: pack.version for language, pack in self.packs.items()}
+
+
+@lru_cache(maxsize=None)
+def load_library(directory: str) -> PromptLibrary:
+    """Load every ``<language>.json`` pack in ``directory`` (cached per process)"""
+    packs = {}
+    for filename in sorted(os.listdir(directory)):
+        language, extension = os.path.splitext(filename)
+        if extension != ".json":
+            continue
+        with open(os.path.join(directory, filename), encoding="utf-8") as f:
+            packs[language] = PromptPack(language, json.load(f))
+    return PromptLibrary(packs)
@@ -0,0 +1,253 @@
+"""
+Puzzle Cache - Exact and near-duplicate caching for generated puzzles
+Avoids repeated GPT-4 round trips for the same keyword sets
+"""
+
+import copy
+import json
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Optional
+
+
+CACHE_MODES = ("bypass", "prefer", "only")
+
+
+class PuzzleCacheMiss(LookupError):
+    """Raised when cache mode is "only" and no cached puzzle exists"""
+
+
+def normalize_keywords(keywords: list[str]) -> tuple[str, ...]:
+    """
+    Normalize keywords into an order-insensitive key
+
+    Args:
+        keywords: Raw keywords from the request
+
+    Returns:
+        Sorted tuple of unique, NFKC-normalized, case-folded keywords
+    """
+    normalized = {
+        unicodedata.normalize("NFKC", keyword).strip().casefold()
+        for keyword in keywords
+    }
+    normalized.discard("")
+    return tuple(sorted(normalized))
+
+
+class SharedPuzzleStore:
+    """
+    Exact-key puzzle entries in a SQLite file shared by worker processes
+
+    Puzzles generated by one worker become cache hits in the others; the
+    near-duplicate index stays process-local.
+    """
+
+    PURGE_EVERY = 100
+
+    def __init__(self, path: str, max_entries: int = 10_000, ttl: float = 3600):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5.0)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS puzzles ("
+            " key TEXT PRIMARY KEY,"
+            " created_at REAL NOT NULL,"
+            " data TEXT NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS puzzles_created ON puzzles (created_at)")
+        self._lock = threading.Lock()
+        self._puts = 0
+
+    @staticmethod
+    def _encode(key: tuple) -> str:
+        return json.dumps(key, ensure_ascii=False)
+
+    def get(self, key: tuple) -> Optional[tuple[dict, float]]:
+        """Entry for ``key`` as (puzzle, created_at), or None if missing or expired"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT data, created_at FROM puzzles WHERE key = ? AND created_at > ?",
+                (self._encode(key), time.time() - self.ttl)
+            ).fetchone()
+        return (json.loads(row[0]), row[1]) if row else None
+
+    def put(self, key: tuple, result: dict, created_at: float):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO puzzles (key, created_at, data) VALUES (?, ?, ?)",
+                (self._encode(key), created_at, json.dumps(result, ensure_ascii=False))
+            )
+            self._puts += 1
+            if self._puts % self.PURGE_EVERY == 0:
+                self._db.execute("DELETE FROM puzzles WHERE created_at <= ?", (time.time() - self.ttl,))
+                self._db.execute(
+                    "DELETE FROM puzzles WHERE key IN ("
+                    " SELECT key FROM puzzles ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,)
+                )
+
+
+class PuzzleCache:
+    """
+    LRU/TTL puzzle cache with an optional near-duplicate tier
+
+    The exact tier is keyed on (normalized keywords, difficulty, language,
+    prompt version). When ``similarity_threshold`` is set, a miss falls back
+    to the cached entry with the highest Jaccard similarity over keyword sets
+    within the same difficulty/language/version, found through an inverted
+    keyword index. An optional SharedPuzzleStore backs the exact tier so
+    several worker processes share generated puzzles.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 512,
+        ttl: float = 3600,
+        similarity_threshold: Optional[float] = None,
+        shared: Optional[SharedPuzzleStore] = None
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        self.shared = shared
+        self._entries: OrderedDict[tuple, tuple[dict, float]] = OrderedDict()
+        self._index: dict[tuple, set[tuple]] = {}
+        self._stats = {"hits": 0, "near_hits": 0, "shared_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+    @classmethod
+    def from_env(cls) -> "PuzzleCache":
+        """Build a cache from PUZZLE_CACHE_* environment variables"""
+        threshold = os.getenv("PUZZLE_CACHE_SIMILARITY")
+        ttl = float(os.getenv("PUZZLE_CACHE_TTL", "3600"))
+        shared_path = os.getenv("PUZZLE_CACHE_SHARED_PATH")
+        return cls(
+            max_entries=int(os.getenv("PUZZLE_CACHE_MAX_ENTRIES", "512")),
+            ttl=ttl,
+            similarity_threshold=float(threshold) if threshold else None,
+            shared=SharedPuzzleStore(shared_path, ttl=ttl) if shared_path else None
+        )
+
+    @staticmethod
+    def make_key(keywords: list[str], difficulty: str, language: str, version: str = "") -> tuple:
+        """Build the exact-match cache key; ``version`` is the prompt pack version"""
+        return (normalize_keywords(keywords), difficulty, language, version)
+
+    def _unindex(self, key: tuple):
+        keywords, *scope = key
+        for keyword in keywords:
+            bucket = self._index.get((keyword, *scope))
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._index[(keyword, *scope)]
+
+    def _drop(self, key: tuple):
+        del self._entries[key]
+        self._unindex(key)
+
+    def _lookup_exact(self, key: tuple, now: float) -> Optional[dict]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        result, created_at = entry
+        if now - created_at >= self.ttl:
+            self._drop(key)
+            return None
+        self._entries.move_to_end(key)
+        return result
+
+    def _lookup_similar(self, key: tuple, now: float) -> Optional[dict]:
+        keywords, *scope = key
+        query = set(keywords)
+        if not query:
+            return None
+
+        # Count shared keywords per candidate via the inverted index
+        overlaps: dict[tuple, int] = {}
+        for keyword in query:
+            for candidate in self._index.get((keyword, *scope), ()):
+                overlaps[candidate] = overlaps.get(candidate, 0) + 1
+
+        best_key, best_score = None, 0.0
+        for candidate, shared in overlaps.items():
+            score = shared / (len(query) + len(candidate[0]) - shared)
+            if score > best_score:
+                best_key, best_score = candidate, score
+
+        if best_key is None or best_score < self.similarity_threshold:
+            return None
+        return self._lookup_exact(best_key, now)
+
+    def get(self, key: tuple) -> Optional[dict]:
+        """
+        Look up a cached puzzle
+
+        Args:
+            key: Key from make_key()
+
+        Returns:
+            A copy of the cached puzzle, or None on miss
+        """
+        now = time.time()
+        result = self._lookup_exact(key, now)
+        if result is not None:
+            self._stats["hits"] += 1
+            return copy.deepcopy(result)
+
+        if self.shared is not None:
+            entry = self.shared.get(key)
+            if entry is not None:
+                self._store_local(key, *entry)
+                self._stats["shared_hits"] += 1
+                return copy.deepcopy(entry[0])
+
+        if self.similarity_threshold is not None:
+            result = self._lookup_similar(key, now)
+            if result is not None:
+                self._stats["near_hits"] += 1
+                return copy.deepcopy(result)
+
+        self._stats["misses"] += 1
+        return None
+
+    def put(self, key: tuple, result: dict):
+        """
+        Store a generated puzzle
+
+        Args:
+            key: Key from make_key()
+            result: Puzzle dictionary
+        """
+        created_at = time.time()
+        self._store_local(key, copy.deepcopy(result), created_at)
+        if self.shared is not None:
+            self.shared.put(key, result, created_at)
+        self._stats["stores"] += 1
+
+    def _store_local(self, key: tuple, result: dict, created_at: float):
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = (result, created_at)
+        keywords, *scope = key
+        for keyword in keywords:
+            self._index.setdefault((keyword, *scope), set()).add(key)
+
+        while len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self._stats["evictions"] += 1
+
+    def stats(self) -> dict:
+        """Hit/miss counters and current size"""
+        stats = dict(self._stats)
+        stats["entries"] = len(self._entries)
+        return stats
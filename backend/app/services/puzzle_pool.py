@@ -0,0 +1,387 @@
+"""
+Puzzle Pool - Pre-generated puzzles served without GPT-4 latency
+Background workers keep each difficulty x language bucket topped up
+"""
+
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+from app.services.puzzle_cache import normalize_keywords
+
+
+DIFFICULTIES = ("easy", "medium", "hard")
+LANGUAGES = ("zh", "en")
+
+# Curated keyword seeds used to fill the pool
+DEFAULT_SEEDS = {
+    "zh": [
+        ["古堡", "月光", "钥匙"],
+        ["沙漠", "绿洲", "商队"],
+        ["海盗", "罗盘", "孤岛"],
+        ["竹林", "古琴", "隐士"],
+        ["雪山", "寺庙", "星图"],
+        ["港口", "灯塔", "暗号"],
+    ],
+    "en": [
+        ["castle", "moonlight", "key"],
+        ["desert", "oasis", "caravan"],
+        ["pirate", "compass", "island"],
+        ["forest", "riddle", "owl"],
+        ["mountain", "temple", "star map"],
+        ["harbor", "lighthouse", "cipher"],
+    ],
+}
+
+
+def _best_match(entries: list[dict], keywords: Optional[list[str]]) -> int:
+    """Index of the entry sharing the most keywords (the oldest on ties)"""
+    if not keywords:
+        return 0
+    wanted = set(normalize_keywords(keywords))
+    return max(range(len(entries)), key=lambda i: len(wanted.intersection(entries[i]["keywords"])))
+
+
+class SharedPoolStore:
+    """
+    Pool entries in a SQLite file shared by worker processes
+
+    Any worker can pop; one worker refills. Writes can wait on other
+    processes, so async callers run them in a thread. depths() reads through
+    its own connection, which never waits on writers under WAL.
+    """
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5.0)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS pool ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " bucket TEXT NOT NULL,"
+            " version TEXT,"
+            " data TEXT NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS pool_bucket ON pool (bucket)")
+        self._lock = threading.Lock()
+        self._reader = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._reader_lock = threading.Lock()
+
+    def depths(self) -> dict[str, int]:
+        """Entries per bucket name; buckets with none are omitted"""
+        with self._reader_lock:
+            return dict(self._reader.execute("SELECT bucket, COUNT(*) FROM pool GROUP BY bucket").fetchall())
+
+    def add(self, bucket: str, entry: dict):
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO pool (bucket, version, data) VALUES (?, ?, ?)",
+                (bucket, entry["puzzle"].get("prompt_version"), json.dumps(entry, ensure_ascii=False))
+            )
+
+    def take(self, bucket: str, keywords: Optional[list[str]] = None) -> Optional[dict]:
+        """Remove and return the best entry for ``keywords``, or None if the bucket is empty"""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._db.execute(
+                    "SELECT id, data FROM pool WHERE bucket = ? ORDER BY id", (bucket,)
+                ).fetchall()
+                entry = None
+                if rows:
+                    entries = [json.loads(data) for _, data in rows]
+                    index = _best_match(entries, keywords)
+                    self._db.execute("DELETE FROM pool WHERE id = ?", (rows[index][0],))
+                    entry = entries[index]
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return entry
+
+    def prune(self, bucket: str, version: str, keep: int):
+        """Drop entries from other prompt versions, and the newest beyond ``keep``"""
+        with self._lock:
+            self._db.execute("DELETE FROM pool WHERE bucket = ? AND version IS NOT ?", (bucket, version))
+            self._db.execute(
+                "DELETE FROM pool WHERE id IN ("
+                " SELECT id FROM pool WHERE bucket = ? ORDER BY id LIMIT -1 OFFSET ?)",
+                (bucket, keep)
+            )
+
+
+class PuzzlePool:
+    """
+    Bounded pool of ready-made puzzles per (difficulty, language) bucket
+
+    A bucket is refilled up to ``high_water`` whenever it drops below
+    ``low_water``. Generation is throttled to ``refill_rate`` puzzles per
+    minute across all buckets. Pool contents are persisted to a JSON file so
+    they survive restarts; entries generated with an older prompt pack are
+    dropped on load. The file is written in a thread, off the event loop.
+
+    With a SharedPoolStore the entries live in SQLite instead, so worker
+    processes serve from one pool; start the refill worker in only one of
+    them. It polls the shared depths, since pops in other processes cannot
+    wake it.
+    """
+
+    SHARED_POLL_INTERVAL = 5.0
+
+    def __init__(
+        self,
+        openai_service,
+        persist_path: Optional[str] = None,
+        low_water: int = 2,
+        high_water: int = 5,
+        refill_rate: float = 6.0,
+        seeds: Optional[dict] = None,
+        shared: Optional[SharedPoolStore] = None
+    ):
+        self.openai_service = openai_service
+        self.shared = shared
+        self.persist_path = persist_path if shared is None else None
+        self.low_water = low_water
+        self.high_water = high_water
+        self.refill_rate = refill_rate
+        self.seeds = seeds or DEFAULT_SEEDS
+        self._buckets: dict[tuple[str, str], list[dict]] = {
+            (difficulty, language): []
+            for difficulty in DIFFICULTIES
+            for language in LANGUAGES
+        }
+        self._wakeup: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._filling: set[tuple[str, str]] = set()
+        self._refills: deque[float] = deque()
+        self._saving: Optional[asyncio.Task] = None
+        self._dirty = False
+        self._stats = {"served": 0, "empty": 0, "generated": 0, "errors": 0, "save_errors": 0}
+        self._load()
+
+    @classmethod
+    def from_env(cls, openai_service) -> "PuzzlePool":
+        """Build a pool from PUZZLE_POOL_* environment variables"""
+        seeds = None
+        seeds_path = os.getenv("PUZZLE_POOL_SEEDS")
+        if seeds_path:
+            with open(seeds_path, encoding="utf-8") as f:
+                seeds = json.load(f)
+        shared_path = os.getenv("PUZZLE_POOL_SHARED_PATH")
+        return cls(
+            openai_service,
+            persist_path=os.getenv("PUZZLE_POOL_PATH", ".cache/puzzle-pool.json") or None,
+            low_water=int(os.getenv("PUZZLE_POOL_LOW_WATER", "2")),
+            high_water=int(os.getenv("PUZZLE_POOL_HIGH_WATER", "5")),
+            refill_rate=float(os.getenv("PUZZLE_POOL_REFILL_PER_MINUTE", "6")),
+            seeds=seeds,
+            shared=SharedPoolStore(shared_path) if shared_path else None
+        )
+
+    def _load(self):
+        if not self.persist_path or not os.path.exists(self.persist_path):
+            return
+        try:
+            with open(self.persist_path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return
+        for name, entries in data.items():
+            difficulty, _, language = name.partition(":")
+            if (difficulty, language) not in self._buckets:
+                continue
+            version = self.openai_service.prompt_version(language)
+            entries = [entry for entry in entries if entry["puzzle"].get("prompt_version") == version]
+            self._buckets[(difficulty, language)] = entries[:self.high_water]
+
+    def _snapshot(self) -> dict:
+        """Copy of the buckets, taken on the loop so the writer thread never sees them change"""
+        return {
+            f"{difficulty}:{language}": list(entries)
+            for (difficulty, language), entries in self._buckets.items()
+        }
+
+    def _write(self, data: dict):
+        directory = os.path.dirname(self.persist_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.persist_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, self.persist_path)
+
+    def _save(self):
+        """Persist the pool in the background; saves requested meanwhile coalesce"""
+        if not self.persist_path:
+            return
+        self._dirty = True
+        if self._saving is None or self._saving.done():
+            self._saving = asyncio.get_running_loop().create_task(self._flush())
+
+    async def _flush(self):
+        while self._dirty:
+            self._dirty = False
+            try:
+                await asyncio.to_thread(self._write, self._snapshot())
+            except OSError:
+                self._stats["save_errors"] += 1
+
+    def _depths(self) -> dict[tuple[str, str], int]:
+        if self.shared is None:
+            return {key: len(entries) for key, entries in self._buckets.items()}
+        depths = self.shared.depths()
+        return {
+            (difficulty, language): depths.get(f"{difficulty}:{language}", 0)
+            for difficulty, language in self._buckets
+        }
+
+    async def pop(
+        self,
+        difficulty: str,
+        language: str,
+        keywords: Optional[list[str]] = None
+    ) -> Optional[dict]:
+        """
+        Take a pre-generated puzzle from the pool
+
+        Args:
+            difficulty: Puzzle difficulty bucket
+            language: Puzzle language bucket
+            keywords: Optional keywords; the entry sharing the most seeds wins
+
+        Returns:
+            Puzzle dictionary, or None if the bucket is empty
+        """
+        if (difficulty, language) not in self._buckets:
+            self._stats["empty"] += 1
+            return None
+        if self.shared is not None:
+            entry = await asyncio.to_thread(self.shared.take, f"{difficulty}:{language}", keywords)
+        else:
+            bucket = self._buckets[(difficulty, language)]
+            entry = bucket.pop(_best_match(bucket, keywords)) if bucket else None
+            if entry is not None:
+                self._save()
+        if entry is None:
+            self._stats["empty"] += 1
+            self._signal()
+            return None
+        self._stats["served"] += 1
+        self._signal()  # The worker re-checks low water
+        return entry["puzzle"]
+
+    def _signal(self):
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _next_bucket(self, depths: dict[tuple[str, str], int]) -> Optional[tuple[str, str]]:
+        """Shallowest bucket that dropped below low water and is not yet full"""
+        for key, depth in depths.items():
+            if depth < self.low_water:
+                self._filling.add(key)
+            elif depth >= self.high_water:
+                self._filling.discard(key)
+        if not self._filling:
+            return None
+        return min(self._filling, key=lambda key: depths[key])
+
+    async def _fill_one(self, difficulty: str, language: str):
+        keywords = random.choice(self.seeds.get(language) or self.seeds["en"])
+        puzzle = await self.openai_service.generate_puzzle(
+            keywords=keywords,
+            difficulty=difficulty,
+            language=language,
+            cache="bypass"
+        )
+        entry = {
+            "puzzle": puzzle,
+            "keywords": list(normalize_keywords(keywords)),
+            "created_at": time.time()
+        }
+        if self.shared is not None:
+            await asyncio.to_thread(self.shared.add, f"{difficulty}:{language}", entry)
+        else:
+            self._buckets[(difficulty, language)].append(entry)
+            self._save()
+        self._stats["generated"] += 1
+        self._refills.append(time.monotonic())
+
+    def _prune_shared(self):
+        """Shared counterpart of the version filter applied by _load"""
+        for difficulty, language in self._buckets:
+            self.shared.prune(
+                f"{difficulty}:{language}", self.openai_service.prompt_version(language), self.high_water
+            )
+
+    async def _idle(self):
+        self._wakeup.clear()
+        if self.shared is None:
+            await self._wakeup.wait()
+            return
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), self.SHARED_POLL_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _run(self):
+        interval = 60.0 / self.refill_rate if self.refill_rate > 0 else None
+        if self.shared is not None:
+            await asyncio.to_thread(self._prune_shared)
+        while True:
+            target = self._next_bucket(self._depths())
+            if target is None or interval is None:
+                await self._idle()
+                continue
+            try:
+                await self._fill_one(*target)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self._stats["errors"] += 1
+            await asyncio.sleep(interval)
+
+    def start(self):
+        """Start the background refill worker"""
+        if self._worker is None:
+            self._wakeup = asyncio.Event()
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the background refill worker"""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        if self._saving is not None:
+            await self._saving
+        if self.persist_path:
+            self._dirty = True
+            await self._flush()
+
+    def stats(self) -> dict:
+        """Pool depth per bucket and refill rate over the last minute"""
+        now = time.monotonic()
+        while self._refills and now - self._refills[0] > 60:
+            self._refills.popleft()
+        stats = dict(self._stats)
+        stats["depth"] = {
+            f"{difficulty}:{language}": depth
+            for (difficulty, language), depth in self._depths().items()
+        }
+        stats["refills_last_minute"] = len(self._refills)
+        stats["low_water"] = self.low_water
+        stats["high_water"] = self.high_water
+        stats["running"] = self._worker is not None
+        stats["shared"] = self.shared is not None
+        return stats
@@ -1,19 +1,25 @@
 """
 Utils package for CryptoHunter Backend
+Exports are resolved on first access; heavy backends (eth_hash, NumPy) load
+on first use inside the helpers themselves
 """
 
-from app.utils.helpers import (
-    generate_salt,
-    hash_answer,
-    generate_commit_hash,
-    validate_ethereum_address,
-    truncate_text
-)
+import importlib
 
-__all__ = [
-    "generate_salt",
-    "hash_answer",
-    "generate_commit_hash",
-    "validate_ethereum_address",
-    "truncate_text"
-]
+_EXPORTS = {
+    "generate_salt": "app.utils.helpers",
+    "hash_answer": "app.utils.helpers",
+    "hash_answers": "app.utils.helpers",
+    "generate_commit_hash": "app.utils.helpers",
+    "generate_commit_hashes": "app.utils.helpers",
+    "validate_ethereum_address": "app.utils.helpers",
+    "truncate_text": "app.utils.helpers",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(_EXPORTS[name]), name)
@@ -0,0 +1,210 @@
+"""
+CAR helpers - Pack many objects into one UnixFS directory as a CARv1 stream
+Objects are hashed in a first pass and re-read while the archive is written,
+so only CIDs and small interior nodes are held in memory. Layout follows
+``ipfs add --cid-version=1``: 256 KiB raw leaves, balanced 174-link file
+nodes and a flat directory with links sorted by name
+"""
+
+import hashlib
+import os
+from typing import Iterator, Optional
+
+from app.utils.cid import (
+    CID,
+    CODEC_DAG_PB,
+    CODEC_RAW,
+    HASH_SHA2_256,
+    InvalidCID,
+    cid_from_bytes,
+    encode_varint,
+    read_varint,
+)
+
+
+CHUNK_SIZE = 256 * 1024
+MAX_LINKS = 174
+
+_UNIXFS_DIRECTORY = 1
+_UNIXFS_FILE = 2
+
+
+def _field(number: int, value: bytes) -> bytes:
+    return encode_varint(number << 3 | 2) + encode_varint(len(value)) + value
+
+
+def _varint_field(number: int, value: int) -> bytes:
+    return encode_varint(number << 3) + encode_varint(value)
+
+
+def _pb_node(links: list[tuple[CID, str, int]], data: bytes) -> bytes:
+    """Encode a dag-pb node (links first, as the spec requires)"""
+    out = bytearray()
+    for cid, name, tsize in links:
+        link = _field(1, cid.encoded) + _field(2, name.encode("utf-8")) + _varint_field(3, tsize)
+        out += _field(2, link)
+    out += _field(1, data)
+    return bytes(out)
+
+
+def _block_cid(codec: int, block: bytes) -> CID:
+    return CID(1, codec, HASH_SHA2_256, hashlib.sha256(block).digest())
+
+
+class CarEntry:
+    """
+    One object in a bulk upload
+
+    Args:
+        name: File name inside the directory (no slashes)
+        data: In-memory content
+        path: File to stream instead of ``data``
+    """
+
+    def __init__(self, name: str, data: Optional[bytes] = None, path: Optional[str] = None):
+        if not name or "/" in name or name in (".", ".."):
+            raise ValueError(f"Invalid object name: {name!r}")
+        if (data is None) == (path is None):
+            raise ValueError("Exactly one of data and path is required")
+        self.name = name
+        self.data = data
+        self.path = path
+
+    @property
+    def size(self) -> int:
+        return len(self.data) if self.data is not None else os.path.getsize(self.path)
+
+    def chunks(self) -> Iterator[bytes]:
+        if self.data is not None:
+            view = memoryview(self.data)
+            for offset in range(0, len(view), CHUNK_SIZE):
+                yield bytes(view[offset:offset + CHUNK_SIZE])
+            if not self.data:
+                yield b""
+            return
+        with open(self.path, "rb") as f:
+            chunk = f.read(CHUNK_SIZE)
+            yield chunk
+            while chunk:
+                chunk = f.read(CHUNK_SIZE)
+                if chunk:
+                    yield chunk
+
+    def read(self) -> bytes:
+        if self.data is not None:
+            return self.data
+        with open(self.path, "rb") as f:
+            return f.read()
+
+
+class DirectoryPlan:
+    """
+    CIDs for a flat directory of entries, computed without buffering them
+
+    Attributes:
+        root: Directory CID
+        objects: Entry name -> file CID
+    """
+
+    def __init__(self, entries: list[CarEntry]):
+        names = [entry.name for entry in entries]
+        if len(set(names)) != len(names):
+            raise ValueError("Duplicate object names")
+        self.entries = sorted(entries, key=lambda entry: entry.name.encode("utf-8"))
+        self._leaves: dict[str, list[bytes]] = {}  # name -> leaf digests, in order
+        self._nodes: list[tuple[CID, bytes]] = []  # Interior blocks, children first
+        self.objects: dict[str, CID] = {}
+
+        links = []
+        for entry in self.entries:
+            cid, tsize = self._plan_file(entry)
+            self.objects[entry.name] = cid
+            links.append((cid, entry.name, tsize))
+        directory = _pb_node(links, _varint_field(1, _UNIXFS_DIRECTORY))
+        self.root = _block_cid(CODEC_DAG_PB, directory)
+        self._nodes.append((self.root, directory))
+
+    def _plan_file(self, entry: CarEntry) -> tuple[CID, int]:
+        """Hash ``entry`` into raw leaves and build its file nodes; returns (CID, Tsize)"""
+        digests = []
+        # (cid, cumulative block size, file bytes) per node of the current level
+        level = []
+        for chunk in entry.chunks():
+            digest = hashlib.sha256(chunk).digest()
+            digests.append(digest)
+            level.append((CID(1, CODEC_RAW, HASH_SHA2_256, digest), len(chunk), len(chunk)))
+        self._leaves[entry.name] = digests
+
+        while len(level) > 1:
+            parents = []
+            for start in range(0, len(level), MAX_LINKS):
+                children = level[start:start + MAX_LINKS]
+                filesize = sum(child[2] for child in children)
+                data = _varint_field(1, _UNIXFS_FILE) + _varint_field(3, filesize) + b"".join(
+                    _varint_field(4, child[2]) for child in children
+                )
+                node = _pb_node([(cid, "", tsize) for cid, tsize, _ in children], data)
+                cid = _block_cid(CODEC_DAG_PB, node)
+                self._nodes.append((cid, node))
+                parents.append((cid, len(node) + sum(child[1] for child in children), filesize))
+            level = parents
+        cid, tsize, _ = level[0]
+        return cid, tsize
+
+    def blocks(self) -> Iterator[tuple[CID, bytes]]:
+        """
+        Every block of the directory, re-reading entries as it goes
+
+        Raises:
+            ValueError: If an entry changed since the plan was made
+        """
+        for entry in self.entries:
+            digests = self._leaves[entry.name]
+            count = 0
+            for chunk in entry.chunks():
+                digest = hashlib.sha256(chunk).digest()
+                if count >= len(digests) or digest != digests[count]:
+                    raise ValueError(f"{entry.name} changed while it was being packed")
+                count += 1
+                yield CID(1, CODEC_RAW, HASH_SHA2_256, digest), chunk
+            if count != len(digests):
+                raise ValueError(f"{entry.name} changed while it was being packed")
+        yield from self._nodes
+
+    def car_header(self) -> bytes:
+        """CARv1 header: dag-cbor {"roots": [root], "version": 1}"""
+        cid = b"\x00" + self.root.encoded
+        header = (
+            b"\xa2\x65roots\x81\xd8\x2a\x58" + bytes([len(cid)]) + cid
+            + b"\x67version\x01"
+        )
+        return encode_varint(len(header)) + header
+
+    def iter_car(self) -> Iterator[bytes]:
+        """The CARv1 archive as a sequence of frames"""
+        yield self.car_header()
+        for cid, block in self.blocks():
+            encoded = cid.encoded
+            yield encode_varint(len(encoded) + len(block)) + encoded + block
+
+
+def car_roots(data: bytes) -> list[CID]:
+    """
+    Root CIDs from the header of a CARv1 archive written by DirectoryPlan
+
+    Raises:
+        InvalidCID: If the header is not in the expected form
+    """
+    length, offset = read_varint(data, 0)
+    header = data[offset:offset + length]
+    marker = header.find(b"\xd8\x2a\x58")
+    if not header.startswith(b"\xa2\x65roots") or marker < 0:
+        raise InvalidCID("Unsupported CAR header")
+    count = header[7] - 0x80
+    roots = []
+    offset = marker
+    for _ in range(count):
+        size = header[offset + 3]
+        roots.append(cid_from_bytes(header[offset + 5:offset + 4 + size]))
+        offset += 4 + size
+    return roots
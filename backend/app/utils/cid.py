@@ -0,0 +1,198 @@
+"""
+CID helpers - Parse and verify IPFS content identifiers
+Covers CIDv0/CIDv1 (base58btc / base32), sha2-256 and identity multihashes,
+and the dag-pb / UnixFS framing needed to reassemble verified files
+"""
+
+import base64
+import hashlib
+from typing import NamedTuple, Optional
+
+
+CODEC_RAW = 0x55
+CODEC_DAG_PB = 0x70
+HASH_IDENTITY = 0x00
+HASH_SHA2_256 = 0x12
+
+_BASE58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+_BASE58_INDEX = {char: i for i, char in enumerate(_BASE58_ALPHABET)}
+
+
+class InvalidCID(ValueError):
+    """Raised when a string or byte sequence is not a supported CID"""
+
+
+class CID(NamedTuple):
+    version: int
+    codec: int
+    hash_code: int
+    digest: bytes
+
+    @property
+    def multihash(self) -> bytes:
+        return encode_varint(self.hash_code) + encode_varint(len(self.digest)) + self.digest
+
+    @property
+    def encoded(self) -> bytes:
+        """Binary form, as used in dag-pb links and CAR files"""
+        if self.version == 0:
+            return self.multihash
+        return encode_varint(1) + encode_varint(self.codec) + self.multihash
+
+    def __str__(self) -> str:
+        if self.version == 0:
+            return b58encode(self.multihash)
+        return "b" + base64.b32encode(self.encoded).decode().lower().rstrip("=")
+
+
+def b58encode(data: bytes) -> str:
+    number = int.from_bytes(data, "big")
+    encoded = ""
+    while number:
+        number, remainder = divmod(number, 58)
+        encoded = _BASE58_ALPHABET[remainder] + encoded
+    return "1" * (len(data) - len(data.lstrip(b"\0"))) + encoded
+
+
+def b58decode(text: str) -> bytes:
+    number = 0
+    for char in text:
+        if char not in _BASE58_INDEX:
+            raise InvalidCID(f"Invalid base58 character: {char!r}")
+        number = number * 58 + _BASE58_INDEX[char]
+    body = number.to_bytes((number.bit_length() + 7) // 8, "big")
+    return b"\0" * (len(text) - len(text.lstrip("1"))) + body
+
+
+def encode_varint(value: int) -> bytes:
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def read_varint(data: bytes, offset: int) -> tuple[int, int]:
+    """Decode an unsigned LEB128 varint, returning (value, next offset)"""
+    value = shift = 0
+    while True:
+        if offset >= len(data):
+            raise InvalidCID("Truncated varint")
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, offset
+        shift += 7
+
+
+def _parse_multihash(data: bytes, offset: int = 0) -> tuple[int, bytes, int]:
+    hash_code, offset = read_varint(data, offset)
+    length, offset = read_varint(data, offset)
+    digest = data[offset:offset + length]
+    if len(digest) != length:
+        raise InvalidCID("Truncated multihash")
+    return hash_code, digest, offset + length
+
+
+def cid_from_bytes(data: bytes) -> CID:
+    """Parse a binary CID (as found in dag-pb links)"""
+    if data[:2] == b"\x12\x20":
+        hash_code, digest, _ = _parse_multihash(data)
+        return CID(0, CODEC_DAG_PB, hash_code, digest)
+    version, offset = read_varint(data, 0)
+    if version != 1:
+        raise InvalidCID(f"Unsupported CID version: {version}")
+    codec, offset = read_varint(data, offset)
+    hash_code, digest, _ = _parse_multihash(data, offset)
+    return CID(1, codec, hash_code, digest)
+
+
+def parse_cid(text: str) -> CID:
+    """
+    Parse a textual CID
+
+    Args:
+        text: CIDv0 ("Qm...") or base32 CIDv1 ("b...")
+
+    Returns:
+        Parsed CID
+
+    Raises:
+        InvalidCID: If the CID is malformed or uses an unsupported encoding
+    """
+    if len(text) == 46 and text.startswith("Qm"):
+        hash_code, digest, _ = _parse_multihash(b58decode(text))
+        return CID(0, CODEC_DAG_PB, hash_code, digest)
+    if text.startswith(("b", "B")):
+        body = text[1:].upper()
+        try:
+            raw = base64.b32decode(body + "=" * (-len(body) % 8))
+        except ValueError:
+            raise InvalidCID(f"Invalid base32 CID: {text}")
+        return cid_from_bytes(raw)
+    raise InvalidCID(f"Unsupported CID encoding: {text}")
+
+
+def verify_block(cid: CID, block: bytes) -> bool:
+    """Whether ``block`` hashes to the CID's multihash"""
+    if cid.hash_code == HASH_SHA2_256:
+        return hashlib.sha256(block).digest() == cid.digest
+    if cid.hash_code == HASH_IDENTITY:
+        return block == cid.digest
+    return False
+
+
+def _fields(data: bytes):
+    """Iterate (field number, wire type, value) over a protobuf message"""
+    offset = 0
+    while offset < len(data):
+        key, offset = read_varint(data, offset)
+        field, wire_type = key >> 3, key & 0x7
+        if wire_type == 0:
+            value, offset = read_varint(data, offset)
+        elif wire_type == 2:
+            length, offset = read_varint(data, offset)
+            value = data[offset:offset + length]
+            offset += length
+        else:
+            raise InvalidCID(f"Unsupported protobuf wire type: {wire_type}")
+        yield field, wire_type, value
+
+
+def decode_file_node(block: bytes) -> tuple[bytes, list[CID]]:
+    """
+    Decode a dag-pb UnixFS file node
+
+    Returns:
+        Tuple of (inline file bytes, child CIDs in order)
+
+    Raises:
+        InvalidCID: If the node is not a UnixFS file
+    """
+    links: list[CID] = []
+    unixfs: Optional[bytes] = None
+    for field, _, value in _fields(block):
+        if field == 2:
+            for link_field, _, link_value in _fields(value):
+                if link_field == 1:
+                    links.append(cid_from_bytes(link_value))
+        elif field == 1:
+            unixfs = value
+    if unixfs is None:
+        raise InvalidCID("dag-pb node has no UnixFS data")
+
+    node_type, inline = None, b""
+    for field, _, value in _fields(unixfs):
+        if field == 1:
+            node_type = value
+        elif field == 2:
+            inline = value
+    # 0 = Raw, 2 = File; directories and symlinks are not files
+    if node_type not in (0, 2):
+        raise InvalidCID(f"UnixFS node type {node_type} is not a file")
+    return inline, links
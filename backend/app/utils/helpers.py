@@ -4,7 +4,40 @@ Utility functions for CryptoHunter Backend
 
 import hashlib
 import secrets
-from typing import Optional
+from functools import lru_cache
+from typing import Optional, Sequence, Union
+
+
+# abi.encodePacked(bytes32 answerHash, bytes32 salt, address sender)
+COMMIT_PACKED_SIZE = 32 + 32 + 20
+
+# Batches at least this large are split across processes when workers > 1
+PROCESS_POOL_THRESHOLD = 50_000
+
+
+@lru_cache(maxsize=None)
+def _keccak():
+    """Resolve the keccak backend once instead of on every call"""
+    from eth_hash.auto import keccak
+    return keccak
+
+
+@lru_cache(maxsize=None)
+def _numpy():
+    """NumPy, imported on the first batch call, or None if not installed"""
+    try:
+        import numpy
+    except ImportError:  # NumPy is optional; batch APIs also accept lists
+        return None
+    return numpy
+
+
+def _hex_to_bytes(value: Union[str, bytes], size: int, name: str) -> bytes:
+    """Decode a 0x-prefixed hex string (or raw bytes) of an exact byte size"""
+    raw = bytes.fromhex(value.removeprefix("0x")) if isinstance(value, str) else bytes(value)
+    if len(raw) != size:
+        raise ValueError(f"{name} must be {size} bytes, got {len(raw)}")
+    return raw
 
 
 def generate_salt() -> str:
@@ -22,33 +55,155 @@ def hash_answer(answer: str) -> str:
     Returns:
         Hex string of the hash
     """
-    from eth_hash.auto import keccak
-    return "0x" + keccak(answer.encode()).hex()
+    return "0x" + _keccak()(answer.encode()).hex()
 
 
 def generate_commit_hash(answer: str, salt: str, address: str) -> str:
     """
     Generate a commit hash compatible with the smart contract
     
+    Mirrors keccak256(abi.encodePacked(answerHash, salt, msg.sender)) in
+    TreasureMap.commitAnswer_and_CheckAnswer, where answerHash is
+    keccak256(answer).
+    
     Args:
         answer: The answer
-        salt: Random salt (hex string)
+        salt: Random salt (32-byte hex string)
         address: User's Ethereum address
     
     Returns:
         Hex string of the commit hash
     """
-    from eth_abi import encode
-    from eth_hash.auto import keccak
+    keccak = _keccak()
+    packed = (
+        keccak(answer.encode())
+        + _hex_to_bytes(salt, 32, "salt")
+        + _hex_to_bytes(address, 20, "address")
+    )
+    return "0x" + keccak(packed).hex()
+
+
+def hash_answers(answers: Sequence[str]) -> list[str]:
+    """
+    Hash many answers with keccak256
     
-    # Remove 0x prefix if present
-    salt_bytes = bytes.fromhex(salt.replace("0x", ""))
-    address_bytes = bytes.fromhex(address.replace("0x", ""))
+    Args:
+        answers: Answers to hash
     
-    # Encode like Solidity's abi.encodePacked
-    packed = answer.encode() + salt_bytes + address_bytes
+    Returns:
+        Hex strings, in input order
+    """
+    keccak = _keccak()
+    return ["0x" + keccak(answer.encode()).hex() for answer in answers]
+
+
+def _pack_column(values, size: int, name: str, count: int) -> bytes:
+    """
+    Flatten a column of fixed-size values into one contiguous buffer
     
-    return "0x" + keccak(packed).hex()
+    Accepts a NumPy uint8 array of shape (count, size) or dtype S<size>,
+    or a sequence of hex strings / bytes.
+    """
+    np = _numpy()
+    if np is not None and isinstance(values, np.ndarray):
+        array = np.ascontiguousarray(values)
+        if array.nbytes != count * size:
+            raise ValueError(f"{name} array must hold {count} x {size} bytes")
+        return array.tobytes()
+    if len(values) != count:
+        raise ValueError(f"{name} has {len(values)} entries, expected {count}")
+    return b"".join(_hex_to_bytes(value, size, name) for value in values)
+
+
+def _commit_chunk(answer_hashes: bytes, salts: bytes, addresses: bytes) -> list[str]:
+    """Hash one chunk of pre-packed columns (runs in worker processes too)"""
+    keccak = _keccak()
+    np = _numpy()
+    count = len(answer_hashes) // 32
+    
+    # Interleave the columns into rows of abi.encodePacked(answerHash, salt, sender)
+    if np is not None:
+        buffer = np.hstack((
+            np.frombuffer(answer_hashes, dtype=np.uint8).reshape(count, 32),
+            np.frombuffer(salts, dtype=np.uint8).reshape(count, 32),
+            np.frombuffer(addresses, dtype=np.uint8).reshape(count, 20)
+        )).tobytes()
+    else:
+        rows = bytearray(COMMIT_PACKED_SIZE * count)
+        hash_view, salt_view, address_view = (
+            memoryview(answer_hashes), memoryview(salts), memoryview(addresses)
+        )
+        for i in range(count):
+            offset = i * COMMIT_PACKED_SIZE
+            rows[offset:offset + 32] = hash_view[i * 32:(i + 1) * 32]
+            rows[offset + 32:offset + 64] = salt_view[i * 32:(i + 1) * 32]
+            rows[offset + 64:offset + COMMIT_PACKED_SIZE] = address_view[i * 20:(i + 1) * 20]
+        buffer = bytes(rows)
+    
+    return [
+        "0x" + keccak(buffer[offset:offset + COMMIT_PACKED_SIZE]).hex()
+        for offset in range(0, len(buffer), COMMIT_PACKED_SIZE)
+    ]
+
+
+def generate_commit_hashes(
+    salts,
+    addresses,
+    answers: Optional[Sequence[str]] = None,
+    answer_hashes=None,
+    workers: int = 1
+) -> list[str]:
+    """
+    Generate many commit hashes compatible with the smart contract
+    
+    Inputs are columnar: the i-th salt, address and answer form one commit.
+    Fixed-size columns may be NumPy arrays (uint8 of shape (n, 32)/(n, 20) or
+    dtype S32/S20) or sequences of hex strings / bytes. All rows are packed
+    into one preallocated buffer laid out as abi.encodePacked(answerHash,
+    salt, sender).
+    
+    Args:
+        salts: 32-byte salts
+        addresses: 20-byte player addresses
+        answers: Plaintext answers (hashed with keccak256 first)
+        answer_hashes: Precomputed 32-byte answer hashes, instead of answers
+        workers: Processes to use for batches of PROCESS_POOL_THRESHOLD or more
+    
+    Returns:
+        Hex strings, in input order
+    """
+    if (answers is None) == (answer_hashes is None):
+        raise ValueError("Provide exactly one of answers or answer_hashes")
+    count = len(answers) if answers is not None else len(answer_hashes)
+    
+    if answers is not None:
+        keccak = _keccak()
+        hash_column = b"".join(keccak(answer.encode()) for answer in answers)
+    else:
+        hash_column = _pack_column(answer_hashes, 32, "answer_hashes", count)
+    salt_column = _pack_column(salts, 32, "salts", count)
+    address_column = _pack_column(addresses, 20, "addresses", count)
+    
+    if workers <= 1 or count < PROCESS_POOL_THRESHOLD:
+        return _commit_chunk(hash_column, salt_column, address_column)
+    
+    from concurrent.futures import ProcessPoolExecutor
+    
+    chunk = -(-count // workers)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(
+                _commit_chunk,
+                hash_column[start * 32:(start + chunk) * 32],
+                salt_column[start * 32:(start + chunk) * 32],
+                address_column[start * 20:(start + chunk) * 20]
+            )
+            for start in range(0, count, chunk)
+        ]
+        results = []
+        for future in futures:
+            results.extend(future.result())
+    return results
 
 
 def validate_ethereum_address(address: str) -> bool:
@@ -0,0 +1,52 @@
+"""
+Image helpers - optional compressed variants of generated images
+Requires Pillow; without it no variants are produced
+"""
+
+import io
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional
+    Image = None
+
+
+# name -> (max edge in pixels or None for full size, WebP quality)
+DEFAULT_VARIANTS = {
+    "webp": (None, 80),
+    "thumbnail": (256, 70),
+}
+
+
+def variants_supported() -> bool:
+    """Whether Pillow is installed"""
+    return Image is not None
+
+
+def make_variants(image_bytes: bytes, variants: dict = None) -> dict[str, bytes]:
+    """
+    Produce WebP variants of an image
+
+    CPU-bound; call through ``asyncio.to_thread`` from async code.
+
+    Args:
+        image_bytes: Source image (e.g. PNG from DALL-E)
+        variants: Mapping of name -> (max edge or None, quality)
+
+    Returns:
+        Mapping of variant name -> WebP bytes (empty without Pillow)
+    """
+    if Image is None:
+        return {}
+
+    results = {}
+    with Image.open(io.BytesIO(image_bytes)) as source:
+        source.load()
+        for name, (max_edge, quality) in (variants or DEFAULT_VARIANTS).items():
+            image = source.copy()
+            if max_edge:
+                image.thumbnail((max_edge, max_edge))
+            buffer = io.BytesIO()
+            image.save(buffer, format="WEBP", quality=quality, method=4)
+            results[name] = buffer.getvalue()
+    return results
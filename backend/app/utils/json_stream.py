@@ -0,0 +1,193 @@
+"""
+Incremental JSON parsing - Top-level fields of a streamed JSON object
+Emits each field as soon as its value is complete (plus partial text for
+string values) and rejects malformed output at the first bad token
+"""
+
+import json
+import re
+from typing import Any, Optional
+
+
+# Models sometimes wrap JSON in a Markdown fence; tolerate a short preamble
+MAX_PREFIX = 32
+_VALUE_START = set('"{[-0123456789tfn')
+_WHITESPACE = set(" \t\r\n")
+_INCOMPLETE_ESCAPE = re.compile(r"(?:\\u[0-9a-fA-F]{0,3}|\\)$")
+_decoder = json.JSONDecoder(strict=False)
+
+
+class MalformedJSON(ValueError):
+    """Raised as soon as streamed output cannot be a JSON object"""
+
+
+def _loads(text: str) -> Any:
+    try:
+        value, end = _decoder.raw_decode(text)
+    except json.JSONDecodeError as e:
+        raise MalformedJSON(str(e)) from None
+    if text[end:].strip():
+        raise MalformedJSON(f"Unexpected data after value: {text[end:end + 20]!r}")
+    return value
+
+
+class IncrementalJSONParser:
+    """
+    Streaming parser for one top-level JSON object
+
+    ``feed`` returns a list of events:
+
+    - ``("field", name, value)`` when a top-level value is complete
+    - ``("partial", name, text)`` with text appended to a top-level string
+      value since the previous feed
+
+    Structural errors at the top level (missing colon, bad value start,
+    stray characters) raise MalformedJSON immediately; nested values are
+    validated when they close.
+    """
+
+    def __init__(self, max_prefix: int = MAX_PREFIX):
+        self.max_prefix = max_prefix
+        self.result: dict = {}
+        self._buffer = ""
+        self._state = "start"
+        self._key: Optional[str] = None
+        self._start = 0          # Start of the current key/value in the buffer
+        self._escaped = False
+        self._in_string = False  # Inside a string within a nested value
+        self._depth = 0          # Bracket depth within a nested value
+        self._partial_sent = 0   # Characters of the current string already emitted
+
+    @property
+    def done(self) -> bool:
+        return self._state == "done"
+
+    def _fail(self, position: int, expected: str):
+        char = self._buffer[position]
+        raise MalformedJSON(f"Expected {expected} at offset {position}, got {char!r}")
+
+    def _complete(self, events: list, raw: str):
+        value = _loads(raw)
+        self.result[self._key] = value
+        events.append(("field", self._key, value))
+        self._state = "after_value"
+
+    def feed(self, chunk: str) -> list[tuple]:
+        """Consume the next piece of text and return completed events"""
+        events: list[tuple] = []
+        offset = len(self._buffer)
+        self._buffer += chunk
+        buffer = self._buffer
+
+        position = offset
+        while position < len(buffer):
+            char = buffer[position]
+            state = self._state
+
+            if state == "start":
+                if char == "{":
+                    self._state = "key_or_end"
+                elif position >= self.max_prefix:
+                    self._fail(position, "'{'")
+            elif state == "done":
+                pass  # Trailing fence or whitespace
+            elif state in ("key", "value_string"):
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    raw = buffer[self._start:position + 1]
+                    if state == "key":
+                        self._key = _loads(raw)
+                        self._state = "colon"
+                    else:
+                        self._flush_partial(events, position)
+                        self._complete(events, raw)
+            elif state == "value_nested":
+                if self._in_string:
+                    if self._escaped:
+                        self._escaped = False
+                    elif char == "\\":
+                        self._escaped = True
+                    elif char == '"':
+                        self._in_string = False
+                elif char == '"':
+                    self._in_string = True
+                elif char in "{[":
+                    self._depth += 1
+                elif char in "}]":
+                    self._depth -= 1
+                    if self._depth == 0:
+                        self._complete(events, buffer[self._start:position + 1])
+            elif state == "value_scalar":
+                if char in ",}" or char in _WHITESPACE:
+                    self._complete(events, buffer[self._start:position])
+                    continue  # Re-read the delimiter as "after_value"
+            elif char in _WHITESPACE:
+                pass
+            elif state == "key_or_end":
+                if char == '"':
+                    self._state, self._start = "key", position
+                elif char == "}" and not self.result:
+                    self._state = "done"
+                else:
+                    self._fail(position, "a key")
+            elif state == "key_expected":
+                if char != '"':
+                    self._fail(position, "a key")
+                self._state, self._start = "key", position
+            elif state == "colon":
+                if char != ":":
+                    self._fail(position, "':'")
+                self._state = "value_start"
+            elif state == "value_start":
+                if char not in _VALUE_START:
+                    self._fail(position, "a value")
+                self._start = position
+                if char == '"':
+                    self._state, self._partial_sent = "value_string", 0
+                elif char in "{[":
+                    self._state, self._depth, self._in_string = "value_nested", 1, False
+                else:
+                    self._state = "value_scalar"
+            elif state == "after_value":
+                if char == ",":
+                    self._state = "key_expected"
+                elif char == "}":
+                    self._state = "done"
+                else:
+                    self._fail(position, "',' or '}'")
+            position += 1
+
+        if self._state == "value_string":
+            self._flush_partial(events, len(buffer))
+        return events
+
+    def _flush_partial(self, events: list, end: int):
+        """Emit text added to the open top-level string value"""
+        raw = _INCOMPLETE_ESCAPE.sub("", self._buffer[self._start + 1:end])
+        # An odd run of trailing backslashes would escape our closing quote
+        if (len(raw) - len(raw.rstrip("\\"))) % 2:
+            raw = raw[:-1]
+        try:
+            text = _decoder.decode(f'"{raw}"')
+        except json.JSONDecodeError:
+            return  # Wait for more input
+        if len(text) > self._partial_sent:
+            events.append(("partial", self._key, text[self._partial_sent:]))
+            self._partial_sent = len(text)
+
+    def close(self) -> dict:
+        """
+        Finish parsing
+
+        Returns:
+            The parsed object
+
+        Raises:
+            MalformedJSON: If the object was never closed
+        """
+        if self._state != "done":
+            raise MalformedJSON("Output ended before the JSON object was complete")
+        return self.result
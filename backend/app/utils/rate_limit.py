@@ -0,0 +1,203 @@
+"""
+Rate limiting primitives
+"""
+
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Optional
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at ``rate`` tokens per second
+
+    Args:
+        rate: Tokens added per second
+        capacity: Maximum burst size
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    @classmethod
+    def per_minute(cls, count: float, burst: float = None) -> "TokenBucket":
+        """Build a bucket allowing ``count`` operations per minute"""
+        return cls(rate=count / 60.0, capacity=burst if burst is not None else max(1.0, count / 60.0))
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens: float = 1.0) -> float:
+        """
+        Take tokens without waiting
+
+        Returns:
+            0 if the tokens were taken, otherwise seconds until they would be
+        """
+        self._refill()
+        if self._tokens >= tokens:
+            self._tokens -= tokens
+            return 0.0
+        if self.rate <= 0:
+            return float("inf")
+        return (tokens - self._tokens) / self.rate
+
+    async def acquire(self, tokens: float = 1.0):
+        """Wait until tokens are available, then take them (FIFO across waiters)"""
+        async with self._lock:
+            while True:
+                wait = self.try_acquire(tokens)
+                if wait == 0:
+                    return
+                await asyncio.sleep(wait)
+
+    @property
+    def available(self) -> float:
+        """Tokens currently available"""
+        self._refill()
+        return self._tokens
+
+
+class BucketStore(ABC):
+    """
+    Keyed token buckets for per-client limits
+
+    Stores whose takes block (``blocking = True``) are called from a thread
+    by async callers.
+    """
+
+    blocking = False
+
+    def take(self, key: str, rate: float, capacity: float, tokens: float = 1.0) -> float:
+        """
+        Take tokens from the bucket for ``key`` without waiting
+
+        Returns:
+            0 if the tokens were taken, otherwise seconds until they would be
+        """
+        return self.take_all([key], rate, capacity, tokens)
+
+    @abstractmethod
+    def take_all(self, keys: list[str], rate: float, capacity: float, tokens: float = 1.0) -> float:
+        """
+        Take tokens from every bucket in ``keys``, or from none of them
+
+        Returns:
+            0 if the tokens were taken, otherwise seconds until every bucket
+            would have them
+        """
+
+
+class MemoryBucketStore(BucketStore):
+    """
+    Process-local buckets; the least recently used are dropped past ``max_keys``
+
+    A dropped bucket starts full again, which only ever errs on the side of
+    letting a long-idle client through.
+    """
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+
+    def _bucket(self, key: str, rate: float, capacity: float) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(rate, capacity)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket
+
+    def take_all(self, keys: list[str], rate: float, capacity: float, tokens: float = 1.0) -> float:
+        buckets = [self._bucket(key, rate, capacity) for key in keys]
+        short = [tokens - bucket.available for bucket in buckets if bucket.available < tokens]
+        if short:
+            return float("inf") if rate <= 0 else max(short) / rate
+        for bucket in buckets:
+            bucket.try_acquire(tokens)
+        return 0.0
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class SQLiteBucketStore(BucketStore):
+    """
+    Buckets in a SQLite file shared by every worker process on the host
+
+    Each take is one short write transaction; wall-clock time is used so
+    processes agree on refill. Buckets idle for ``idle_ttl`` are purged. The
+    connection is opened lazily per process, so a store created before the
+    server forks its workers is safe to use in each of them.
+    """
+
+    PURGE_EVERY = 1000
+    blocking = True  # Waits up to the 5 s busy timeout under write contention
+
+    def __init__(self, path: str, idle_ttl: float = 3600.0):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.idle_ttl = idle_ttl
+        self._db: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+        self._takes = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._pid != os.getpid():
+            self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=5.0)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS buckets ("
+                " key TEXT PRIMARY KEY,"
+                " tokens REAL NOT NULL,"
+                " updated_at REAL NOT NULL)"
+            )
+            self._pid = os.getpid()
+        return self._db
+
+    def take_all(self, keys: list[str], rate: float, capacity: float, tokens: float = 1.0) -> float:
+        now = time.time()
+        with self._lock:
+            db = self._connection()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                levels = {}
+                for key in keys:
+                    row = db.execute(
+                        "SELECT tokens, updated_at FROM buckets WHERE key = ?", (key,)
+                    ).fetchone()
+                    levels[key] = capacity if row is None else min(capacity, row[0] + max(0.0, now - row[1]) * rate)
+                short = [tokens - level for level in levels.values() if level < tokens]
+                if short:
+                    wait = float("inf") if rate <= 0 else max(short) / rate
+                else:
+                    levels = {key: level - tokens for key, level in levels.items()}
+                    wait = 0.0
+                db.executemany(
+                    "INSERT OR REPLACE INTO buckets (key, tokens, updated_at) VALUES (?, ?, ?)",
+                    [(key, level, now) for key, level in levels.items()]
+                )
+                self._takes += 1
+                if self._takes % self.PURGE_EVERY == 0:
+                    db.execute("DELETE FROM buckets WHERE updated_at < ?", (now - self.idle_ttl,))
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        return wait
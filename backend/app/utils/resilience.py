@@ -0,0 +1,326 @@
+"""
+Resilience helpers for upstream calls
+Timeouts, jittered retries, circuit breakers, latency tracking and hedging
+"""
+
+import asyncio
+import random
+import time
+from collections import deque
+from typing import Awaitable, Callable, Optional, Sequence
+
+
+class UpstreamError(Exception):
+    """
+    Error returned by an upstream provider
+
+    Args:
+        message: Error description
+        status: HTTP status code, if any
+        retry_after: Seconds the provider asked us to wait, if any
+    """
+
+    def __init__(self, message: str, status: Optional[int] = None, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+    @property
+    def retryable(self) -> bool:
+        return self.status is None or self.status == 429 or self.status >= 500
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected because the provider's breaker is open"""
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given in seconds"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
+
+
+def default_retryable(error: BaseException) -> bool:
+    """Retry timeouts, connection errors and retryable upstream statuses"""
+    if isinstance(error, UpstreamError):
+        return error.retryable
+    return isinstance(error, (asyncio.TimeoutError, ConnectionError, OSError))
+
+
+class LatencyHistogram:
+    """
+    Latency recorder with cumulative buckets and recent-sample percentiles
+
+    Args:
+        buckets: Upper bounds in seconds
+        window: Number of recent samples kept for percentile estimates
+    """
+
+    DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS, window: int = 512):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+        self._recent: deque[float] = deque(maxlen=window)
+
+    def observe(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self._recent.append(seconds)
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                self.counts[i] += 1
+                return
+        self.counts[-1] += 1
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Estimate the q-th percentile (0-100) over recent samples"""
+        if not self._recent:
+            return None
+        ordered = sorted(self._recent)
+        index = min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else None,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "buckets": {
+                **{str(bound): count for bound, count in zip(self.buckets, self.counts)},
+                "+Inf": self.counts[-1]
+            }
+        }
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker
+
+    Opens after ``failure_threshold`` consecutive failures, rejects calls
+    for ``reset_timeout`` seconds, then lets one trial call through
+    (half-open). A trial success closes it; a failure reopens it.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        """Whether a call may proceed now"""
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    def release(self):
+        """Finish a call that says nothing about provider health"""
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter
+
+    Args:
+        attempts: Total attempts including the first
+        base_delay: Delay before the first retry in seconds
+        max_delay: Upper bound on any single delay
+    """
+
+    def __init__(self, attempts: int = 3, base_delay: float = 0.5, max_delay: float = 10.0):
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt: int, error: BaseException) -> float:
+        """Seconds to wait before retry number ``attempt`` (0-based)"""
+        retry_after = getattr(error, "retry_after", None)
+        if retry_after is None:
+            # HTTP client errors (e.g. openai.APIStatusError) carry the response
+            response = getattr(error, "response", None)
+            headers = getattr(response, "headers", None)
+            if headers is not None:
+                retry_after = parse_retry_after(headers.get("retry-after"))
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+class Upstream:
+    """
+    One upstream endpoint with its own timeout, retry policy and breaker
+
+    Args:
+        name: Identifier used in stats
+        timeout: Per-attempt timeout in seconds
+        retry: Retry policy (defaults to 3 attempts)
+        breaker: Circuit breaker (defaults to 5 failures / 30s)
+        retryable: Predicate deciding whether an error is worth retrying
+    """
+
+    def __init__(
+        self,
+        name: str,
+        timeout: float = 30.0,
+        retry: Optional[RetryPolicy] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        retryable: Callable[[BaseException], bool] = default_retryable
+    ):
+        self.name = name
+        self.timeout = timeout
+        self.retry = retry or RetryPolicy()
+        self.breaker = breaker or CircuitBreaker()
+        self.retryable = retryable
+        self.latency = LatencyHistogram()
+        self._stats = {"calls": 0, "successes": 0, "failures": 0, "retries": 0, "rejected": 0}
+
+    async def _attempt(self, fn: Callable[[], Awaitable]):
+        if not self.breaker.allow():
+            self._stats["rejected"] += 1
+            raise CircuitOpenError(f"Circuit open for {self.name}")
+        started = time.monotonic()
+        try:
+            result = await asyncio.wait_for(fn(), timeout=self.timeout)
+        except asyncio.CancelledError:
+            # Losing a hedge race is not a provider failure
+            self.breaker.release()
+            raise
+        except Exception as e:
+            self.latency.observe(time.monotonic() - started)
+            self._stats["failures"] += 1
+            # Client errors (bad request, auth) don't indicate an unhealthy provider
+            if self.retryable(e):
+                self.breaker.record_failure()
+            else:
+                self.breaker.release()
+            raise
+        self.latency.observe(time.monotonic() - started)
+        self.breaker.record_success()
+        self._stats["successes"] += 1
+        return result
+
+    async def call(self, fn: Callable[[], Awaitable]):
+        """
+        Call ``fn`` with timeout, retries and circuit breaking
+
+        Args:
+            fn: Zero-argument coroutine function performing one attempt
+
+        Returns:
+            Result of the first successful attempt
+        """
+        self._stats["calls"] += 1
+        for attempt in range(self.retry.attempts):
+            try:
+                return await self._attempt(fn)
+            except CircuitOpenError:
+                raise
+            except Exception as e:
+                if attempt == self.retry.attempts - 1 or not self.retryable(e):
+                    raise
+                self._stats["retries"] += 1
+                await asyncio.sleep(self.retry.delay(attempt, e))
+
+    def stats(self) -> dict:
+        stats = dict(self._stats)
+        stats["breaker"] = self.breaker.state
+        stats["consecutive_failures"] = self.breaker.failures
+        stats["latency"] = self.latency.snapshot()
+        return stats
+
+
+async def hedged_call(
+    primary: tuple[Upstream, Callable[[], Awaitable]],
+    secondary: tuple[Upstream, Callable[[], Awaitable]],
+    hedge_after: Optional[float] = None,
+    default_hedge_after: float = 2.0
+):
+    """
+    Call ``primary``; fire ``secondary`` if it is slow or fails
+
+    The secondary starts once the primary has been running longer than
+    ``hedge_after`` (by default the primary's observed p95 latency), or
+    immediately if the primary fails. The first success wins and the other
+    call is cancelled.
+
+    Returns:
+        Tuple of (winning upstream name, result)
+    """
+    primary_upstream, primary_fn = primary
+    secondary_upstream, secondary_fn = secondary
+    if hedge_after is None:
+        hedge_after = primary_upstream.latency.percentile(95) or default_hedge_after
+
+    tasks = {asyncio.ensure_future(primary_upstream.call(primary_fn)): primary_upstream.name}
+    errors = []
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+        if done:
+            task = done.pop()
+            if task.exception() is None:
+                return tasks[task], task.result()
+            errors.append(task.exception())
+            del tasks[task]
+        tasks[asyncio.ensure_future(secondary_upstream.call(secondary_fn))] = secondary_upstream.name
+
+        while tasks:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                name = tasks.pop(task)
+                if task.exception() is None:
+                    return name, task.result()
+                errors.append(task.exception())
+        raise errors[-1]
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def failover_call(candidates: Sequence[tuple[Upstream, Callable[[], Awaitable]]]):
+    """
+    Try upstreams in order, moving on when one fails or its breaker is open
+
+    Returns:
+        Tuple of (winning upstream name, result)
+    """
+    last_error: Optional[BaseException] = None
+    for upstream, fn in candidates:
+        try:
+            return upstream.name, await upstream.call(fn)
+        except Exception as e:
+            last_error = e
+    raise last_error or RuntimeError("No upstream configured")
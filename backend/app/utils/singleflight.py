@@ -0,0 +1,57 @@
+"""
+Single-flight helper - collapse concurrent identical calls into one
+"""
+
+import asyncio
+from typing import Awaitable, Callable, Hashable
+
+
+class SingleFlight:
+    """
+    Deduplicate concurrent async calls sharing the same key
+
+    The first caller for a key starts the work in its own task; callers that
+    arrive while it is running await the same task. Each waiter is shielded,
+    so a cancelled waiter does not cancel the shared call for the others.
+    """
+
+    def __init__(self):
+        self._inflight: dict[Hashable, asyncio.Task] = {}
+        self.calls = 0
+        self.shared = 0
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception as retrieved when every waiter has gone away
+        if not task.cancelled():
+            task.exception()
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable]):
+        """
+        Run ``fn`` once for all concurrent callers of ``key``
+
+        Args:
+            key: Deduplication key
+            fn: Zero-argument coroutine function performing the work
+
+        Returns:
+            The result of the shared call
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            self.calls += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+        else:
+            self.shared += 1
+        return await asyncio.shield(task)
+
+    def running(self, key: Hashable) -> bool:
+        """Whether a call for ``key`` is executing, i.e. ``do`` would join it"""
+        return key in self._inflight
+
+    def in_flight(self) -> int:
+        """Number of distinct keys currently executing"""
+        return len(self._inflight)
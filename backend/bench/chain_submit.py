@@ -0,0 +1,172 @@
+"""
+Relayer bench: pipelined createMap submissions through ChainSubmitter
+
+Queues --count createMap submissions, runs the submitter's sender loop until
+every one is confirmed or failed, then reads each map back with
+maps(uint256) to check the stored metadata URI and answer hash. With
+--block-time the node mines on an interval, so many transactions are in
+flight at once, and --drop removes that fraction of first broadcasts from
+the mempool (hardhat_dropTransaction) so they only land through fee-bumped
+re-sends. Reports throughput, submit-to-confirm latency and RPC round trips.
+
+Against a local Hardhat node (from contracts/):
+    npx hardhat node
+    npx hardhat ignition deploy ignition/modules/TreasureMap.js --network localhost
+    python -m bench.chain_submit --address 0x5FbDB2315678afecB367f032d93F642f64180aa3 \\
+        --count 100 --block-time 1 --drop 0.1
+
+Offline, against the FakeChain model in bench.fakes:
+    python -m bench.chain_submit --fake --count 500 --block-time 0.5 --drop 0.1
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+
+from eth_abi import decode
+from eth_hash.auto import keccak
+
+from app.services.chain_submitter import (
+    ChainRPC,
+    ChainRPCError,
+    ChainSubmitter,
+    LocalSigner,
+    NodeSigner,
+    SubmissionStore,
+)
+from bench.fakes import FakeChain
+from bench.load import percentile
+
+
+MAPS_SELECTOR = keccak(b"maps(uint256)")[:4].hex()
+MAPS_TYPES = ("string", "address", "string", "bytes32", "uint256", "uint256", "bool", "address")
+
+
+async def verify_maps(rpc: ChainRPC, contract: str, submissions: list[dict]) -> list[str]:
+    """Read confirmed maps back from the contract; returns mismatches"""
+    calls = [
+        ("eth_call", [{"to": contract, "data": f"0x{MAPS_SELECTOR}{submission['map_id']:064x}"}, "latest"])
+        for submission in submissions
+    ]
+    problems = []
+    for start in range(0, len(calls), 100):
+        results = await rpc.batch(calls[start:start + 100])
+        for submission, result in zip(submissions[start:start + 100], results):
+            if isinstance(result, ChainRPCError):
+                problems.append(f"map {submission['map_id']}: {result}")
+                continue
+            _, _, uri, answer_hash, *_ = decode(MAPS_TYPES, bytes.fromhex(result.removeprefix("0x")))
+            params = submission["params"]
+            if uri != params["metadata_uri"] or "0x" + answer_hash.hex() != params["answer_hash"]:
+                problems.append(f"map {submission['map_id']}: stored fields differ from the submission")
+    return problems
+
+
+async def run(args) -> int:
+    fake = None
+    rpc_url, contract = args.rpc_url, args.address
+    if args.fake:
+        fake = FakeChain(latency=args.fake_latency, seed=args.seed)
+        await fake.start()
+        rpc_url, contract = fake.rpc_url, FakeChain.CONTRACT
+    rpc = ChainRPC(rpc_url)
+    rng = random.Random(args.seed)
+    workdir = tempfile.mkdtemp(prefix="chain-submit-")
+    try:
+        signer = LocalSigner(args.relayer_key) if args.relayer_key else NodeSigner((await rpc.call("eth_accounts", []))[0])
+        if args.block_time:
+            await rpc.call("evm_setAutomine", [False])
+            await rpc.call("evm_setIntervalMining", [int(args.block_time * 1000)])
+        submitter = ChainSubmitter(
+            rpc,
+            signer,
+            contract,
+            SubmissionStore(os.path.join(workdir, "submissions.sqlite3")),
+            max_in_flight=args.in_flight,
+            resubmit_after=args.resubmit_after,
+            poll_interval=args.poll_interval
+        )
+
+        run_id = uuid.uuid4().hex[:8]
+        started = time.time()
+        ids = [
+            submitter.create_map(
+                f"ipfs://bench-{run_id}-{i}", f"answer-{run_id}-{i}", prize_pool=1 + i, entry_fee=i % 3, name=f"bench-{i}"
+            )["id"]
+            for i in range(args.count)
+        ]
+        seen = set()
+        deadline = time.monotonic() + args.timeout
+        while await submitter.process_once() and time.monotonic() < deadline:
+            for submission in submitter.store.with_status("sent"):
+                if submission["id"] in seen or len(submission["tx_hashes"]) != 1:
+                    continue
+                seen.add(submission["id"])
+                if rng.random() < args.drop:
+                    await rpc.call("hardhat_dropTransaction", [submission["tx_hash"]])
+            await asyncio.sleep(args.poll_interval)
+        elapsed = time.time() - started
+
+        submissions = [submitter.get(submission_id) for submission_id in ids]
+        confirmed = [s for s in submissions if s["status"] == "confirmed"]
+        failed = [s for s in submissions if s["status"] == "failed"]
+        problems = await verify_maps(rpc, contract, confirmed)
+        latencies = sorted(s["updated_at"] - s["created_at"] for s in confirmed)
+        stats = submitter.stats()
+
+        print(f"submissions       {len(submissions)}")
+        print(f"confirmed         {len(confirmed)}")
+        print(f"failed            {len(failed)}")
+        print(f"unfinished        {len(submissions) - len(confirmed) - len(failed)}")
+        print(f"elapsed           {elapsed:.2f} s ({len(confirmed) / elapsed:.1f} maps/s)")
+        if latencies:
+            print(f"confirm latency   p50 {percentile(latencies, 50):.2f} s, p95 {percentile(latencies, 95):.2f} s")
+        for key in ("sends", "replacements", "receipt_batches", "nonce_resyncs", "rpc_requests"):
+            print(f"{key:<17} {stats[key]}")
+        if fake is not None:
+            print(f"node              {fake.stats()}")
+        for submission in failed[:10]:
+            print(f"FAILED {submission['id']}: {submission['error']}")
+        for line in problems[:10]:
+            print(f"MISMATCH {line}")
+        return 1 if failed or problems or len(confirmed) != len(submissions) else 0
+    finally:
+        if args.block_time:
+            await rpc.call("evm_setIntervalMining", [0])
+            await rpc.call("evm_setAutomine", [True])
+        await rpc.close()
+        if fake is not None:
+            await fake.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rpc-url", default=os.getenv("CHAIN_RPC_URL", "http://127.0.0.1:8545"))
+    parser.add_argument("--address", default=os.getenv("TREASURE_MAP_ADDRESS"), help="TreasureMap contract")
+    parser.add_argument("--relayer-key", default=os.getenv("CHAIN_RELAYER_KEY"),
+                        help="Sign locally with this key instead of the node's first account")
+    parser.add_argument("--fake", action="store_true", help="Run against an in-process FakeChain")
+    parser.add_argument("--fake-latency", default="0", help="FakeChain latency spec (see bench.fakes)")
+    parser.add_argument("--count", type=int, default=100)
+    parser.add_argument("--in-flight", type=int, default=32, help="Unconfirmed transactions allowed at once")
+    parser.add_argument("--block-time", type=float, default=0, help="Seconds between blocks (0 keeps automine)")
+    parser.add_argument("--drop", type=float, default=0, help="Fraction of first broadcasts to drop")
+    parser.add_argument("--resubmit-after", type=float, default=2)
+    parser.add_argument("--poll-interval", type=float, default=0.2)
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    if not args.fake and not args.address:
+        parser.error("--address (or TREASURE_MAP_ADDRESS) is required without --fake")
+    if args.drop and not args.block_time:
+        parser.error("--drop needs --block-time; with automine nothing stays in the mempool")
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,702 @@
+"""
+Local stand-ins for OpenAI, Web3.Storage and Pinata
+
+One aiohttp server exposes all three under path prefixes so the backend can
+be pointed at it with base-URL variables (see ``backend_env``). Each
+provider has its own latency distribution and error rate.
+
+Usage (from backend/):
+    python -m bench.fakes --port 8900 --openai-latency lognormal:0.8,0.4 --error-rate 0.02
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import math
+import random
+import struct
+import time
+import uuid
+import zlib
+from typing import Callable, Optional
+
+from aiohttp import web
+
+from app.utils.car import car_roots
+from app.utils.cid import CID, CODEC_DAG_PB, CODEC_RAW, HASH_SHA2_256
+
+
+def parse_latency(spec: str, rng: random.Random) -> Callable[[], float]:
+    """
+    Parse a latency distribution
+
+    Args:
+        spec: ``fixed:S``, ``uniform:LOW,HIGH``, ``lognormal:MEDIAN,SIGMA``
+            (seconds), or ``0`` for none
+        rng: Random source, so runs can be seeded
+
+    Returns:
+        Function returning one sampled delay in seconds
+    """
+    kind, _, args = spec.partition(":")
+    values = [float(value) for value in args.split(",") if value]
+    if kind in ("0", "none"):
+        return lambda: 0.0
+    if kind == "fixed" and len(values) == 1:
+        return lambda: values[0]
+    if kind == "uniform" and len(values) == 2:
+        return lambda: rng.uniform(values[0], values[1])
+    if kind == "lognormal" and len(values) == 2:
+        mu = math.log(values[0])
+        return lambda: rng.lognormvariate(mu, values[1])
+    raise ValueError(f"Invalid latency spec: {spec}")
+
+
+class FakeProvider:
+    """
+    Latency and failure injection for one fake upstream
+
+    Args:
+        name: Provider name used in stats
+        latency: Latency spec (see parse_latency)
+        error_rate: Fraction of requests answered with ``error_status``
+        error_status: HTTP status for injected failures
+        seed: Random seed
+    """
+
+    def __init__(
+        self,
+        name: str,
+        latency: str = "0",
+        error_rate: float = 0.0,
+        error_status: int = 500,
+        seed: Optional[int] = None
+    ):
+        self.name = name
+        self.rng = random.Random(seed)
+        self.sample = parse_latency(latency, self.rng)
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.requests = 0
+        self.errors = 0
+
+    def fail(self) -> bool:
+        """Count a request and decide whether to inject a failure"""
+        self.requests += 1
+        if self.rng.random() < self.error_rate:
+            self.errors += 1
+            return True
+        return False
+
+    def error_response(self) -> web.Response:
+        headers = {"Retry-After": "1"} if self.error_status == 429 else None
+        return web.json_response(
+            {"error": {"message": f"injected {self.name} failure", "type": "server_error"}},
+            status=self.error_status,
+            headers=headers
+        )
+
+    def stats(self) -> dict:
+        return {"requests": self.requests, "errors": self.errors}
+
+
+def _png(width: int = 64, height: int = 64) -> bytes:
+    """A small solid-colour PNG, so image handling has real bytes to work on"""
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+    raw = b"".join(b"\0" + b"\xc8\xa2\x5a" * width for _ in range(height))
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(raw))
+        + chunk(b"IEND", b"")
+    )
+
+
+PNG_B64 = base64.b64encode(_png()).decode()
+
+
+def _puzzle(rng: random.Random) -> dict:
+    answer = rng.choice(["compass", "lighthouse", "anchor", "parrot", "lantern"])
+    return {
+        "story": " ".join(rng.choice(["sea", "map", "storm", "gold", "cave", "ship"]) for _ in range(120)),
+        "question": "What guides the captain home?",
+        "answer": answer,
+        "hints": ["It shines", "It stands on the coast", "Ships look for it at night"],
+        "aliases": [answer.upper()]
+    }
+
+
+def _completion_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def openai_app(provider: FakeProvider, image_provider: FakeProvider) -> web.Application:
+    """Chat completions (plain and streamed) and image generation"""
+
+    async def chat(request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        if provider.fail():
+            await asyncio.sleep(provider.sample() * 0.1)
+            return provider.error_response()
+        prompt = body["messages"][-1]["content"]
+        if "is_correct" in prompt:
+            content = json.dumps({"is_correct": True, "explanation": "bench"})
+        else:
+            content = json.dumps(_puzzle(provider.rng), ensure_ascii=False)
+        usage = {
+            "prompt_tokens": sum(len(m["content"]) for m in body["messages"]) // 4,
+            "completion_tokens": _completion_tokens(content),
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        created = int(time.time())
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        delay = provider.sample()
+
+        if not body.get("stream"):
+            await asyncio.sleep(delay)
+            return web.json_response({
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": body["model"],
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop"
+                }],
+                "usage": usage
+            })
+
+        # First token after ~20% of the latency, the rest spread evenly
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        pieces = [content[i:i + 16] for i in range(0, len(content), 16)]
+        await asyncio.sleep(delay * 0.2)
+        step = delay * 0.8 / len(pieces)
+
+        def frame(choices: list, usage: Optional[dict] = None) -> bytes:
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": body["model"],
+                "choices": choices,
+            }
+            if usage is not None:
+                chunk["usage"] = usage
+            return f"data: {json.dumps(chunk)}\n\n".encode()
+
+        for i, piece in enumerate(pieces):
+            delta = {"content": piece} if i else {"role": "assistant", "content": piece}
+            await response.write(frame([{"index": 0, "delta": delta, "finish_reason": None}]))
+            await asyncio.sleep(step)
+        await response.write(frame([{"index": 0, "delta": {}, "finish_reason": "stop"}]))
+        if (body.get("stream_options") or {}).get("include_usage"):
+            await response.write(frame([], usage))
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    async def images(request: web.Request) -> web.Response:
+        body = await request.json()
+        await asyncio.sleep(image_provider.sample())
+        if image_provider.fail():
+            return image_provider.error_response()
+        if body.get("response_format") == "b64_json":
+            item = {"b64_json": PNG_B64}
+        else:
+            item = {"url": f"http://{request.host}/files/{uuid.uuid4().hex}.png"}
+        return web.json_response({"created": int(time.time()), "data": [item]})
+
+    async def files(request: web.Request) -> web.Response:
+        return web.Response(body=base64.b64decode(PNG_B64), content_type="image/png")
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", chat)
+    app.router.add_post("/v1/images/generations", images)
+    app.router.add_get("/files/{name}", files)
+    return app
+
+
+def web3_storage_app(provider: FakeProvider) -> web.Application:
+    """POST /upload returning a raw-codec CIDv1 of the body, POST /car its root"""
+
+    async def upload(request: web.Request) -> web.Response:
+        data = await request.read()
+        await asyncio.sleep(provider.sample())
+        if provider.fail():
+            return provider.error_response()
+        cid = CID(1, CODEC_RAW, HASH_SHA2_256, hashlib.sha256(data).digest())
+        return web.json_response({"cid": str(cid)})
+
+    async def car(request: web.Request) -> web.Response:
+        data = await request.read()
+        await asyncio.sleep(provider.sample())
+        if provider.fail():
+            return provider.error_response()
+        return web.json_response({"cid": str(car_roots(data)[0])})
+
+    app = web.Application(client_max_size=100 * 1024 * 1024)
+    app.router.add_post("/upload", upload)
+    app.router.add_post("/car", car)
+    return app
+
+
+def pinata_app(provider: FakeProvider) -> web.Application:
+    """pinJSONToIPFS and pinFileToIPFS returning a CIDv0 of the content"""
+
+    async def pin(request: web.Request) -> web.Response:
+        data = await request.read()
+        await asyncio.sleep(provider.sample())
+        if provider.fail():
+            return provider.error_response()
+        cid = CID(0, CODEC_DAG_PB, HASH_SHA2_256, hashlib.sha256(data).digest())
+        return web.json_response({"IpfsHash": str(cid), "PinSize": len(data), "Timestamp": time.time()})
+
+    app = web.Application(client_max_size=100 * 1024 * 1024)
+    app.router.add_post("/pinning/pinJSONToIPFS", pin)
+    app.router.add_post("/pinning/pinFileToIPFS", pin)
+    return app
+
+
+def _word(value: int) -> str:
+    return format(value, "064x")
+
+
+class _RPCError(Exception):
+    def __init__(self, message: str, code: int = -32000):
+        super().__init__(message)
+        self.code = code
+
+
+class FakeChain:
+    """
+    Hardhat-like JSON-RPC node holding a model of the TreasureMap contract
+
+    Covers what the relayer uses: an unlocked dev account
+    (eth_sendTransaction), signed EIP-1559 transactions
+    (eth_sendRawTransaction, needs eth-account), batch requests, a fixed base
+    fee, replacement at +10% fees, automine or interval mining and
+    hardhat_dropTransaction. createMap / unlockMap / maps() are modelled in
+    Python rather than executed.
+
+    Args:
+        port: Port to listen on (0 picks a free one)
+        base_fee: Base fee per gas in wei
+        latency: Per-request latency spec (see parse_latency)
+        seed: Random seed
+    """
+
+    CHAIN_ID = 31337
+    # Hardhat's first dev account and the address of its first deployment
+    ACCOUNT = "0xf39fd6e51aad88f6f4ce6ab8827279cfffb92266"
+    CONTRACT = "0x5fbdb2315678afecb367f032d93f642f64180aa3"
+    REPLACEMENT_BUMP = 1.1
+
+    def __init__(self, port: int = 0, base_fee: int = 10 ** 9, latency: str = "0", seed: Optional[int] = None):
+        from eth_abi import decode, encode
+        from eth_hash.auto import keccak
+
+        self._decode, self._encode, self._keccak = decode, encode, keccak
+        self.port = port
+        self.base_fee = base_fee
+        self.sample = parse_latency(latency, random.Random(seed))
+        self.selectors = {
+            keccak(signature.encode())[:4]: name
+            for name, signature in (
+                ("createMap", "createMap(string,bytes32,uint256,string)"),
+                ("unlockMap", "unlockMap(uint256)"),
+                ("maps", "maps(uint256)"),
+            )
+        }
+        self.topics = {
+            name: "0x" + keccak(signature.encode()).hex()
+            for name, signature in (
+                ("MapCreated", "MapCreated(uint256,address,uint256,uint256)"),
+                ("MapUnlocked", "MapUnlocked(uint256,address)"),
+            )
+        }
+        self.blocks = ["0x" + keccak(b"genesis").hex()]
+        self.nonces: dict[str, int] = {}
+        self.mempool: dict[tuple[str, int], dict] = {}
+        self.transactions: dict[str, dict] = {}
+        self.receipts: dict[str, dict] = {}
+        self.maps: list[dict] = []
+        self.unlocked: set[tuple[int, str]] = set()
+        self.automine = True
+        self._miner: Optional[asyncio.Task] = None
+        self._runner: Optional[web.AppRunner] = None
+        self._stats = {"requests": 0, "batches": 0, "transactions": 0, "replacements": 0, "dropped": 0}
+
+    # ---- contract model ----
+
+    def _execute(self, tx: dict, apply: bool) -> list[dict]:
+        """Run a call against the model; returns its logs, raises _RPCError on revert"""
+        data = bytes.fromhex(tx["data"].removeprefix("0x"))
+        name = self.selectors.get(data[:4])
+        if tx["to"] != self.CONTRACT or name not in ("createMap", "unlockMap"):
+            raise _RPCError("execution reverted")
+        if name == "createMap":
+            uri, answer_hash, entry_fee, map_name = self._decode(("string", "bytes32", "uint256", "string"), data[4:])
+            if tx["value"] <= 0:
+                raise _RPCError("execution reverted: TreasureMap: prize pool required")
+            if answer_hash == bytes(32):
+                raise _RPCError("execution reverted: TreasureMap: invalid answer hash")
+            map_id = len(self.maps)
+            if apply:
+                self.maps.append({
+                    "name": map_name, "creator": tx["from"], "metadata_uri": uri, "answer_hash": answer_hash,
+                    "prize_pool": tx["value"], "entry_fee": entry_fee
+                })
+            return [{
+                "topics": [self.topics["MapCreated"], "0x" + _word(map_id), "0x" + _word(int(tx["from"], 16))],
+                "data": "0x" + self._encode(("uint256", "uint256"), (tx["value"], entry_fee)).hex()
+            }]
+        (map_id,) = self._decode(("uint256",), data[4:])
+        if map_id >= len(self.maps):
+            raise _RPCError("execution reverted: TreasureMap: map does not exist")
+        if tx["value"] < self.maps[map_id]["entry_fee"]:
+            raise _RPCError("execution reverted: TreasureMap: insufficient entry fee")
+        if (map_id, tx["from"]) in self.unlocked:
+            raise _RPCError("execution reverted: TreasureMap: already unlocked")
+        if apply:
+            self.unlocked.add((map_id, tx["from"]))
+        return [{
+            "topics": [self.topics["MapUnlocked"], "0x" + _word(map_id), "0x" + _word(int(tx["from"], 16))],
+            "data": "0x"
+        }]
+
+    def _call_maps(self, data: bytes) -> str:
+        (map_id,) = self._decode(("uint256",), data[4:])
+        entry = self.maps[map_id] if map_id < len(self.maps) else {
+            "name": "", "creator": "0x" + "00" * 20, "metadata_uri": "", "answer_hash": bytes(32),
+            "prize_pool": 0, "entry_fee": 0
+        }
+        return "0x" + self._encode(
+            ("string", "address", "string", "bytes32", "uint256", "uint256", "bool", "address"),
+            (entry["name"], entry["creator"], entry["metadata_uri"], entry["answer_hash"],
+             entry["prize_pool"], entry["entry_fee"], False, "0x" + "00" * 20)
+        ).hex()
+
+    # ---- transactions and blocks ----
+
+    def _pending_nonce(self, account: str) -> int:
+        nonce = self.nonces.get(account, 0)
+        while (account, nonce) in self.mempool:
+            nonce += 1
+        return nonce
+
+    def _accept(self, tx: dict) -> str:
+        if tx["nonce"] < self.nonces.get(tx["from"], 0):
+            raise _RPCError(f"nonce too low: next nonce {self.nonces.get(tx['from'], 0)}")
+        current = self.mempool.get((tx["from"], tx["nonce"]))
+        if current is not None and current["hash"] == tx["hash"]:
+            raise _RPCError("already known")
+        if current is not None:
+            if (tx["max_fee"] < current["max_fee"] * self.REPLACEMENT_BUMP
+                    or tx["priority_fee"] < current["priority_fee"] * self.REPLACEMENT_BUMP):
+                raise _RPCError("replacement transaction underpriced")
+            self._stats["replacements"] += 1
+        self.mempool[(tx["from"], tx["nonce"])] = tx
+        self.transactions[tx["hash"]] = tx
+        self._stats["transactions"] += 1
+        if self.automine:
+            self.mine()
+        return tx["hash"]
+
+    def mine(self) -> int:
+        """Mine one block with every includable pending transaction"""
+        number = len(self.blocks)
+        block_hash = "0x" + self._keccak(f"{number}:{self.blocks[-1]}".encode()).hex()
+        included = []
+        for account in sorted({account for account, _ in self.mempool}):
+            nonce = self.nonces.get(account, 0)
+            while (account, nonce) in self.mempool and self.mempool[(account, nonce)]["max_fee"] >= self.base_fee:
+                included.append(self.mempool.pop((account, nonce)))
+                nonce += 1
+            self.nonces[account] = nonce
+        log_index = 0
+        for tx in included:
+            try:
+                logs, status = self._execute(tx, apply=True), 1
+            except _RPCError:
+                logs, status = [], 0
+            for log in logs:
+                log.update(
+                    address=self.CONTRACT, blockNumber=hex(number), blockHash=block_hash,
+                    logIndex=hex(log_index), transactionHash=tx["hash"]
+                )
+                log_index += 1
+            self.receipts[tx["hash"]] = {
+                "transactionHash": tx["hash"], "blockNumber": hex(number), "blockHash": block_hash,
+                "from": tx["from"], "to": tx["to"], "status": hex(status), "gasUsed": hex(tx["gas"]), "logs": logs
+            }
+        self.blocks.append(block_hash)
+        return number
+
+    def _raw_transaction(self, raw_hex: str) -> dict:
+        import rlp
+        from eth_account import Account
+
+        raw = bytes.fromhex(raw_hex.removeprefix("0x"))
+        if raw[:1] != b"\x02":
+            raise _RPCError("only EIP-1559 transactions are supported")
+        chain_id, nonce, priority_fee, max_fee, gas, to, value, data, *_ = rlp.decode(raw[1:])
+        if int.from_bytes(chain_id, "big") != self.CHAIN_ID:
+            raise _RPCError("invalid chain id")
+        return {
+            "hash": "0x" + self._keccak(raw).hex(),
+            "from": Account.recover_transaction(raw).lower(),
+            "to": "0x" + bytes(to).hex(),
+            "nonce": int.from_bytes(nonce, "big"),
+            "priority_fee": int.from_bytes(priority_fee, "big"),
+            "max_fee": int.from_bytes(max_fee, "big"),
+            "gas": int.from_bytes(gas, "big"),
+            "value": int.from_bytes(value, "big"),
+            "data": "0x" + bytes(data).hex(),
+        }
+
+    def _node_transaction(self, params: dict) -> dict:
+        sender = params["from"].lower()
+        if sender != self.ACCOUNT:
+            raise _RPCError(f"unknown account {sender}")
+        tx = {
+            "from": sender,
+            "to": params["to"].lower(),
+            "nonce": int(params["nonce"], 16) if "nonce" in params else self._pending_nonce(sender),
+            "priority_fee": int(params.get("maxPriorityFeePerGas", hex(10 ** 9)), 16),
+            "max_fee": int(params.get("maxFeePerGas", hex(2 * self.base_fee + 10 ** 9)), 16),
+            "gas": int(params.get("gas", "0x30000"), 16),
+            "value": int(params.get("value", "0x0"), 16),
+            "data": params.get("data", "0x"),
+        }
+        tx["hash"] = "0x" + self._keccak(json.dumps(tx, sort_keys=True).encode()).hex()
+        return tx
+
+    async def _interval_mining(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            self.mine()
+
+    def _set_interval(self, milliseconds: int) -> bool:
+        if self._miner is not None:
+            self._miner.cancel()
+            self._miner = None
+        if milliseconds:
+            self._miner = asyncio.ensure_future(self._interval_mining(milliseconds / 1000))
+        return True
+
+    def _drop(self, tx_hash: str) -> bool:
+        for key, tx in list(self.mempool.items()):
+            if tx["hash"] == tx_hash:
+                del self.mempool[key]
+                self._stats["dropped"] += 1
+                return True
+        return False
+
+    # ---- JSON-RPC ----
+
+    def _block(self, tag: str) -> Optional[dict]:
+        number = len(self.blocks) - 1 if tag in ("latest", "pending") else int(tag, 16)
+        if number >= len(self.blocks):
+            return None
+        return {"number": hex(number), "hash": self.blocks[number], "baseFeePerGas": hex(self.base_fee)}
+
+    def _call(self, params: dict) -> str:
+        data = bytes.fromhex(params.get("data", "0x").removeprefix("0x"))
+        if params.get("to", "").lower() == self.CONTRACT and self.selectors.get(data[:4]) == "maps":
+            return self._call_maps(data)
+        raise _RPCError("execution reverted")
+
+    def _estimate(self, params: dict) -> str:
+        tx = {
+            "from": params.get("from", self.ACCOUNT).lower(),
+            "to": params.get("to", "").lower(),
+            "value": int(params.get("value", "0x0"), 16),
+            "data": params.get("data", "0x"),
+        }
+        self._execute(tx, apply=False)
+        return hex(150_000 if self.selectors.get(bytes.fromhex(tx["data"][2:10])) == "createMap" else 60_000)
+
+    def _dispatch(self, method: str, params: list):
+        handlers = {
+            "eth_chainId": lambda: hex(self.CHAIN_ID),
+            "eth_accounts": lambda: [self.ACCOUNT],
+            "eth_blockNumber": lambda: hex(len(self.blocks) - 1),
+            "eth_getBlockByNumber": lambda: self._block(params[0]),
+            "eth_maxPriorityFeePerGas": lambda: hex(10 ** 9),
+            "eth_getTransactionCount": lambda: hex(
+                self._pending_nonce(params[0].lower()) if params[1:] == ["pending"]
+                else self.nonces.get(params[0].lower(), 0)
+            ),
+            "eth_estimateGas": lambda: self._estimate(params[0]),
+            "eth_call": lambda: self._call(params[0]),
+            "eth_sendRawTransaction": lambda: self._accept(self._raw_transaction(params[0])),
+            "eth_sendTransaction": lambda: self._accept(self._node_transaction(params[0])),
+            "eth_getTransactionReceipt": lambda: self.receipts.get(params[0]),
+            "eth_getTransactionByHash": lambda: self.transactions.get(params[0]),
+            "evm_mine": lambda: hex(self.mine()),
+            "evm_setAutomine": lambda: setattr(self, "automine", bool(params[0])) or True,
+            "evm_setIntervalMining": lambda: self._set_interval(int(params[0])),
+            "hardhat_dropTransaction": lambda: self._drop(params[0]),
+        }
+        if method not in handlers:
+            raise _RPCError(f"method {method} not supported", code=-32601)
+        return handlers[method]()
+
+    def _respond(self, request: dict) -> dict:
+        self._stats["requests"] += 1
+        try:
+            result = self._dispatch(request["method"], request.get("params") or [])
+        except _RPCError as e:
+            return {"jsonrpc": "2.0", "id": request.get("id"), "error": {"code": e.code, "message": str(e)}}
+        return {"jsonrpc": "2.0", "id": request.get("id"), "result": result}
+
+    def app(self) -> web.Application:
+        async def rpc(request: web.Request) -> web.Response:
+            body = await request.json()
+            await asyncio.sleep(self.sample())
+            if isinstance(body, list):
+                self._stats["batches"] += 1
+                return web.json_response([self._respond(item) for item in body])
+            return web.json_response(self._respond(body))
+
+        app = web.Application()
+        app.router.add_post("/", rpc)
+        return app
+
+    async def start(self):
+        self._runner = web.AppRunner(self.app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", self.port)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+
+    async def stop(self):
+        self._set_interval(0)
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    @property
+    def rpc_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def stats(self) -> dict:
+        return {**self._stats, "blocks": len(self.blocks) - 1, "pending": len(self.mempool), "maps": len(self.maps)}
+
+
+class FakeUpstreams:
+    """
+    All fake providers behind one local HTTP server
+
+    Args:
+        port: Port to listen on (0 picks a free one)
+        openai_latency: Chat completion latency spec
+        image_latency: Image generation latency spec
+        ipfs_latency: Latency spec for both pinning providers
+        error_rate: Injected failure rate for every provider
+        error_status: HTTP status for injected failures
+        seed: Random seed
+    """
+
+    def __init__(
+        self,
+        port: int = 0,
+        openai_latency: str = "lognormal:0.8,0.4",
+        image_latency: str = "lognormal:3.0,0.3",
+        ipfs_latency: str = "lognormal:0.3,0.5",
+        error_rate: float = 0.0,
+        error_status: int = 500,
+        seed: Optional[int] = None
+    ):
+        self.port = port
+        rng = random.Random(seed)
+        self.providers = {
+            name: FakeProvider(name, latency, error_rate, error_status, seed=rng.randrange(2 ** 32))
+            for name, latency in (
+                ("openai-chat", openai_latency),
+                ("openai-image", image_latency),
+                ("web3.storage", ipfs_latency),
+                ("pinata", ipfs_latency),
+            )
+        }
+        self._runner: Optional[web.AppRunner] = None
+
+    def app(self) -> web.Application:
+        root = web.Application()
+        root.add_subapp("/openai/", openai_app(self.providers["openai-chat"], self.providers["openai-image"]))
+        root.add_subapp("/web3/", web3_storage_app(self.providers["web3.storage"]))
+        root.add_subapp("/pinata/", pinata_app(self.providers["pinata"]))
+        return root
+
+    async def start(self):
+        self._runner = web.AppRunner(self.app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", self.port)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def backend_env(self) -> dict[str, str]:
+        """Environment pointing the backend's clients at these fakes"""
+        return {
+            "OPENAI_API_KEY": "bench",
+            "OPENAI_BASE_URL": f"{self.base_url}/openai/v1",
+            "WEB3_STORAGE_TOKEN": "bench",
+            "WEB3_STORAGE_API_URL": f"{self.base_url}/web3",
+            "PINATA_API_KEY": "bench",
+            "PINATA_SECRET": "bench",
+            "PINATA_API_URL": f"{self.base_url}/pinata",
+        }
+
+    def stats(self) -> dict:
+        return {name: provider.stats() for name, provider in self.providers.items()}
+
+
+async def _serve(args):
+    fakes = FakeUpstreams(
+        port=args.port,
+        openai_latency=args.openai_latency,
+        image_latency=args.image_latency,
+        ipfs_latency=args.ipfs_latency,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        seed=args.seed
+    )
+    await fakes.start()
+    print(f"Fake upstreams listening on {fakes.base_url}")
+    for key, value in fakes.backend_env().items():
+        print(f"{key}={value}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await fakes.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--openai-latency", default="lognormal:0.8,0.4")
+    parser.add_argument("--image-latency", default="lognormal:3.0,0.3")
+    parser.add_argument("--ipfs-latency", default="lognormal:0.3,0.5")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=None)
+    try:
+        asyncio.run(_serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
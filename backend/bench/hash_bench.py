@@ -0,0 +1,86 @@
+"""
+Micro-benchmark: scalar vs. batch commit/answer hashing
+
+Usage (from backend/):
+    python -m bench.hash_bench --count 100000 --workers 4
+"""
+
+import argparse
+import secrets
+import time
+
+from app.utils.helpers import (
+    generate_commit_hash,
+    generate_commit_hashes,
+    hash_answer,
+    hash_answers,
+)
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def _timed(label: str, count: int, fn):
+    started = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<32} {elapsed * 1000:10.1f} ms  {count / elapsed:12,.0f} /s")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    count = args.count
+    answers = [f"answer-{i}" for i in range(count)]
+    salts = ["0x" + secrets.token_hex(32) for _ in range(count)]
+    addresses = ["0x" + secrets.token_hex(20) for _ in range(count)]
+
+    print(f"{count:,} commits")
+    _timed("hash_answer (scalar)", count, lambda: [hash_answer(a) for a in answers])
+    answer_hashes = _timed("hash_answers (batch)", count, lambda: hash_answers(answers))
+
+    scalar = _timed(
+        "generate_commit_hash (scalar)",
+        count,
+        lambda: [generate_commit_hash(a, s, d) for a, s, d in zip(answers, salts, addresses)]
+    )
+    batch = _timed(
+        "generate_commit_hashes (batch)",
+        count,
+        lambda: generate_commit_hashes(salts, addresses, answer_hashes=answer_hashes)
+    )
+    assert batch == scalar, "batch results differ from scalar results"
+
+    if np is not None:
+        salt_array = np.frombuffer(
+            b"".join(bytes.fromhex(s[2:]) for s in salts), dtype=np.uint8
+        ).reshape(count, 32)
+        address_array = np.frombuffer(
+            b"".join(bytes.fromhex(a[2:]) for a in addresses), dtype=np.uint8
+        ).reshape(count, 20)
+        numpy_batch = _timed(
+            "generate_commit_hashes (numpy)",
+            count,
+            lambda: generate_commit_hashes(salt_array, address_array, answer_hashes=answer_hashes)
+        )
+        assert numpy_batch == scalar, "numpy batch results differ from scalar results"
+
+    if args.workers > 1:
+        pooled = _timed(
+            f"generate_commit_hashes (x{args.workers})",
+            count,
+            lambda: generate_commit_hashes(
+                salts, addresses, answer_hashes=answer_hashes, workers=args.workers
+            )
+        )
+        assert pooled == scalar, "process pool results differ from scalar results"
+
+
+if __name__ == "__main__":
+    main()
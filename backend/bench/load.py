@@ -0,0 +1,377 @@
+"""
+Load test: drive the API against local fake upstreams
+
+Starts the fake OpenAI / Web3.Storage / Pinata server (bench.fakes) in this
+process and, for each scenario, a fresh uvicorn server pointed at it. Requests
+arrive at a fixed rate (open loop); throughput, p50/p95/p99 latency and the
+server's resident memory are reported and compared with bench/baseline.json.
+Runs fully offline.
+
+Usage (from backend/):
+    python -m bench.load --rps 4 --duration 20
+    python -m bench.load --scenario puzzle --env OPENAI_PUZZLE_REPAIRS=0
+    python -m bench.load --save-baseline
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from collections import Counter
+from typing import Callable, Optional
+
+import aiohttp
+
+from bench.fakes import FakeUpstreams
+
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# Variables stripped from the inherited environment so runs are reproducible
+CONFIG_PREFIXES = (
+    "OPENAI_", "WEB3_STORAGE_", "PINATA_", "IPFS_", "CHAIN_", "ADMISSION_",
+    "PUZZLE_", "JOB_", "BATCH_", "IMAGE_", "TREASURE_MAP_", "TRACE_",
+)
+KEYWORDS = ("ocean", "forest", "castle", "desert", "moon", "river", "volcano", "library")
+
+
+def _puzzle_body(i: int, rng: random.Random) -> dict:
+    # Unique keywords and cache=bypass so every request reaches the model
+    return {
+        "keywords": [rng.choice(KEYWORDS), f"bench-{i}"],
+        "difficulty": rng.choice(("easy", "medium", "hard")),
+        "language": "en",
+        "cache": "bypass"
+    }
+
+
+def _upload_body(i: int, rng: random.Random) -> dict:
+    return {
+        "content": {"name": f"bench-{i}", "nonce": uuid.uuid4().hex, "attributes": list(range(rng.randint(1, 50)))},
+        "filename": "metadata.json"
+    }
+
+
+# Scenario name -> (path, request body factory)
+SCENARIOS: dict[str, tuple[str, Callable[[int, random.Random], dict]]] = {
+    "puzzle": ("/api/generate-puzzle", _puzzle_body),
+    "treasure-map": ("/api/create-treasure-map", _puzzle_body),
+    "upload": ("/api/upload-ipfs", _upload_body),
+}
+
+# Metric, and whether a higher value is better
+COMPARED = (("throughput", True), ("p50", False), ("p95", False), ("p99", False), ("peak_rss_mb", False))
+
+
+def percentile(ordered: list[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile of an already sorted list"""
+    if not ordered:
+        return None
+    index = max(0, min(len(ordered) - 1, int(round(q / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def _rss_mb(pid: int) -> Optional[float]:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+    return None
+
+
+class MemorySampler:
+    """Samples a process's resident set size in the background"""
+
+    def __init__(self, pid: int, interval: float = 0.25):
+        self.pid = pid
+        self.interval = interval
+        self.samples: list[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        while True:
+            rss = _rss_mb(self.pid)
+            if rss is not None:
+                self.samples.append(rss)
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        rss = _rss_mb(self.pid)
+        if rss is not None:
+            self.samples.append(rss)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def server_env(fakes: FakeUpstreams, workdir: str, overrides: dict[str, str]) -> dict[str, str]:
+    env = {key: value for key, value in os.environ.items() if not key.startswith(CONFIG_PREFIXES)}
+    env.update(fakes.backend_env())
+    env.update({
+        "PYTHONPATH": BACKEND_DIR,
+        "ADMISSION_ENABLED": "false",
+        "OPENAI_RETRY_BASE_DELAY": "0.1",
+        "IPFS_RETRY_BASE_DELAY": "0.1",
+        "IPFS_CACHE_DB": os.path.join(workdir, "ipfs-cids.sqlite3"),
+        "IPFS_READ_CACHE_DIR": os.path.join(workdir, "ipfs-blobs"),
+        "JOB_STORE_PATH": os.path.join(workdir, "jobs.sqlite3"),
+    })
+    env.update(overrides)
+    return env
+
+
+async def start_server(session: aiohttp.ClientSession, env: dict[str, str], workdir: str, timeout: float = 30.0):
+    """Launch uvicorn in ``workdir`` and wait for /health; returns (process, base URL)"""
+    port = _free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+         "--port", str(port), "--log-level", "warning"],
+        cwd=workdir,
+        env=env
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode}")
+        try:
+            async with session.get(f"{base_url}/health") as response:
+                if response.status == 200:
+                    return process, base_url
+        except aiohttp.ClientError:
+            pass
+        await asyncio.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("Server did not become ready")
+
+
+def stop_server(process: subprocess.Popen):
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+async def run_scenario(
+    session: aiohttp.ClientSession,
+    base_url: str,
+    pid: int,
+    name: str,
+    rps: float,
+    duration: float,
+    timeout: float,
+    rng: random.Random
+) -> dict:
+    """
+    Send ``rps * duration`` requests at a fixed arrival rate
+
+    Latency percentiles cover successful (2xx) responses; everything else is
+    counted under ``statuses``.
+    """
+    path, make_body = SCENARIOS[name]
+    latencies: list[float] = []
+    statuses: Counter = Counter()
+    request_timeout = aiohttp.ClientTimeout(total=timeout)
+
+    async def one(i: int):
+        body = make_body(i, rng)
+        started = time.perf_counter()
+        try:
+            async with session.post(base_url + path, json=body, timeout=request_timeout) as response:
+                await response.read()
+                status = str(response.status)
+        except asyncio.TimeoutError:
+            status = "timeout"
+        except aiohttp.ClientError:
+            status = "connection_error"
+        statuses[status] += 1
+        if status.startswith("2"):
+            latencies.append(time.perf_counter() - started)
+
+    sampler = MemorySampler(pid)
+    baseline_rss = _rss_mb(pid)
+    sampler.start()
+    total = max(1, int(rps * duration))
+    started = time.perf_counter()
+    tasks = []
+    for i in range(total):
+        delay = started + i / rps - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(one(i)))
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+    await sampler.stop()
+
+    latencies.sort()
+    rounded = lambda value: round(value, 4) if value is not None else None
+    return {
+        "requests": total,
+        "ok": len(latencies),
+        "statuses": dict(statuses),
+        "elapsed": round(elapsed, 3),
+        "throughput": round(len(latencies) / elapsed, 3),
+        "p50": rounded(percentile(latencies, 50)),
+        "p95": rounded(percentile(latencies, 95)),
+        "p99": rounded(percentile(latencies, 99)),
+        "start_rss_mb": rounded(baseline_rss),
+        "peak_rss_mb": rounded(max(sampler.samples, default=None)),
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Describe every metric that moved in the wrong direction by more than ``tolerance``"""
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        for metric, higher_is_better in COMPARED:
+            old, new = previous.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if (change < -tolerance) if higher_is_better else (change > tolerance):
+                regressions.append(f"{name}.{metric}: {old} -> {new} ({change:+.1%})")
+    return regressions
+
+
+def print_report(results: dict, baseline: dict):
+    header = f"{'scenario':<14}{'ok/sent':>10}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'peak MB':>10}"
+    print(header)
+    print("-" * len(header))
+    fmt = lambda value, spec: format(value, spec) if value is not None else "-"
+    for name, result in results.items():
+        print(
+            f"{name:<14}{result['ok']:>5}/{result['requests']:<4}"
+            f"{fmt(result['throughput'], '9.2f')}{fmt(result['p50'], '9.3f')}"
+            f"{fmt(result['p95'], '9.3f')}{fmt(result['p99'], '9.3f')}{fmt(result['peak_rss_mb'], '10.1f')}"
+        )
+        previous = baseline.get(name)
+        if previous:
+            deltas = []
+            for metric, _ in COMPARED:
+                old, new = previous.get(metric), result.get(metric)
+                if old and new is not None:
+                    deltas.append(f"{metric} {(new - old) / old:+.1%}")
+            print(f"{'':<14}vs baseline: {', '.join(deltas)}")
+        errors = {status: count for status, count in result["statuses"].items() if not status.startswith("2")}
+        if errors:
+            print(f"{'':<14}non-2xx: {errors}")
+
+
+async def run(args) -> int:
+    config = {
+        "rps": args.rps,
+        "duration": args.duration,
+        "openai_latency": args.openai_latency,
+        "image_latency": args.image_latency,
+        "ipfs_latency": args.ipfs_latency,
+        "error_rate": args.error_rate,
+        "env": args.env,
+    }
+    overrides = dict(item.split("=", 1) for item in args.env)
+    fakes = FakeUpstreams(
+        openai_latency=args.openai_latency,
+        image_latency=args.image_latency,
+        ipfs_latency=args.ipfs_latency,
+        error_rate=args.error_rate,
+        seed=args.seed
+    )
+    await fakes.start()
+    rng = random.Random(args.seed)
+    results = {}
+    connector = aiohttp.TCPConnector(limit=0)
+    try:
+        async with aiohttp.ClientSession(connector=connector) as session:
+            for name in args.scenario or list(SCENARIOS):
+                workdir = tempfile.mkdtemp(prefix="bench-")
+                process, base_url = await start_server(session, server_env(fakes, workdir, overrides), workdir)
+                try:
+                    print(f"Running {name}: {args.rps} rps for {args.duration}s", file=sys.stderr)
+                    results[name] = await run_scenario(
+                        session, base_url, process.pid, name,
+                        args.rps, args.duration, args.timeout, rng
+                    )
+                finally:
+                    stop_server(process)
+                    shutil.rmtree(workdir, ignore_errors=True)
+    finally:
+        await fakes.stop()
+
+    stored = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            stored = json.load(f)
+        if stored.get("config") != config:
+            print("Note: baseline was recorded with different settings", file=sys.stderr)
+    baseline = stored.get("scenarios", {})
+    print_report(results, baseline)
+
+    report = {"config": config, "scenarios": results, "upstreams": fakes.stats()}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump({"config": config, "scenarios": results}, f, indent=2)
+            f.write("\n")
+        print(f"Baseline saved to {args.baseline}", file=sys.stderr)
+        return 0
+
+    regressions = compare(results, baseline, args.tolerance)
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    return 1 if regressions and args.fail_on_regression else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", action="append", choices=list(SCENARIOS),
+                        help="Scenario to run (repeatable; default all)")
+    parser.add_argument("--rps", type=float, default=4.0, help="Target arrival rate")
+    parser.add_argument("--duration", type=float, default=15.0, help="Seconds of load per scenario")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-request timeout")
+    parser.add_argument("--openai-latency", default="lognormal:0.8,0.4")
+    parser.add_argument("--image-latency", default="lognormal:3.0,0.3")
+    parser.add_argument("--ipfs-latency", default="lognormal:0.3,0.5")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                        help="Extra server environment (repeatable), e.g. for A/B runs")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.15,
+                        help="Relative change tolerated before flagging a regression")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    parser.add_argument("--output", help="Write the full JSON report here")
+    sys.exit(asyncio.run(run(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
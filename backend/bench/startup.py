@@ -0,0 +1,142 @@
+"""
+Cold start profile: import and service initialization time per module
+
+Each run imports app.main in a fresh interpreter (with -X importtime), then
+builds every service through its FastAPI dependency, timing each step. The
+report lists the slowest packages and app modules, the median import time
+against the budget, and any heavy SDK that importing the app loaded even
+though it should only load on first use.
+
+Usage (from backend/):
+    python -m bench.startup
+    python -m bench.startup --runs 10 --fail-over-budget
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+from collections import defaultdict
+
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Median `import app.main` time allowed, in milliseconds
+IMPORT_BUDGET_MS = 600.0
+# SDKs that must only load when a service first needs them
+DEFERRED_MODULES = (
+    "openai", "aiohttp", "eth_abi", "eth_hash", "eth_account", "numpy", "PIL",
+    "app.services.chain_indexer", "app.services.chain_submitter",
+)
+# Dependencies built in order after the import
+SERVICES = (
+    "get_openai_service",
+    "get_ipfs_service",
+    "get_pipeline",
+    "get_puzzle_pool",
+    "get_batch_service",
+    "get_job_queue",
+)
+
+CHILD = """
+import asyncio, json, sys, time
+started = time.perf_counter()
+import app.main
+imported = time.perf_counter() - started
+loaded = sorted(name for name in {deferred!r} if name in sys.modules)
+
+from app import dependencies
+init = {{}}
+
+async def build():
+    for name in {services!r}:
+        started = time.perf_counter()
+        await getattr(dependencies, name)()
+        init[name] = time.perf_counter() - started
+    started = time.perf_counter()
+    dependencies.built("openai").client
+    init["openai_client"] = time.perf_counter() - started
+    await dependencies.stop_services()
+
+asyncio.run(build())
+print(json.dumps({{"import": imported, "init": init, "loaded": loaded}}))
+"""
+
+_IMPORTTIME = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$")
+
+
+def profile_once(workdir: str) -> dict:
+    """Run one cold start in a fresh interpreter"""
+    env = {
+        **os.environ,
+        "PYTHONPATH": BACKEND_DIR,
+        "OPENAI_API_KEY": os.getenv("OPENAI_API_KEY", "profile"),
+    }
+    script = CHILD.format(deferred=DEFERRED_MODULES, services=SERVICES)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", script],
+        cwd=workdir, env=env, capture_output=True, text=True, check=True
+    )
+    modules = []
+    for line in result.stderr.splitlines():
+        match = _IMPORTTIME.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            modules.append((name, int(self_us) / 1e3, int(cumulative_us) / 1e3, len(indent) // 2))
+    return {**json.loads(result.stdout.strip().splitlines()[-1]), "modules": modules}
+
+
+def print_report(runs: list[dict], budget_ms: float, top: int):
+    # Per-module timings from the median run by import time
+    median_run = sorted(runs, key=lambda run: run["import"])[len(runs) // 2]
+    packages = defaultdict(float)
+    for name, self_ms, _, _ in median_run["modules"]:
+        packages[name.split(".")[0]] += self_ms
+    print(f"{'package':<32} {'self ms':>10}")
+    for name, total in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+        print(f"{name:<32} {total:10.1f}")
+
+    print(f"\n{'app module':<40} {'self ms':>10} {'cumul ms':>10}")
+    app_modules = [module for module in median_run["modules"] if module[0].startswith("app")]
+    for name, self_ms, cumulative_ms, _ in sorted(app_modules, key=lambda module: -module[2])[:top]:
+        print(f"{name:<40} {self_ms:10.1f} {cumulative_ms:10.1f}")
+
+    print(f"\n{'initialization':<40} {'median ms':>10}")
+    for name in median_run["init"]:
+        print(f"{name:<40} {statistics.median(run['init'][name] for run in runs) * 1e3:10.1f}")
+
+    import_ms = statistics.median(run["import"] for run in runs) * 1e3
+    print(f"\nimport app.main: {import_ms:.1f} ms median of {len(runs)} (budget {budget_ms:.0f} ms)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="Rows per table")
+    parser.add_argument("--budget", type=float, default=IMPORT_BUDGET_MS, help="Import budget in ms")
+    parser.add_argument("--fail-over-budget", action="store_true",
+                        help="Exit 1 if the import exceeds the budget or loads a deferred SDK")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="startup-") as workdir:
+        runs = [profile_once(workdir) for _ in range(args.runs)]
+    print_report(runs, args.budget, args.top)
+
+    failures = []
+    import_ms = statistics.median(run["import"] for run in runs) * 1e3
+    if import_ms > args.budget:
+        failures.append(f"import app.main took {import_ms:.1f} ms, over the {args.budget:.0f} ms budget")
+    loaded = sorted({name for run in runs for name in run["loaded"]})
+    if loaded:
+        failures.append(f"import app.main loaded deferred modules: {', '.join(loaded)}")
+    for line in failures:
+        print(f"REGRESSION {line}")
+    sys.exit(1 if failures and args.fail_over_budget else 0)
+
+
+if __name__ == "__main__":
+    main()
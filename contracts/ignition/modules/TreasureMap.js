@@ -0,0 +1,10 @@
+// Deploys TreasureMap. On a fresh `npx hardhat node` it lands at
+// 0x5FbDB2315678afecB367f032d93F642f64180aa3 (first deployment from account #0).
+
+const { buildModule } = require("@nomicfoundation/hardhat-ignition/modules");
+
+module.exports = buildModule("TreasureMapModule", (m) => {
+  const treasureMap = m.contract("TreasureMap");
+
+  return { treasureMap };
+});